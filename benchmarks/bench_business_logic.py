@@ -0,0 +1,71 @@
+"""
+Benchmark: vectorized business logic vs. the original iterrows loop.
+
+    python -m benchmarks.bench_business_logic [rows ...]
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.business_logic import run_business_logic
+
+
+def legacy_apply_business_logic(df_m):
+    """The original row-by-row implementation, kept for comparison."""
+    for idx, row in df_m.iterrows():
+        sid = str(row.get('site_mgmt_id', ''))
+        if '-' in sid and len(sid.split('-')) == 2:
+            df_m.at[idx, 'status'] = '진행중'
+        elif len(sid) == 6 and sid.isdigit():
+            df_m.at[idx, 'status'] = '견적중'
+        try:
+            contract = float(str(row.get('contract_price', 0)).replace(',', '') or 0)
+            vat = contract * 0.1
+            total = contract + vat
+            down = float(str(row.get('down_payment', 0)).replace(',', '') or 0)
+            interim = float(str(row.get('interim_payment', 0)).replace(',', '') or 0)
+            balance = total - (down + interim)
+            df_m.at[idx, 'vat'] = vat
+            df_m.at[idx, 'contract_amount'] = total
+            df_m.at[idx, 'balance_payment'] = balance
+        except: pass
+    return df_m
+
+
+def make_master(n, seed=0):
+    """Synthetic Master_DB shaped like the sheet after load_all_data."""
+    rng = np.random.default_rng(seed)
+    progress_ids = [f"{y}-{i:02d}" for y, i in zip(rng.integers(20, 27, n), rng.integers(1, 99, n))]
+    quote_ids = [f"{v:06d}" for v in rng.integers(100000, 999999, n)]
+    ids = np.where(rng.random(n) < 0.5, progress_ids, quote_ids)
+    contract = rng.integers(1, 500, n) * 100000
+    return pd.DataFrame({
+        'site_mgmt_id': ids,
+        'status': '',
+        'contract_price': [f"{v:,}" for v in contract],
+        'vat': '',
+        'contract_amount': '',
+        'down_payment': [f"{v:,}" if v else "" for v in contract // 2 * (rng.random(n) < 0.6)],
+        'interim_payment': '',
+        'balance_payment': '',
+    })
+
+
+def bench(n):
+    base = make_master(n)
+    t0 = time.perf_counter()
+    legacy_apply_business_logic(base.copy())
+    legacy = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    run_business_logic(base.copy())
+    vectorized = time.perf_counter() - t0
+    print(f"{n:>8,} rows  legacy {legacy:8.3f}s  vectorized {vectorized:8.4f}s  x{legacy / vectorized:,.0f}")
+
+
+if __name__ == "__main__":
+    sizes = [int(a) for a in sys.argv[1:]] or [1_000, 10_000, 100_000]
+    for n in sizes:
+        bench(n)
@@ -0,0 +1,103 @@
+"""
+Benchmark: memory per 10k rows of the loaded tables, object columns vs. typed schema.
+
+    python -m benchmarks.bench_column_schema [rows]
+
+Frames are built from synthetic worksheet values in the form Sheets returns
+them (formatted strings), typed with apply_schema, and checked to restore to
+exactly the same values.
+"""
+import sys
+import time
+
+import numpy as np
+
+from utils.column_schema import COLUMN_TYPES, apply_schema, restore_frame, memory_per_rows
+from utils.sheet_diff import frame_to_values, values_to_frame
+
+JURISDICTIONS = ["공주", "김포", "화성", "수원", "용인", "평택", "안산", "천안", "아산", "청주"]
+STAFF = ["김민수", "이서연", "박지훈", "최유진", "정하늘", ""]
+STATUSES = ["진행중", "견적중", "완료", "보류"]
+ROLES = ["대표", "과장", "부장", "팀장", "주임", "소방위", ""]
+WORK_TYPES = ["상담", "현장방문", "이슈", "하자", "서류"]
+
+
+def _won(rng, n, low, high):
+    return [f"{v:,}" for v in rng.integers(low, high, n) * 1000]
+
+
+def _dates(rng, n):
+    days = np.datetime64("2023-01-01") + rng.integers(0, 1000, n)
+    return [str(d) for d in days]
+
+
+def make_sheet_values(n, seed=0):
+    """Worksheet values (header first) for master, contacts and works."""
+    rng = np.random.default_rng(seed)
+    ids = [f"{y}-{i:02d}" for y, i in zip(rng.integers(20, 27, n), rng.integers(1, 99, n))]
+    price = rng.integers(1000, 50000, n) * 1000
+    master = {
+        "site_mgmt_id": ids,
+        "jurisdiction": rng.choice(JURISDICTIONS, n),
+        "site_name": [f"현장 {i}" for i in range(n)],
+        "company_address": [f"경기도 화성시 매송면 원평리 {i}" for i in range(n)],
+        "site_address": [f"경기 화성시 화성로 {i}" for i in range(n)],
+        "status": rng.choice(STATUSES, n),
+        "contract_price": [f"{v:,}" for v in price],
+        "vat": [f"{v:,}" for v in price // 10],
+        "contract_amount": [f"{v:,}" for v in price + price // 10],
+        "down_payment": _won(rng, n, 0, 5000),
+        "interim_payment": _won(rng, n, 0, 5000),
+        "balance_payment": _won(rng, n, 0, 5000),
+        "progress": [f"{v}%" for v in rng.integers(0, 11, n) * 10],
+        "designer": rng.choice(STAFF, n),
+        "permit_staff": rng.choice(STAFF, n),
+        "company_name": [f"(주)업체{i % (n // 3 + 1)}" for i in range(n)],
+        "facility_name": [f"시설 {i}" for i in range(n)],
+        "permit_volume": [f"{v}L" for v in rng.integers(100, 10000, n)],
+        "multiple": [f"{v:.1f}" for v in rng.random(n) * 10],
+        "start_date": _dates(rng, n),
+        "photos": [str(v) for v in rng.integers(0, 200, n)],
+        "issues": [str(v) for v in rng.integers(0, 5, n)],
+        "jibun_address": [f"원평리 {i}번지" for i in range(n)],
+    }
+    contacts = {
+        "site_mgmt_id": rng.choice(ids, 2 * n),
+        "company": [f"(주)업체{v}" for v in rng.integers(0, n // 5 + 1, 2 * n)],
+        "role": rng.choice(ROLES, 2 * n),
+        "name": [f"홍길동{i}" for i in range(2 * n)],
+        "phone": [f"010-{v // 10000:04d}-{v % 10000:04d}" for v in rng.integers(0, 10**8, 2 * n)],
+        "email": "",
+        "note": [f"비고 {i}" for i in range(2 * n)],
+    }
+    works = {
+        "site_mgmt_id": rng.choice(ids, 3 * n),
+        "date": _dates(rng, 3 * n),
+        "type": rng.choice(WORK_TYPES, 3 * n),
+        "content": [f"상담내용 {i}" for i in range(3 * n)],
+        "attachment": "",
+        "detail": "",
+    }
+    tables = {}
+    for key, columns in (("master", master), ("contacts", contacts), ("works", works)):
+        rows = max(len(v) for v in columns.values() if not isinstance(v, str))
+        cells = {c: [v] * rows if isinstance(v, str) else [str(x) for x in v] for c, v in columns.items()}
+        tables[key] = [list(cells)] + [list(row) for row in zip(*cells.values())]
+    return tables
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    print(f"{'table':<9} {'rows':>7} {'object MiB/10k':>15} {'typed MiB/10k':>14} {'saved':>6} {'load s':>7} {'save s':>7}  lossless")
+    for key, values in make_sheet_values(rows).items():
+        df = values_to_frame(values)
+        t0 = time.perf_counter()
+        typed, formats = apply_schema(df, COLUMN_TYPES[key])
+        load = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        restored = frame_to_values(restore_frame(typed, formats))
+        save = time.perf_counter() - t0
+        before, after = memory_per_rows(df), memory_per_rows(typed)
+        print(f"{key:<9} {len(df):>7,} {before / 2**20:>15.2f} {after / 2**20:>14.2f} {1 - after / before:>6.0%} "
+              f"{load:>7.2f} {save:>7.2f}  {restored == values}")
+        print(f"          typed: {', '.join(f'{c}={k}/{f}' if f else f'{c}={k}' for c, (k, f) in formats.items())}")
@@ -0,0 +1,51 @@
+"""
+Benchmark: pre-upload image downscaling, one process vs. a process pool.
+
+    python -m benchmarks.bench_image_prep [images] [--keep-exif]
+
+Uses synthetic 12 MP camera-sized JPEGs (noise over a gradient, so they
+compress like photos rather than flat colour).
+"""
+import io
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+from utils.image_prep import prepare_image, prepare_images, summarize
+
+
+def make_photo(seed, size=(4000, 3000)):
+    rng = np.random.default_rng(seed)
+    w, h = size
+    gradient = np.linspace(0, 200, w, dtype=np.float32)[None, :, None] + np.linspace(0, 55, h, dtype=np.float32)[:, None, None]
+    pixels = np.clip(gradient + rng.normal(0, 18, (h, w, 3)), 0, 255).astype(np.uint8)
+    out = io.BytesIO()
+    exif = Image.Exif()
+    exif[0x0112] = 6  # rotated 90 degrees, as phones often store it
+    exif[0x010F] = "FieldCam"
+    Image.fromarray(pixels).save(out, "JPEG", quality=95, exif=exif.tobytes())
+    return out.getvalue()
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    count = int(args[0]) if args else 8
+    keep_exif = "--keep-exif" in sys.argv
+    items = [(f"IMG_{i:04d}.jpg", make_photo(i)) for i in range(count)]
+
+    t0 = time.perf_counter()
+    serial = [prepare_image(name, data, keep_exif=keep_exif) for name, data in items]
+    serial_time = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    pooled = prepare_images(items, keep_exif=keep_exif)
+    pool_time = time.perf_counter() - t0
+
+    total = summarize(pooled)
+    print(f"{count} images, {total['original_bytes'] / 2**20:.1f} -> {total['bytes'] / 2**20:.1f} MiB "
+          f"({total['saved_bytes'] / total['original_bytes']:.0%} saved), "
+          f"{total['seconds'] / count:.2f}s per image, output {pooled[0]['size']}")
+    print(f"serial {serial_time:.2f}s, process pool ({os.cpu_count()} cores) {pool_time:.2f}s")
@@ -0,0 +1,87 @@
+"""
+Benchmark: choseong / infix name search vs. filtering the frames.
+
+    python -m benchmarks.bench_name_search [entries]
+
+Synthetic company, site and facility names plus contact names; entries is
+the total number of indexed names.
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.name_search import NameIndex, NAME_FIELDS
+
+PREFIXES = ["(주)", "주식회사 ", "", "", "㈜"]
+STEMS = ["한국", "대한", "삼양", "동양", "서울", "경기", "중앙", "태평양", "미래", "현대", "신성", "우진"]
+BUSINESS = ["윤활유", "엔씨켐", "화학", "산업", "건설", "물류", "정밀", "에너지", "전자", "기계", "식품", "케미칼"]
+SUFFIXES = ["", " 정안공장", " 제2공장", " 물류센터", " 본사", " 연구소"]
+SURNAMES = list("김이박최정강조윤장임한오서신권황안송류홍")
+GIVEN = list("민서지현우준영수진하은도윤재성혜주")
+QUERIES = ["ㅎㄱㅇㅎㅇ", "윤활", "한국윤활유", "ㅅㅇㅇㅆㅋ", "정안공장", "한ㄱ", "홍길동", "ㅎㄱㄷ", "ㅎ"]
+
+
+def make_frames(entries, seed=0):
+    rng = np.random.default_rng(seed)
+    n = entries // 4
+
+    def companies(k):
+        return [f"{p}{s}{b}{x}" for p, s, b, x in zip(rng.choice(PREFIXES, k), rng.choice(STEMS, k),
+                                                        rng.choice(BUSINESS, k), rng.choice(SUFFIXES, k))]
+
+    master = pd.DataFrame({
+        "site_mgmt_id": [f"{i:06d}" for i in range(n)],
+        "site_name": companies(n),
+        "company_name": companies(n),
+        "facility_name": [f"{v}호 저장소" for v in rng.integers(1, 50, n)],
+    })
+    contacts = pd.DataFrame({
+        "site_mgmt_id": [f"{v:06d}" for v in rng.integers(0, n, entries - 3 * n)],
+        "name": ["".join(t) for t in zip(rng.choice(SURNAMES, entries - 3 * n), rng.choice(GIVEN, entries - 3 * n),
+                                         rng.choice(GIVEN, entries - 3 * n))],
+    })
+    contacts.loc[7, "name"] = "홍길동"
+    return {"master": master, "contacts": contacts}
+
+
+def filter_frames(frames, query):
+    """The baseline: str.contains over every name column."""
+    hits = 0
+    for key, fields in NAME_FIELDS.items():
+        for field in fields:
+            hits += int(frames[key][field].str.contains(query, regex=False).sum())
+    return hits
+
+
+if __name__ == "__main__":
+    entries = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    frames = make_frames(entries)
+    index = NameIndex()
+    t0 = time.perf_counter()
+    for key, df in frames.items():
+        index.sync(key, df)
+    print(f"build: {time.perf_counter() - t0:.2f}s  {index.stats()}")
+
+    frames["master"].loc[3, "site_name"] = "한국윤활유 제3공장"
+    t0 = time.perf_counter()
+    changed = [index.sync(key, df) for key, df in frames.items()]
+    print(f"sync after one edit: {(time.perf_counter() - t0) * 1000:.0f}ms  (indexed, removed) = {changed}")
+    print(f"edited name found: {[h['value'] for h in index.search('ㅎㄱㅇㅎㅇ ㅈ3')]}")
+
+    for query in QUERIES:
+        t0 = time.perf_counter()
+        baseline = filter_frames(frames, query)
+        filtered = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        index.search(query)
+        first = time.perf_counter() - t0
+        runs = 20
+        t0 = time.perf_counter()
+        for _ in range(runs):
+            hits = index.search(query)
+        searched = (time.perf_counter() - t0) / runs
+        best = hits[0]["value"] if hits else "-"
+        print(f"{query:<8} filter {filtered * 1000:6.1f}ms ({baseline:,} substring hits)  "
+              f"index first {first * 1000:6.2f}ms, then {searched * 1000:5.2f}ms  best: {best}")
@@ -0,0 +1,44 @@
+"""
+Benchmark: batched async notification dispatch against a local stub provider.
+
+    python -m benchmarks.bench_notifications [messages] [--latency-ms N]
+
+The stub accepts {"messages": [...]} POSTs over keep-alive HTTP/1.1 and
+records how many requests and TCP connections it saw. The baseline sends
+one blocking request per message, as a synchronous send_notification would.
+"""
+import sys
+import time
+
+import httpx
+
+from tests.fakes import start_stub
+from utils.notify_dispatcher import NotificationDispatcher, Provider
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    count = int(args[0]) if args else 300
+    latency = float(sys.argv[sys.argv.index("--latency-ms") + 1]) / 1000 if "--latency-ms" in sys.argv else 0.02
+    stub, server, url = start_stub(latency)
+    messages = [(f"010-0000-{i:04d}", f"'현장 {i}' 현장의 담당자로 배정되었습니다.") for i in range(count)]
+
+    t0 = time.perf_counter()
+    for to, text in messages:
+        httpx.post(url, json={"messages": [{"to": to, "text": text}]})
+    blocking = time.perf_counter() - t0
+    print(f"blocking, one request per message: caller blocked {blocking:.2f}s, "
+          f"{stub.requests} requests, {len(stub.connections)} connections")
+
+    stub.reset()
+    dispatcher = NotificationDispatcher({"sms": Provider(url, rate_per_second=20, batch_size=50)}).start()
+    t0 = time.perf_counter()
+    futures = [dispatcher.submit(to, text, "sms") for to, text in messages]
+    submitted = time.perf_counter() - t0
+    dispatcher.flush()
+    delivered = time.perf_counter() - t0
+    ok = sum(1 for f in futures if f.exception() is None)
+    print(f"dispatcher: caller blocked {submitted * 1000:.1f}ms, all {ok}/{count} delivered after {delivered:.2f}s, "
+          f"{stub.requests} requests, {len(stub.connections)} connections")
+    dispatcher.close()
+    server.shutdown()
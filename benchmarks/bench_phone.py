@@ -0,0 +1,79 @@
+"""
+Benchmark: per-value format_phone via .apply vs. the column-wise normalizer,
+plus building and querying the caller index.
+
+    python -m benchmarks.bench_phone [rows]
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.phone import CallerIndex, format_phone_series, phone_key, phone_keys
+
+FORMATS = [
+    "010-{a:04d}-{b:04d}", "010{a:04d}{b:04d}", "+82 10-{a:04d}-{b:04d}", "02-{c:03d}-{b:04d}",
+    "031-{c:03d}-{b:04d}", "(031) {a:04d} {b:04d}", "070-{a:04d}-{b:04d}", "1588-{b:04d}", "없음",
+]
+
+
+def legacy_format_phone(phone):
+    """The old per-value formatter: only 11-digit 010 numbers were normalized."""
+    if not isinstance(phone, str): return str(phone) if phone else ""
+    digits = ''.join(filter(str.isdigit, phone))
+    if len(digits) == 11 and digits.startswith("010"):
+        return f"{digits[:3]}-{digits[3:7]}-{digits[7:]}"
+    return phone
+
+
+def make_contacts(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    kinds = rng.integers(0, len(FORMATS), rows)
+    a, b, c = rng.integers(1000, 9999, rows), rng.integers(0, 9999, rows), rng.integers(200, 999, rows)
+    phones = [FORMATS[k].format(a=x, b=y, c=z) for k, x, y, z in zip(kinds, a, b, c)]
+    return pd.DataFrame({
+        "site_mgmt_id": [f"{v:06d}" for v in rng.integers(0, rows // 3 + 1, rows)],
+        "phone": phones,
+        "note": [f"사무실 02-{z:03d}-{y:04d}" if k % 4 == 0 else "" for k, y, z in zip(kinds, b, c)],
+    }, dtype=object)
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    contacts = make_contacts(rows)
+
+    t0 = time.perf_counter()
+    legacy = contacts["phone"].apply(legacy_format_phone)
+    applied = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    formatted = format_phone_series(contacts["phone"])
+    vectorized = time.perf_counter() - t0
+    print(f"{rows:,} phones  .apply(format_phone) {applied:.2f}s ({(legacy != contacts['phone']).sum():,} changed)  "
+          f"format_phone_series {vectorized:.2f}s ({(formatted != contacts['phone']).sum():,} changed)")
+    t0 = time.perf_counter()
+    per_value = contacts["phone"].map(phone_key)
+    mapped = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    keys = phone_keys(contacts["phone"])
+    columnwise = time.perf_counter() - t0
+    assert (keys == per_value).all()
+    print(f"canonical keys: .map(phone_key) {mapped:.2f}s  phone_keys {columnwise:.2f}s  "
+          f"({(keys != '').sum():,} of {rows:,} valid)")
+
+    index = CallerIndex()
+    t0 = time.perf_counter()
+    keys = index.rebuild(contacts)
+    print(f"caller index: {keys:,} keys built in {time.perf_counter() - t0:.2f}s")
+
+    callers = list(contacts["phone"].sample(1000, random_state=1)) + ["+82-" + n.split()[-1][1:] for n in contacts["note"] if n][:1000]
+    t0 = time.perf_counter()
+    found = sum(1 for number in callers if index.lookup(number)["sites"])
+    per_call = (time.perf_counter() - t0) / len(callers)
+    t0 = time.perf_counter()
+    for number in callers[:50]:
+        digits = "".join(filter(str.isdigit, number))
+        contacts[contacts["phone"].str.replace(r"\D", "", regex=True) == digits]
+    scan = (time.perf_counter() - t0) / 50
+    print(f"lookup: {per_call * 1000:.3f}ms per call ({found}/{len(callers)} matched to a site)  "
+          f"vs. scanning the frame {scan * 1000:.1f}ms")
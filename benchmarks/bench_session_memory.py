@@ -0,0 +1,76 @@
+"""
+Benchmark: memory held per Streamlit session, per-session copies vs. shared snapshot.
+
+    python -m benchmarks.bench_session_memory [rows] [sessions]
+"""
+import sys
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from utils.snapshot_store import Snapshot, SessionData
+
+MASTER_COLUMNS = [
+    "site_mgmt_id", "jurisdiction", "site_name", "company_address", "site_address", "status",
+    "contract_price", "vat", "contract_amount", "down_payment", "interim_payment", "balance_payment",
+    "progress", "designer", "permit_staff", "company_name", "facility_name", "permit_volume",
+    "multiple", "start_date", "photos", "issues", "jibun_address",
+]
+
+
+def make_frames(n, seed=0):
+    """Synthetic master/contacts/works with string cells, as loaded from Sheets."""
+    rng = np.random.default_rng(seed)
+    ids = [f"{v:06d}" for v in rng.integers(100000, 999999, n)]
+    master = pd.DataFrame({c: [f"{c}-{v}" for v in rng.integers(0, n, n)] for c in MASTER_COLUMNS}, dtype=object)
+    master["site_mgmt_id"] = ids
+    contacts = pd.DataFrame({
+        "site_mgmt_id": rng.choice(ids, 2 * n), "role": "대표", "name": "홍길동",
+        "phone": "010-1234-5678", "email": "", "note": [f"비고 {v}" for v in range(2 * n)],
+    }, dtype=object)
+    works = pd.DataFrame({
+        "site_mgmt_id": rng.choice(ids, 3 * n), "date": "2025-01-01", "type": "상담",
+        "content": [f"상담내용 {v}" for v in range(3 * n)], "attachment": "", "detail": "",
+    }, dtype=object)
+    return {"master": master, "contacts": contacts, "works": works}
+
+
+def legacy_session(frames):
+    """Old behaviour: every session holds its own deep copies, and saving copies again."""
+    data = {k: df.copy() for k, df in frames.items()}
+    data["master"].at[0, "status"] = "진행중"
+    save_copies = [df.copy() for df in data.values()]
+    return data, save_copies
+
+
+def snapshot_session(snapshot):
+    """New behaviour: reference the snapshot, keep one edit in the overlay, materialize for save."""
+    data = SessionData(snapshot)
+    for key in data:
+        data[key]
+    data.update_cell("master", 0, "status", "진행중")
+    renamed = [df.rename(columns=str.upper) for df in data.values()]
+    return data, renamed
+
+
+def measure(make_session, arg, sessions):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    held = [make_session(arg) for _ in range(sessions)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    used = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del held
+    return used / sessions
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+    sessions = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    frames = make_frames(rows)
+    snapshot = Snapshot(frames)
+    print(f"shared snapshot: {snapshot.memory_usage() / 2**20:.1f} MiB ({rows:,} master rows)")
+    legacy = measure(legacy_session, frames, sessions)
+    shared = measure(snapshot_session, snapshot, sessions)
+    print(f"per session  legacy {legacy / 2**20:8.2f} MiB  snapshot {shared / 2**20:8.3f} MiB  ({sessions} sessions)")
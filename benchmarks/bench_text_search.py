@@ -0,0 +1,87 @@
+"""
+Benchmark: bigram text index vs. scanning Work_DB / 연락처_DB text columns.
+
+    python -m benchmarks.bench_text_search [rows]
+
+rows is the Master_DB size; works and contacts are 3x and 2x that.
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.bench_column_schema import make_sheet_values
+from utils.sheet_diff import values_to_frame
+from utils.text_search import TextIndex, TEXT_COLUMNS
+
+WORDS = ["소화설비", "위험물", "저장소", "정안공장", "허가", "변경", "완공검사", "탱크", "배관", "누설",
+         "점검", "서류", "보완", "소방서", "협의", "도면", "설계", "변경신고", "옥외탱크", "일반취급소"]
+QUERIES = ["정안공장", "완공 검사", "옥외탱크 누설", "일반취급소 변경신고"]
+
+
+def make_vocabulary(rng, size=5000):
+    """WORDS plus random 2-4 syllable Hangul words, with Zipf-like frequencies."""
+    syllables = [chr(c) for c in rng.integers(0xAC00, 0xD7A4, 400)]
+    words = WORDS + ["".join(rng.choice(syllables, rng.integers(2, 5))) for _ in range(size)]
+    weights = 1.0 / np.arange(1, len(words) + 1)
+    return np.array(words), weights / weights.sum()
+
+
+def make_tables(rows, seed=1):
+    rng = np.random.default_rng(seed)
+    words, weights = make_vocabulary(rng)
+    values = make_sheet_values(rows)
+    for row in values["works"][1:]:
+        row[3] = " ".join(rng.choice(words, 12, p=weights))
+    for row in values["contacts"][1:]:
+        row[6] = " ".join(rng.choice(words, 3, p=weights))
+    return {key: values_to_frame(values[key]) for key in TEXT_COLUMNS}
+
+
+def scan(tables, query):
+    """The baseline: every word of the query must appear in a row's text."""
+    hits = 0
+    for key, columns in TEXT_COLUMNS.items():
+        df = tables[key]
+        text = df[columns[0]].astype(str)
+        for col in columns[1:]:
+            text = text + " " + df[col].astype(str)
+        mask = np.ones(len(df), dtype=bool)
+        for word in query.split():
+            mask &= text.str.contains(word, regex=False).to_numpy()
+        hits += int(mask.sum())
+    return hits
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    tables = make_tables(rows)
+    path = os.path.join(tempfile.mkdtemp(), "text_index.json")
+
+    index = TextIndex(path)
+    t0 = time.perf_counter()
+    for key, df in tables.items():
+        index.sync(key, df, save=False)
+    index.save()
+    print(f"build: {time.perf_counter() - t0:.2f}s  {index.stats()}  {os.path.getsize(path) / 2**20:.1f} MiB on disk")
+
+    t0 = time.perf_counter()
+    index = TextIndex(path)
+    print(f"open from disk: {time.perf_counter() - t0:.2f}s")
+
+    tables["works"].loc[5, "content"] = "정안공장 특이사항"
+    t0 = time.perf_counter()
+    changed = [index.sync(key, df, save=False) for key, df in tables.items()]
+    print(f"incremental sync after one edit: {time.perf_counter() - t0:.2f}s  (indexed, removed) = {changed}")
+
+    for query in QUERIES:
+        t0 = time.perf_counter()
+        baseline = scan(tables, query)
+        scanned = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        hits = index.search(query, limit=20)
+        searched = time.perf_counter() - t0
+        print(f"{query:<12} scan {scanned * 1000:7.1f}ms ({baseline:,} rows)  index {searched * 1000:6.1f}ms "
+              f"(top {len(hits)}, best {hits[0]['site_mgmt_id'] if hits else '-'})")
@@ -0,0 +1,54 @@
+"""
+Benchmark: streaming xlsx export/import on a synthetic workbook.
+
+    python -m benchmarks.bench_xlsx_io [rows] [--baseline]
+
+--baseline also loads the file with openpyxl's default (cell object) mode.
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from openpyxl import load_workbook
+
+from benchmarks.bench_session_memory import make_frames
+from utils.xlsx_io import read_workbook, write_workbook
+
+SHEETS = {"master": "Master_DB", "contacts": "연락처_DB", "works": "Work_DB"}
+
+
+def measure(label, fn):
+    """Times fn untraced, then runs it again under tracemalloc for the peak."""
+    t0 = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - t0
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<28} {elapsed:8.2f}s  peak {peak / 2**20:8.1f} MiB")
+    return result
+
+
+def full_load(path):
+    wb = load_workbook(path)
+    rows = sum(1 for ws in wb.worksheets for _ in ws.values)
+    wb.close()
+    return rows
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    rows = int(args[0]) if args else 100_000
+    frames = make_frames(rows)
+    sheets = {SHEETS[k]: df for k, df in frames.items() if k == "master"}
+
+    path = os.path.join(tempfile.mkdtemp(), "bench.xlsx")
+    print(f"{rows:,} master rows x {len(frames['master'].columns)} columns")
+    measure("write_workbook (write-only)", lambda: write_workbook(sheets, path))
+    print(f"{'file size':<28} {os.path.getsize(path) / 2**20:8.1f} MiB")
+    measure("read_workbook (read-only)", lambda: read_workbook(path))
+    if "--baseline" in sys.argv:
+        measure("load_workbook (default)", lambda: full_load(path))
@@ -0,0 +1,172 @@
+"""
+Local fakes of the external services: a Drive endpoint that speaks the
+resumable upload protocol and a messaging provider. Shared by the tests and
+the benchmarks.
+"""
+import hashlib
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from googleapiclient.discovery import build
+from googleapiclient.http import HttpRequest, build_http
+
+
+class FakeDrive:
+    """State shared by the fake endpoint's handler threads."""
+
+    def __init__(self, fail_every=0):
+        self.fail_every = fail_every
+        self.lock = threading.Lock()
+        self.sessions = {}  # session id -> {'name', 'data': bytearray}
+        self.files = {}  # file id -> (name, md5)
+        self.chunk_requests = 0
+        self.failures = 0
+
+
+def make_handler(drive):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _reply(self, status, headers=None, body=b""):
+            self.send_response(status)
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _body(self):
+            return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+        def do_POST(self):
+            metadata = json.loads(self._body() or b"{}")
+            with drive.lock:
+                session = f"s{len(drive.sessions)}"
+                drive.sessions[session] = {'name': metadata.get('name'), 'data': bytearray()}
+            host = self.headers["Host"]
+            self._reply(200, {"Location": f"http://{host}/upload/session/{session}"})
+
+        def do_PUT(self):
+            session = drive.sessions[self.path.rsplit("/", 1)[1]]
+            match = re.match(r"bytes (\*|(\d+)-(\d+))/(\d+|\*)", self.headers.get("Content-Range", ""))
+            body = self._body()
+            if match and match.group(1) != "*":
+                with drive.lock:
+                    drive.chunk_requests += 1
+                    fail = drive.fail_every and drive.chunk_requests % drive.fail_every == 0
+                    if fail:
+                        drive.failures += 1
+                if fail:
+                    # Every other failure keeps half the chunk, like a connection
+                    # cut mid-transfer; the client must resume from that offset
+                    start = int(match.group(2))
+                    if drive.failures % 2 == 0 and start == len(session['data']):
+                        session['data'] += body[:len(body) // 2]
+                    return self._reply(503)
+                start = int(match.group(2))
+                if start <= len(session['data']):
+                    del session['data'][start:]
+                    session['data'] += body
+
+            total = match.group(4) if match else "*"
+            received = len(session['data'])
+            if total != "*" and received == int(total):
+                with drive.lock:
+                    file_id = f"f{len(drive.files)}"
+                    drive.files[file_id] = (session['name'], hashlib.md5(session['data']).hexdigest())
+                return self._reply(200, {"Content-Type": "application/json"}, json.dumps({
+                    "id": file_id, "name": session['name'],
+                    "webViewLink": f"https://drive.example/{file_id}",
+                }).encode())
+            headers = {"Range": f"bytes=0-{received - 1}"} if received else {}
+            self._reply(308, headers)
+
+    return Handler
+
+
+class PlainHttpRequest(HttpRequest):
+    """The client always builds https:// media URLs; the fake serves plain http."""
+
+    def __init__(self, http, postproc, uri, *args, **kwargs):
+        super().__init__(http, postproc, uri.replace("https://127.0.0.1", "http://127.0.0.1"), *args, **kwargs)
+
+
+def start_fake_drive(fail_every=0):
+    """Starts the fake endpoint on a free port; returns (drive, server, service_factory)."""
+    drive = FakeDrive(fail_every)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(drive))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    endpoint = f"http://127.0.0.1:{server.server_port}/"
+    local = threading.local()
+
+    def service_factory():
+        if not hasattr(local, "service"):
+            local.service = build("drive", "v3", http=build_http(), static_discovery=True,
+                                  client_options={"api_endpoint": endpoint},
+                                  requestBuilder=PlainHttpRequest)
+        return local.service
+
+    return drive, server, service_factory
+
+
+class StubProvider:
+    """
+    Records requests, messages and client connections. statuses scripts the
+    replies: the Nth request gets statuses[N] (200 once the list runs out,
+    or its last entry with repeat_last).
+    """
+
+    def __init__(self, latency=0.0, statuses=None, repeat_last=False):
+        self.latency = latency
+        self.statuses = list(statuses or [])
+        self.repeat_last = repeat_last
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.messages = 0
+        self.connections = set()
+
+    def reset(self):
+        with self.lock:
+            self.requests, self.messages, self.connections = 0, 0, set()
+
+    def next_status(self):
+        with self.lock:
+            if not self.statuses:
+                return 200
+            return self.statuses[0] if self.repeat_last and len(self.statuses) == 1 else self.statuses.pop(0)
+
+
+def start_stub(latency=0.0, statuses=None, repeat_last=False):
+    """Starts the stub on a free port; returns (stub, server, url)."""
+    stub = StubProvider(latency, statuses, repeat_last)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)))
+            time.sleep(stub.latency)
+            with stub.lock:
+                stub.requests += 1
+                stub.messages += len(body.get("messages", []))
+                stub.connections.add(self.client_address)
+            status = stub.next_status()
+            reply = b'{"status":"ok"}' if status < 300 else b'{"status":"error"}'
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(reply)))
+            self.end_headers()
+            self.wfile.write(reply)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return stub, server, f"http://127.0.0.1:{server.server_port}/messages"
@@ -0,0 +1,150 @@
+import importlib
+
+import pytest
+import streamlit as st
+
+from utils.data_cache import SharedDataCache
+from utils.sqlite_store import LocalMirror
+from utils.text_search import TextIndex
+
+
+class IdleWorker:
+    def notify(self):
+        pass
+
+
+@pytest.fixture
+def handler(monkeypatch, tmp_path):
+    monkeypatch.setattr(st, "secrets", {"connections": {"spreadsheet_id": "test"}, "counts": {"sync_interval": 0}})
+    dh = importlib.import_module("utils.data_handler")
+    mirror = LocalMirror(str(tmp_path / "mirror.sqlite3"))
+    headers = list(dh.MASTER_COLUMN_MAPPING.values())
+    rows = [[f"24010{i}" if h == "관리번호" else f"현장{i}" if h == "현장명" else "" for h in headers] for i in range(3)]
+    mirror.write_values("Master_DB", [headers] + rows, enqueue=False)
+    mirror.write_values("연락처_DB", [list(dh.CONTACT_MAPPING.values())], enqueue=False)
+    mirror.write_values("Work_DB", [list(dh.WORK_MAPPING.values())], enqueue=False)
+
+    warnings = []
+    monkeypatch.setattr(dh, "STORAGE_BACKEND", "sqlite")
+    monkeypatch.setattr(dh, "COUNT_SYNC_SECONDS", 0)
+    monkeypatch.setattr(dh, "_local_backend", lambda: (mirror, IdleWorker()))
+    monkeypatch.setattr(dh, "shared_data_cache", SharedDataCache(check_interval=0))
+    monkeypatch.setattr(dh, "text_index", TextIndex(str(tmp_path / "text_index.json")))
+    monkeypatch.setattr(dh, "get_drive_service", lambda: None)
+    monkeypatch.setattr(st, "warning", warnings.append)
+    yield dh, mirror, warnings
+    mirror.close()
+
+
+def session(dh, monkeypatch, state):
+    """load_all_data() as seen from one browser session."""
+    monkeypatch.setattr(st, "session_state", state)
+    return dh.load_all_data()
+
+
+def site_names(mirror):
+    return [row[2] for row in mirror.read_values("Master_DB")[1:]]
+
+
+def test_reload_keeps_unsaved_edits_on_shifted_rows(handler, monkeypatch):
+    dh, mirror, _ = handler
+    a_state = {}
+    a = session(dh, monkeypatch, a_state)
+    a.update_cell('master', 1, 'site_name', "정안공장")
+    # Another user inserts a row above it
+    values = mirror.read_values("Master_DB")
+    mirror.write_values("Master_DB", values[:1] + [["240109"] + [""] * (len(values[0]) - 1)] + values[1:], enqueue=False)
+
+    a = session(dh, monkeypatch, a_state)
+    master = a['master']
+    assert master.loc[master['site_mgmt_id'] == "240101", 'site_name'].tolist() == ["정안공장"]
+    assert "240109" in master['site_mgmt_id'].tolist()
+
+    dh.save_all_data(a)
+    assert site_names(mirror) == ["", "현장0", "정안공장", "현장2"]
+    assert not a_state['db_data'].is_dirty()
+
+
+def test_reload_does_not_resurrect_values_of_a_replaced_table(handler, monkeypatch):
+    dh, mirror, _ = handler
+    a_state, b_state = {}, {}
+    a = session(dh, monkeypatch, a_state)
+    b = session(dh, monkeypatch, b_state)
+    df = a['master'].copy()
+    df['site_name'] = df['site_name'].astype(object)
+    df.loc[0, 'site_name'] = "A 현장"
+    a['master'] = df
+
+    b.update_cell('master', 2, 'site_name', "B 현장")
+    dh.save_all_data(b)
+
+    a = session(dh, monkeypatch, a_state)
+    assert a['master']['site_name'].tolist() == ["A 현장", "현장1", "B 현장"]
+    dh.save_all_data(a)
+    assert site_names(mirror) == ["A 현장", "현장1", "B 현장"]
+
+
+def test_edits_set_back_are_not_carried(handler, monkeypatch):
+    dh, mirror, _ = handler
+    a_state, b_state = {}, {}
+    a = session(dh, monkeypatch, a_state)
+    b = session(dh, monkeypatch, b_state)
+    a.update_cell('master', 1, 'site_name', "임시")
+    a.update_cell('master', 1, 'site_name', "현장1")
+
+    b.update_cell('master', 1, 'site_name', "B 현장")
+    dh.save_all_data(b)
+
+    a = session(dh, monkeypatch, a_state)
+    assert a['master'].loc[1, 'site_name'] == "B 현장"
+    dh.save_all_data(a)
+    assert site_names(mirror) == ["현장0", "B 현장", "현장2"]
+
+
+def test_edits_of_deleted_rows_are_reported(handler, monkeypatch):
+    dh, mirror, warnings = handler
+    a_state = {}
+    a = session(dh, monkeypatch, a_state)
+    a.update_cell('master', 2, 'site_name', "삭제된 현장")
+    mirror.write_values("Master_DB", mirror.read_values("Master_DB")[:3], enqueue=False)
+
+    a = session(dh, monkeypatch, a_state)
+    assert a['master']['site_name'].tolist() == ["현장0", "현장1"]
+    assert len(warnings) == 1
+
+
+def with_issue(mirror, site_id):
+    header = mirror.read_values("Work_DB")[0]
+    row = [site_id if h == "관리번호" else "민원" if h == "업무형태" else "" for h in header]
+    mirror.write_values("Work_DB", [header, row], enqueue=False)
+
+
+def test_counts_are_written_to_their_site_after_rows_shift(handler, monkeypatch):
+    dh, mirror, _ = handler
+    with_issue(mirror, "240102")
+    session(dh, monkeypatch, {})
+    # A row is inserted above after the counts' snapshot was loaded
+    real_patch = mirror.patch_rows
+
+    def patch_after_insert(sheet, patches):
+        values = mirror.read_values(sheet)
+        mirror.write_values(sheet, values[:1] + [["240109"] + [""] * (len(values[0]) - 1)] + values[1:], enqueue=False)
+        return real_patch(sheet, patches)
+
+    monkeypatch.setattr(mirror, "patch_rows", patch_after_insert)
+    assert dh.sync_counts() == 3
+
+    values = mirror.read_values("Master_DB")
+    issues = values[0].index("이슈수")
+    assert {row[0]: row[issues] for row in values[1:]} == {"240109": "", "240100": "0", "240101": "0", "240102": "1"}
+
+
+def test_counts_are_not_written_without_count_headers(handler, monkeypatch):
+    dh, mirror, _ = handler
+    values = mirror.read_values("Master_DB")
+    keep = [i for i, h in enumerate(values[0]) if h not in ("사진수", "이슈수")]
+    mirror.write_values("Master_DB", [[row[i] for i in keep] for row in values], enqueue=False)
+    with_issue(mirror, "240102")
+
+    assert dh.sync_counts() == 0
+    assert mirror.read_values("Master_DB")[0] == [values[0][i] for i in keep]
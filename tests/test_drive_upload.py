@@ -0,0 +1,68 @@
+import hashlib
+import io
+
+import pytest
+from googleapiclient.errors import HttpError
+
+from tests.fakes import start_fake_drive
+from utils import drive_upload
+from utils.drive_upload import upload_files, upload_stream
+
+CHUNK = 256 * 1024
+
+
+@pytest.fixture
+def fake_drive(request):
+    drive, server, factory = start_fake_drive(getattr(request, "param", 0))
+    yield drive, factory
+    server.shutdown()
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(drive_upload, "backoff_delay", lambda attempt: 0)
+
+
+def payload(size, seed):
+    return bytes((i * 31 + seed) % 251 for i in range(size))
+
+
+@pytest.mark.parametrize("fake_drive", [3], indirect=True)
+def test_upload_resumes_after_mid_chunk_failures(fake_drive):
+    drive, factory = fake_drive
+    data = payload(5 * CHUNK + 1234, 1)
+
+    created = upload_stream(factory(), io.BytesIO(data), "photo.jpg", "folder", chunk_size=CHUNK, sleep=lambda s: None)
+
+    # Every 3rd chunk fails with a 503, every other failure after keeping half the chunk
+    assert drive.failures >= 2
+    assert created['retries'] == drive.failures
+    assert drive.files[created['id']] == ("photo.jpg", hashlib.md5(data).hexdigest())
+
+
+@pytest.mark.parametrize("fake_drive", [4], indirect=True)
+def test_parallel_uploads_arrive_intact(fake_drive):
+    drive, factory = fake_drive
+    payloads = [payload(3 * CHUNK + i * 1000, i) for i in range(6)]
+    files = [(f"photo_{i}.jpg", io.BytesIO(p)) for i, p in enumerate(payloads)]
+
+    results = upload_files(files, "folder", service_factory=factory, max_workers=3, chunk_size=CHUNK)
+
+    assert [r['error'] for r in results] == [None] * len(files)
+    assert sum(r['retries'] for r in results) == drive.failures > 0
+    for r, p in zip(results, payloads):
+        assert drive.files[r['id']][1] == hashlib.md5(p).hexdigest()
+
+
+@pytest.mark.parametrize("fake_drive", [1], indirect=True)
+def test_upload_gives_up_after_max_retries(fake_drive):
+    drive, factory = fake_drive
+    delays = []
+
+    with pytest.raises(HttpError):
+        upload_stream(factory(), io.BytesIO(payload(2 * CHUNK, 2)), "photo.jpg", "folder",
+                      chunk_size=CHUNK, max_retries=3, sleep=delays.append)
+
+    assert drive.chunk_requests == 4
+    assert len(delays) == 3
+    assert drive.files == {}
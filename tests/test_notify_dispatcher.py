@@ -0,0 +1,53 @@
+import httpx
+import pytest
+
+from tests.fakes import start_stub
+from utils import notify_dispatcher
+from utils.notify_dispatcher import NotificationDispatcher, Provider
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(notify_dispatcher.random, "uniform", lambda a, b: 0)
+
+
+def dispatch(statuses, repeat_last=False, max_retries=3, messages=1):
+    stub, server, url = start_stub(statuses=statuses, repeat_last=repeat_last)
+    dispatcher = NotificationDispatcher({"sms": Provider(url, rate_per_second=1000)},
+                                        batch_window=0.05, max_retries=max_retries).start()
+    try:
+        futures = [dispatcher.submit(f"010-0000-{i:04d}", "배정되었습니다.", "sms") for i in range(messages)]
+        dispatcher.flush(timeout=10)
+        return stub, dispatcher.stats(), futures
+    finally:
+        dispatcher.close(timeout=10)
+        server.shutdown()
+
+
+def test_retryable_failures_are_retried_until_accepted():
+    stub, stats, futures = dispatch([503, 429])
+
+    assert futures[0].result(timeout=1) is True
+    assert stub.requests == 3
+    assert stats['retries'] == 2
+    assert stats['sent'] == 1 and stats['failed'] == 0
+
+
+def test_retries_stop_at_the_limit():
+    stub, stats, futures = dispatch([503], repeat_last=True, max_retries=3, messages=2)
+
+    assert stub.requests == 4
+    assert stats['retries'] == 3
+    assert stats['failed'] == 2
+    for future in futures:
+        with pytest.raises(httpx.HTTPStatusError):
+            future.result(timeout=1)
+
+
+def test_client_errors_are_not_retried():
+    stub, stats, futures = dispatch([400])
+
+    assert stub.requests == 1
+    assert stats['retries'] == 0
+    with pytest.raises(httpx.HTTPStatusError):
+        futures[0].result(timeout=1)
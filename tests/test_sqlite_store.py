@@ -0,0 +1,104 @@
+import threading
+
+import pytest
+
+from utils.sqlite_store import LocalMirror, MemorySheetsAdapter, SyncWorker
+
+SHEET = "Master_DB"
+REMOTE = [
+    ["관리번호", "현장명", "진행상태"],
+    ["240101", "정안공장", "견적"],
+    ["240102", "양촌공장", "견적"],
+]
+
+
+@pytest.fixture
+def mirror(tmp_path):
+    mirror = LocalMirror(str(tmp_path / "mirror.sqlite3"))
+    yield mirror
+    mirror.close()
+
+
+def synced(mirror, adapter):
+    worker = SyncWorker(mirror, adapter, [SHEET])
+    worker.pull()
+    return worker
+
+
+def edited(values, row, col, value):
+    values = [list(r) for r in values]
+    values[row][col] = value
+    return values
+
+
+def test_save_writes_only_changed_cells(mirror):
+    worker = synced(mirror, MemorySheetsAdapter({SHEET: REMOTE}))
+    base = mirror.read_values(SHEET)
+    # Someone else's change reaches the mirror after this session loaded
+    assert mirror.write_values(SHEET, edited(base, 2, 2, "계약"), enqueue=False)
+
+    assert mirror.apply_diff(SHEET, base, edited(base, 1, 1, "정안공장 2동"))
+    values = mirror.read_values(SHEET)
+    assert values[1][1] == "정안공장 2동"
+    assert values[2][2] == "계약"
+    assert SHEET in worker.mirror.pending()
+
+
+def test_pull_keeps_local_save_made_during_fetch(mirror):
+    adapter = MemorySheetsAdapter({SHEET: REMOTE})
+    worker = synced(mirror, adapter)
+    base = mirror.read_values(SHEET)
+    fetch = adapter.fetch
+
+    def slow_fetch(sheets):
+        remote = fetch(sheets)
+        # A user saves while the remote values are in flight
+        mirror.apply_diff(SHEET, base, edited(base, 1, 2, "허가"))
+        return remote
+
+    adapter.fetch = slow_fetch
+    assert worker.pull() == []
+    assert mirror.read_values(SHEET)[1][2] == "허가"
+
+    worker.push()
+    assert adapter.sheets[SHEET][1][2] == "허가"
+    assert mirror.pending() == {}
+
+
+def test_concurrent_pulls_never_drop_local_saves(mirror):
+    adapter = MemorySheetsAdapter({SHEET: REMOTE})
+    worker = synced(mirror, adapter)
+    stop = threading.Event()
+
+    def pull_loop():
+        while not stop.is_set():
+            worker.pull()
+
+    puller = threading.Thread(target=pull_loop)
+    puller.start()
+    try:
+        for i in range(50):
+            base = mirror.read_values(SHEET)
+            mirror.apply_diff(SHEET, base, edited(base, 1 + i % 2, 1, f"현장 {i}"))
+    finally:
+        stop.set()
+        puller.join()
+
+    values = mirror.read_values(SHEET)
+    assert [values[1][1], values[2][1]] == ["현장 48", "현장 49"]
+    worker.push()
+    assert adapter.sheets[SHEET] == values
+
+
+def test_push_keeps_remote_changes_made_after_pull(mirror):
+    adapter = MemorySheetsAdapter({SHEET: REMOTE})
+    worker = synced(mirror, adapter)
+    # Someone edits the sheet directly after the mirror pulled it
+    adapter.sheets[SHEET] = edited(adapter.sheets[SHEET], 2, 1, "양촌공장 신관")
+
+    base = mirror.read_values(SHEET)
+    mirror.apply_diff(SHEET, base, edited(base, 1, 2, "계약"))
+    assert worker.push() == [SHEET]
+
+    assert adapter.sheets[SHEET][1][2] == "계약"
+    assert adapter.sheets[SHEET][2][1] == "양촌공장 신관"
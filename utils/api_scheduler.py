@@ -0,0 +1,205 @@
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Requests per minute and burst size per API. Sheets allows 60 reads and 60
+# writes per minute per user (the service account); Drive allows far more.
+API_LIMITS = {
+    'sheets.read': (60, 10),
+    'sheets.write': (60, 10),
+    'drive': (3000, 50),
+}
+MAX_RETRIES = 5
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 64
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Lower runs first: user writes, then user reads, then background reads
+PRIORITY_WRITE = 0
+PRIORITY_READ = 1
+PRIORITY_BACKGROUND = 2
+
+
+def error_status(error):
+    """HTTP status of a googleapiclient HttpError or gspread APIError, else None."""
+    resp = getattr(error, 'resp', None)
+    if resp is not None and hasattr(resp, 'status'):
+        return int(resp.status)
+    response = getattr(error, 'response', None)
+    if response is not None and hasattr(response, 'status_code'):
+        return int(response.status_code)
+    return None
+
+
+def is_throttled(error):
+    """True for quota errors: 429, or Drive's 403 rate-limit reasons."""
+    status = error_status(error)
+    return status == 429 or (status == 403 and 'ateLimitExceeded' in str(error))
+
+
+def is_retryable(error):
+    return error_status(error) in RETRY_STATUSES or is_throttled(error)
+
+
+class _Bucket:
+    """Token bucket plus the priority queue of callers waiting on it."""
+
+    def __init__(self, per_minute, burst):
+        self.rate = per_minute / 60.0
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.cond = threading.Condition()
+        self.waiting = []  # heap of (priority, seq)
+        self.stats = {'calls': 0, 'waited': 0, 'wait_seconds': 0.0, 'max_queue': 0,
+                      'retries': 0, 'throttled': 0, 'failures': 0, 'coalesced': 0}
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+
+class ApiScheduler:
+    """
+    Single gate for every Sheets and Drive request in the process.
+
+    Each API has a token bucket sized to its per-minute quota. Callers that
+    find it empty wait in a priority queue, so saves go out before user
+    reads and user reads before background refreshes. Identical reads that
+    are already in flight are coalesced into one request. 429/5xx responses
+    are retried with jittered exponential backoff, taking a fresh token for
+    every attempt.
+    """
+
+    def __init__(self, limits=None, max_retries=MAX_RETRIES, sleep=time.sleep):
+        self.max_retries = max_retries
+        self.sleep = sleep
+        self._buckets = {api: _Bucket(*limit) for api, limit in (limits or API_LIMITS).items()}
+        self._lock = threading.Lock()
+        self._inflight = {}  # (api, key) -> Future
+        self._seq = itertools.count()
+        self._local = threading.local()
+
+    @contextmanager
+    def background(self):
+        """Calls made by this thread inside the block get background priority."""
+        previous = getattr(self._local, 'background', False)
+        self._local.background = True
+        try:
+            yield
+        finally:
+            self._local.background = previous
+
+    def _bucket(self, api):
+        bucket = self._buckets.get(api)
+        if bucket is None:
+            with self._lock:
+                bucket = self._buckets.setdefault(api, _Bucket(*API_LIMITS.get(api, (600, 10))))
+        return bucket
+
+    def acquire(self, api, priority=PRIORITY_READ):
+        """Blocks until a token for api is available and it is this caller's turn."""
+        bucket = self._bucket(api)
+        with bucket.cond:
+            ticket = (priority, next(self._seq))
+            heapq.heappush(bucket.waiting, ticket)
+            bucket.stats['max_queue'] = max(bucket.stats['max_queue'], len(bucket.waiting))
+            started = time.monotonic()
+            while True:
+                bucket.refill(time.monotonic())
+                first = bucket.waiting[0] == ticket
+                if first and bucket.tokens >= 1:
+                    heapq.heappop(bucket.waiting)
+                    bucket.tokens -= 1
+                    bucket.cond.notify_all()
+                    break
+                bucket.cond.wait((1 - bucket.tokens) / bucket.rate if first else None)
+            waited = time.monotonic() - started
+            bucket.stats['calls'] += 1
+            if waited > 0.001:
+                bucket.stats['waited'] += 1
+                bucket.stats['wait_seconds'] += waited
+
+    def call(self, api, fn, write=False, key=None, retries=None):
+        """
+        Runs fn() under api's quota and returns its result.
+
+        Args:
+            write (bool): writes jump ahead of queued reads and are never coalesced.
+            key: identifies a read; concurrent calls with the same key share one request.
+            retries (int): retry limit for 429/5xx (default max_retries; 0 for none).
+        """
+        if write or key is None:
+            return self._run(api, fn, write, retries)
+
+        with self._lock:
+            future = self._inflight.get((api, key))
+            leader = future is None
+            if leader:
+                future = self._inflight[(api, key)] = Future()
+        if not leader:
+            bucket = self._bucket(api)
+            with bucket.cond:
+                bucket.stats['coalesced'] += 1
+            return future.result()
+
+        try:
+            result = self._run(api, fn, write, retries)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop((api, key), None)
+
+    def _run(self, api, fn, write, retries):
+        if write:
+            priority = PRIORITY_WRITE
+        elif getattr(self._local, 'background', False):
+            priority = PRIORITY_BACKGROUND
+        else:
+            priority = PRIORITY_READ
+        retries = self.max_retries if retries is None else retries
+        bucket = self._bucket(api)
+
+        attempt = 0
+        while True:
+            self.acquire(api, priority)
+            try:
+                return fn()
+            except Exception as e:
+                throttled = is_throttled(e)
+                with bucket.cond:
+                    bucket.stats['throttled'] += throttled
+                    if attempt >= retries or not is_retryable(e):
+                        bucket.stats['failures'] += 1
+                        raise
+                    bucket.stats['retries'] += 1
+                    if throttled:
+                        # The server says we are over quota: drain the bucket
+                        bucket.tokens = min(bucket.tokens, 0.0)
+                attempt += 1
+                delay = random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+                logger.info("%s request failed (%s); retry %d in %.1fs", api, error_status(e), attempt, delay)
+                self.sleep(delay)
+
+    def stats(self):
+        """Per-API queue depth, waits, retries, throttles and coalesced reads."""
+        result = {}
+        for api, bucket in list(self._buckets.items()):
+            with bucket.cond:
+                bucket.refill(time.monotonic())
+                result[api] = dict(bucket.stats, queue_depth=len(bucket.waiting), tokens=round(bucket.tokens, 2))
+        return result
+
+
+scheduler = ApiScheduler()
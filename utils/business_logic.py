@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+
+# Status derived from the shape of 관리번호
+STATUS_IN_PROGRESS = "진행중"   # e.g. 25-01
+STATUS_QUOTING = "견적중"       # e.g. 260128
+
+MONEY_INPUT_COLUMNS = ["contract_price", "down_payment", "interim_payment"]
+MONEY_OUTPUT_COLUMNS = ["vat", "contract_amount", "balance_payment"]
+
+# Cell values that mean "nothing entered" rather than a parse failure
+_MISSING_TOKENS = ["", "nan", "NaN", "None", "<NA>"]
+
+
+def parse_won(values):
+    """
+    Parses a column of money cells ("1,100,000", 1100000, "") into int64 won.
+    Empty cells count as 0.
+
+    Returns:
+        (amounts, failed): int64 Series and a boolean mask of unparseable cells.
+    """
+    text = values.astype("string").str.strip().str.replace(",", "", regex=False)
+    missing = text.isna() | text.isin(_MISSING_TOKENS)
+    numbers = pd.to_numeric(text.mask(missing), errors="coerce").astype("float64")
+    failed = (numbers.isna() | ~np.isfinite(numbers)) & ~missing
+    amounts = numbers.where(~failed & ~missing, 0).round().astype("int64")
+    return amounts, failed.astype(bool)
+
+
+def classify_status(site_ids):
+    """
+    Maps 관리번호 to an auto status, column-wise.
+    'YY-NN' -> 진행중, six digits -> 견적중, anything else -> <NA> (leave as is).
+    """
+    sid = site_ids.astype(str)
+    in_progress = sid.str.count("-") == 1
+    quoting = ~in_progress & (sid.str.len() == 6) & sid.str.isdigit()
+    status = pd.Series(pd.NA, index=site_ids.index, dtype=object)
+    status[in_progress] = STATUS_IN_PROGRESS
+    status[quoting] = STATUS_QUOTING
+    return status
+
+
+def compute_financials(df):
+    """
+    Computes vat / contract_amount / balance_payment in integer won.
+    VAT is 10% of the contract price, truncated to the won.
+
+    Returns:
+        (financials, failed): DataFrame with the three output columns and a
+        boolean mask of rows where any input amount could not be parsed.
+    """
+    failed = pd.Series(False, index=df.index)
+    parsed = {}
+    for col in MONEY_INPUT_COLUMNS:
+        if col in df.columns:
+            parsed[col], col_failed = parse_won(df[col])
+            failed |= col_failed
+        else:
+            parsed[col] = pd.Series(0, index=df.index, dtype="int64")
+
+    contract = parsed["contract_price"]
+    vat = contract // 10
+    total = contract + vat
+    balance = total - (parsed["down_payment"] + parsed["interim_payment"])
+    financials = pd.DataFrame({
+        "vat": vat,
+        "contract_amount": total,
+        "balance_payment": balance,
+    }, index=df.index)
+    return financials, failed
+
+
+def run_business_logic(df_m):
+    """
+    Applies Auto-Status and Financial Calculations to Master_DB in bulk.
+    Rows that fail to parse keep their previous vat/amount/balance values.
+
+    Returns:
+        (df_m, failed): the updated frame and the parse-failure row mask.
+    """
+    if df_m.empty:
+        return df_m, pd.Series(False, index=df_m.index)
+    # Whole columns are replaced below; the caller's frame is left untouched
+    df_m = df_m.copy(deep=False)
+
+    if 'site_mgmt_id' in df_m.columns:
+        status = classify_status(df_m['site_mgmt_id'])
+        matched = status.notna()
+        if matched.any():
+            if 'status' not in df_m.columns:
+                df_m['status'] = pd.NA
+            df_m['status'] = df_m['status'].astype(object).where(~matched, status)
+
+    financials, failed = compute_financials(df_m)
+    for col in MONEY_OUTPUT_COLUMNS:
+        # Object columns of Python ints keep the frame JSON-serializable for gspread
+        new_values = financials[col].astype(object)
+        if col in df_m.columns:
+            df_m[col] = df_m[col].astype(object).where(failed, new_values)
+        else:
+            df_m[col] = new_values.where(~failed, "")
+    return df_m, failed
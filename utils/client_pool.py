@@ -0,0 +1,73 @@
+import threading
+import time
+
+from google.auth.transport.requests import Request
+
+# Pooled handles are rebuilt after this long even if nothing failed
+ENTRY_TTL_SECONDS = 45 * 60
+
+
+class ClientPool:
+    """
+    Process-wide pool of authorized Google clients shared by all sessions.
+
+    One set of service-account credentials backs every entry. The token is
+    refreshed in place when it expires, so clients built from it keep working.
+    Drive services are kept per thread because httplib2 is not thread-safe.
+    """
+
+    def __init__(self, ttl=ENTRY_TTL_SECONDS):
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        self._creds = None
+        self._entries = {}  # key -> (value, created_at)
+        self._local = threading.local()
+
+    def credentials(self, factory):
+        """Returns the shared credentials, creating or refreshing them as needed."""
+        with self._lock:
+            if self._creds is None:
+                self._creds = factory()
+                if self._creds is None:
+                    return None
+            if not self._creds.valid:
+                self._creds.refresh(Request())
+            return self._creds
+
+    def get(self, key, factory):
+        """Returns the pooled value for key, building it with factory() when missing or stale."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and time.monotonic() - entry[1] < self.ttl:
+                return entry[0]
+            value = factory()
+            if value is not None:
+                self._entries[key] = (value, time.monotonic())
+            return value
+
+    def get_per_thread(self, key, factory):
+        """Like get(), but each thread keeps its own instance."""
+        entries = getattr(self._local, 'entries', None)
+        if entries is None:
+            entries = self._local.entries = {}
+        entry = entries.get(key)
+        if entry and time.monotonic() - entry[1] < self.ttl:
+            return entry[0]
+        value = factory()
+        if value is not None:
+            entries[key] = (value, time.monotonic())
+        return value
+
+    def invalidate(self, key=None):
+        """Drops one entry, or everything including the credentials."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                self._creds = None
+                self._local = threading.local()
+            else:
+                self._entries.pop(key, None)
+                getattr(self._local, 'entries', {}).pop(key, None)
+
+
+pool = ClientPool()
@@ -0,0 +1,209 @@
+import numpy as np
+import pandas as pd
+
+from utils.sheet_diff import cell_text
+
+CATEGORY = 'category'
+WON = 'won'
+COUNT = 'count'
+DATE = 'date'
+
+# Typed columns per table; everything else stays as loaded
+COLUMN_TYPES = {
+    'master': {
+        'jurisdiction': CATEGORY,
+        'status': CATEGORY,
+        'designer': CATEGORY,
+        'permit_staff': CATEGORY,
+        'contract_price': WON,
+        'vat': WON,
+        'contract_amount': WON,
+        'down_payment': WON,
+        'interim_payment': WON,
+        'balance_payment': WON,
+        'progress': COUNT,
+        'photos': COUNT,
+        'issues': COUNT,
+        'start_date': DATE,
+    },
+    'contacts': {
+        'company': CATEGORY,
+        'role': CATEGORY,
+    },
+    'works': {
+        'date': DATE,
+        'type': CATEGORY,
+    },
+}
+
+# A column becomes categorical only if it has at most this many distinct values per row
+CATEGORY_MAX_RATIO = 0.5
+
+# How the cells of a number column were written: "1100000", "1,100,000",
+# "50%", or unformatted numbers (local mirror, defaults)
+NUMBER_FORMATS = {
+    'plain': lambda n: str(n),
+    'comma': lambda n: f"{n:,}",
+    'percent': lambda n: f"{n}%",
+    'number': lambda n: n,
+}
+
+# Date cell formats: name -> (parse format, render)
+DATE_FORMATS = {
+    'iso': ("%Y-%m-%d", lambda t: t.strftime("%Y-%m-%d")),
+    'dot': ("%Y.%m.%d", lambda t: t.strftime("%Y.%m.%d")),
+    'slash': ("%Y/%m/%d", lambda t: t.strftime("%Y/%m/%d")),
+    # Google Sheets' Korean locale: "2025. 1. 28"
+    'korean': ("%Y. %m. %d", lambda t: f"{t.year}. {t.month}. {t.day}"),
+}
+
+DEFAULT_FORMATS = {WON: 'number', COUNT: 'number', DATE: 'iso'}
+
+
+def _texts(values):
+    """Cell texts of a column, as the diff-based save compares them."""
+    if values.map(type).eq(str).all():
+        return values.astype(object)
+    return values.map(cell_text).astype(object)
+
+
+def render_value(kind, fmt, value):
+    """One typed cell back to its sheet value; values of other types pass through."""
+    if value is None or value is pd.NA or value is pd.NaT or (isinstance(value, float) and value != value):
+        return ""
+    if kind in (WON, COUNT) and isinstance(value, (int, np.integer)) and not isinstance(value, bool):
+        return NUMBER_FORMATS[fmt or 'number'](int(value))
+    if kind == DATE and isinstance(value, pd.Timestamp):
+        return DATE_FORMATS[fmt or 'iso'][1](value)
+    return value
+
+
+def _render(kind, fmt, typed):
+    """Sheet values of a column; typed columns are rendered column-wise."""
+    if kind == DATE and pd.api.types.is_datetime64_any_dtype(typed.dtype) and fmt != 'korean':
+        return typed.dt.strftime(DATE_FORMATS[fmt or 'iso'][0]).astype(object).fillna("")
+    if kind in (WON, COUNT) and isinstance(typed.dtype, pd.Int64Dtype) and fmt in ('plain', 'percent'):
+        text = typed.astype("string") + ("%" if fmt == 'percent' else "")
+        return text.astype(object).fillna("")
+    return typed.astype(object).map(lambda v: render_value(kind, fmt, v))
+
+
+def _to_numbers(values, kind):
+    """Column -> (Int64 Series, candidate formats), or (None, None) if any cell is not a whole number."""
+    text = values.astype("string").str.strip()
+    missing = text.isna() | (text == "")
+    cleaned = text.str.replace(",", "", regex=False)
+    if kind == COUNT:
+        cleaned = cleaned.str.removesuffix("%")
+    numbers = pd.to_numeric(cleaned.mask(missing), errors="coerce")
+    if (numbers.isna() & ~missing).any() or (numbers.dropna() % 1 != 0).any():
+        return None, None
+    if not values.map(type).eq(str).all():
+        formats = ['number']
+    elif text.str.endswith("%").any():
+        formats = ['percent']
+    elif text.str.contains(",", regex=False).any():
+        formats = ['comma']
+    else:
+        formats = ['plain']
+    return numbers.astype("Int64"), formats
+
+
+def _to_dates(values, fmt):
+    text = values.astype("string").str.strip()
+    missing = text.isna() | (text == "")
+    dates = pd.to_datetime(text.mask(missing), format=DATE_FORMATS[fmt][0], errors="coerce")
+    if (dates.isna() & ~missing).any():
+        return None
+    return dates
+
+
+def convert_column(values, kind):
+    """
+    Converts one column to its typed form, but only if every cell can be
+    rendered back to exactly the text it was loaded as.
+
+    Returns:
+        (typed Series, format name) or (None, None) if the column is left as is.
+    """
+    if values.empty:
+        return None, None
+    if kind == CATEGORY:
+        if values.nunique(dropna=False) > CATEGORY_MAX_RATIO * len(values):
+            return None, None
+        return values.astype("category"), None
+
+    original = _texts(values)
+    if kind in (WON, COUNT):
+        numbers, formats = _to_numbers(values, kind)
+        candidates = [(numbers, fmt) for fmt in formats or []]
+    else:
+        # Only the formats the first date parses with are tried on the whole column
+        sample = values[values.astype(str).str.strip() != ""].head(1)
+        candidates = [(_to_dates(values, fmt), fmt) for fmt in DATE_FORMATS
+                      if sample.empty or _to_dates(sample, fmt) is not None]
+    for typed, fmt in candidates:
+        if typed is not None and _texts(_render(kind, fmt, typed)).equals(original):
+            return typed, fmt
+    return None, None
+
+
+def apply_schema(df, column_types):
+    """
+    Converts the columns of one table to compact dtypes: categoricals for
+    repeated labels, Int64 won for money, Int64 for counts and datetime64
+    for dates. Columns that would not round-trip exactly are left alone.
+
+    Args:
+        column_types (dict): column -> CATEGORY / WON / COUNT / DATE.
+    Returns:
+        (typed DataFrame, formats): formats maps each converted column to
+        (kind, format name) for restore_frame.
+    """
+    converted, formats = {}, {}
+    for col, kind in column_types.items():
+        if col not in df.columns:
+            continue
+        typed, fmt = convert_column(df[col], kind)
+        if typed is not None:
+            converted[col] = typed
+            formats[col] = (kind, fmt)
+    if not converted:
+        return df, formats
+    return df.assign(**converted), formats
+
+
+def restore_frame(df, formats=None):
+    """
+    Undoes apply_schema before a save: typed columns are rendered back to the
+    cell values they were loaded as. Columns turned into objects by edits are
+    rendered cell by cell, so edited and untouched cells both come out right.
+    """
+    formats = formats or {}
+    restored = {}
+    for col in df.columns:
+        dtype = df[col].dtype
+        if col in formats:
+            kind, fmt = formats[col]
+        elif isinstance(dtype, pd.CategoricalDtype):
+            kind, fmt = CATEGORY, None
+        elif isinstance(dtype, pd.Int64Dtype):
+            kind, fmt = COUNT, DEFAULT_FORMATS[COUNT]
+        elif pd.api.types.is_datetime64_any_dtype(dtype):
+            kind, fmt = DATE, DEFAULT_FORMATS[DATE]
+        else:
+            continue
+        if kind == CATEGORY:
+            restored[col] = df[col].astype(object)
+        else:
+            restored[col] = _render(kind, fmt, df[col])
+    if not restored:
+        return df
+    return df.assign(**restored)
+
+
+def memory_per_rows(df, rows=10_000):
+    """Deep memory use of a frame scaled to the given number of rows, in bytes."""
+    if not len(df):
+        return 0
+    return int(df.memory_usage(deep=True).sum() * rows / len(df))
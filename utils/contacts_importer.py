@@ -0,0 +1,199 @@
+import os
+import re
+
+import pandas as pd
+
+from utils.phone import format_phone_series
+
+CHUNK_ROWS = 500
+
+# Google Contacts export columns -> what we use them for
+EXPORT_NAME = "이름"
+EXPORT_REMARK = "특기사항"
+EXPORT_NOTES = "Notes"
+EXPORT_EMAIL = "E-mail 1"
+EXPORT_PHONES = ["Phone 1 - Value", "Phone 2 - Value"]
+EXPORT_COLUMNS = [EXPORT_NAME, EXPORT_REMARK, EXPORT_NOTES, EXPORT_EMAIL] + EXPORT_PHONES
+
+CONTACT_COLUMNS = ["site_mgmt_id", "company", "role", "name", "phone", "email", "note"]
+
+# Longest first so "전무이사" wins over "이사"
+TITLES = sorted([
+    "전무이사", "안전관리자", "본부장", "공장장", "소방장", "소방위", "소방교", "연구원", "주무관", "매니저",
+    "대표님", "회장님", "사장님", "사모님", "형수님", "부장", "차장", "과장", "대리", "주임", "사원", "계장",
+    "팀장", "실장", "책임", "선임", "수석", "이사", "상무", "전무", "소장", "사장", "회장", "대표", "원장",
+    "교수", "기사", "반장", "고문", "총무", "경리",
+], key=len, reverse=True)
+
+_SEPARATORS = re.compile(r"\s*-\s*|\s+")
+_PERSON_WITH_TITLE = re.compile(r"([가-힣]{0,4}?)(" + "|".join(TITLES) + r")")
+_PERSON_NAME = re.compile(r"[가-힣]{2,4}")
+_COMPANY_MARKERS = ("(주)", "㈜", "(유)", "주식회사", "소방서", "건설", "상사", "산업", "화학", "설계", "전자")
+
+
+def _is_person_name(token):
+    return bool(_PERSON_NAME.fullmatch(token)) and not any(m in token for m in _COMPANY_MARKERS)
+
+
+def parse_contact_name(text):
+    """
+    Splits a combined contact name into (company, name, title, rest).
+
+        "(주)한국윤활유 양정우부장" -> ("(주)한국윤활유", "양정우", "부장", "")
+        "DH건설-김효섭과장-선진오토" -> ("DH건설", "김효섭", "과장", "선진오토")
+        "용인소방서" -> ("용인소방서", "", "", "")
+    """
+    tokens = [t for t in _SEPARATORS.split(str(text).strip()) if t]
+    if not tokens:
+        return "", "", "", ""
+
+    # The last token that ends in a title is the person ("김효섭과장", or "과장" alone)
+    for i in range(len(tokens) - 1, -1, -1):
+        match = _PERSON_WITH_TITLE.fullmatch(tokens[i])
+        if match:
+            name, title = match.groups()
+            start = i
+            if not name and i >= 2 and _is_person_name(tokens[i - 1]):
+                # "미림텍스-박금도 회장님"
+                name, start = tokens[i - 1], i - 1
+            return " ".join(tokens[:start]), name, title, " ".join(tokens[i + 1:])
+
+    if len(tokens) == 1:
+        return ("", tokens[0], "", "") if _is_person_name(tokens[0]) else (tokens[0], "", "", "")
+
+    first, second = tokens[0], tokens[1]
+    if _is_person_name(second):
+        # "KCI-김다빈"
+        return first, second, "", " ".join(tokens[2:])
+    if _is_person_name(first):
+        # "박미정-서초동김치찌개"
+        return " ".join(tokens[1:]), first, "", ""
+    return first, "", "", " ".join(tokens[1:])
+
+
+def _join_notes(*columns):
+    """Joins non-empty text columns with ' / '."""
+    parts = pd.concat([c.fillna("").astype(str).str.strip() for c in columns], axis=1)
+    return parts.apply(lambda row: " / ".join(v for v in row if v), axis=1, raw=True)
+
+
+def map_export_chunk(chunk):
+    """One chunk of a Google Contacts export -> rows in the contact schema."""
+    chunk = chunk.reindex(columns=EXPORT_COLUMNS)
+    parsed = pd.DataFrame(
+        [parse_contact_name(v) for v in chunk[EXPORT_NAME].fillna("")],
+        columns=["company", "name", "role", "rest"], index=chunk.index,
+    )
+
+    # A phone cell can hold several numbers separated by " ::: "; the first
+    # one becomes the contact's phone, the others go into the note
+    numbers = (chunk[EXPORT_PHONES[0]].fillna("") + " ::: " + chunk[EXPORT_PHONES[1]].fillna(""))
+    numbers = numbers.str.split(r"\s*:::\s*", regex=True).explode().str.strip()
+    numbers = numbers[numbers != ""]
+    formatted = format_phone_series(numbers).groupby(level=0).agg(list).reindex(chunk.index)
+    phone = formatted.str[0].fillna("")
+    other_phones = formatted.str[1:].str.join(", ").fillna("")
+
+    return pd.DataFrame({
+        "site_mgmt_id": "",
+        "company": parsed["company"],
+        "role": parsed["role"],
+        "name": parsed["name"],
+        "phone": phone,
+        "email": chunk[EXPORT_EMAIL].fillna(""),
+        "note": _join_notes(chunk[EXPORT_REMARK], chunk[EXPORT_NOTES], parsed["rest"], other_phones),
+    }, index=chunk.index)
+
+
+def contact_keys(df):
+    """Upsert key: phone digits when present, otherwise company|name."""
+    digits = df["phone"].astype("string").fillna("").str.replace(r"\D", "", regex=True)
+    fallback = df.get("company", pd.Series("", index=df.index)).fillna("").astype(str) + "|" + df["name"].fillna("").astype(str)
+    return digits.where(digits != "", fallback)
+
+
+def upsert_contacts(existing, imported):
+    """
+    Merges imported contacts into the existing frame.
+    Matching rows get their non-empty fields updated; site_mgmt_id is never
+    overwritten. New contacts are appended. Existing row order is kept.
+
+    Returns:
+        (merged, updated, added)
+    """
+    existing = existing.copy(deep=False)
+    for col in CONTACT_COLUMNS:
+        if col not in existing.columns:
+            existing[col] = ""
+    if imported.empty:
+        return existing, 0, 0
+
+    imported = imported.assign(_key=contact_keys(imported)).drop_duplicates("_key", keep="last")
+    existing_keys = contact_keys(existing) if len(existing) else pd.Series(dtype=object)
+    position = pd.Series(range(len(existing)), index=existing_keys.values)
+    position = position[~position.index.duplicated()]
+
+    matched = imported[imported["_key"].isin(position.index)]
+    new_rows = imported[~imported["_key"].isin(position.index)]
+
+    if len(matched):
+        rows = existing.index[position[matched["_key"]].to_numpy()]
+        for col in CONTACT_COLUMNS:
+            if col == "site_mgmt_id":
+                continue
+            values = matched[col].to_numpy()
+            keep = (values != "") & pd.notna(values)
+            if keep.any():
+                column = existing[col].astype(object)
+                column.loc[rows[keep]] = values[keep]
+                existing[col] = column
+
+    if len(new_rows):
+        start = int(existing.index.max()) + 1 if len(existing) else 0
+        appended = new_rows[CONTACT_COLUMNS].set_axis(range(start, start + len(new_rows)))
+        existing = pd.concat([existing, appended])
+    return existing, len(matched), len(new_rows)
+
+
+def import_contacts_csv(source, existing, chunk_rows=CHUNK_ROWS, progress=None):
+    """
+    Streams a Google Contacts CSV export (path or binary file object) in
+    chunks and upserts each chunk into the contacts frame as it is read, so
+    memory beyond the merged frame itself stays at one chunk. A contact that
+    appears again in a later chunk updates the row added for it.
+
+    Args:
+        progress (callable): optional progress(rows_done, fraction_done).
+    Returns:
+        (merged DataFrame, stats dict)
+    """
+    handle = open(source, "rb") if isinstance(source, (str, os.PathLike)) else source
+    try:
+        handle.seek(0, os.SEEK_END)
+        total_bytes = handle.tell() or 1
+        handle.seek(0)
+
+        merged, updated, added, rows_done = existing, 0, 0, 0
+        reader = pd.read_csv(
+            handle, dtype=str, encoding="utf-8-sig", chunksize=chunk_rows,
+            usecols=lambda c: c in EXPORT_COLUMNS, keep_default_na=False,
+        )
+        for chunk in reader:
+            mapped = map_export_chunk(chunk)
+            merged, chunk_updated, chunk_added = upsert_contacts(
+                merged, mapped[(mapped["name"] != "") | (mapped["company"] != "")])
+            updated += chunk_updated
+            added += chunk_added
+            rows_done += len(chunk)
+            del chunk, mapped
+            if progress:
+                progress(rows_done, min(handle.tell() / total_bytes, 1.0))
+    finally:
+        if handle is not source:
+            handle.close()
+
+    if rows_done == 0:
+        merged = upsert_contacts(existing, pd.DataFrame(columns=CONTACT_COLUMNS))[0]
+    if progress:
+        progress(rows_done, 1.0)
+    return merged, {'rows': rows_done, 'updated': updated, 'added': added}
@@ -0,0 +1,127 @@
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.local_paths import local_path
+
+HASH_BLOCK_BYTES = 1024 * 1024
+
+
+def content_md5(data):
+    """md5 hex digest of bytes or a seekable stream, the same hash Drive reports as md5Checksum."""
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        return hashlib.md5(data).hexdigest()
+    digest = hashlib.md5()
+    position = data.tell()
+    data.seek(0)
+    for block in iter(lambda: data.read(HASH_BLOCK_BYTES), b""):
+        digest.update(block)
+    data.seek(position)
+    return digest.hexdigest()
+
+
+class ContentIndex:
+    """
+    Per-folder index of content hashes -> Drive file, stored as JSON.
+
+    Folders are indexed from their Drive listing (md5Checksum) and then kept
+    up to date as files are uploaded, including the hash of the original
+    bytes when an image was recompressed before upload. Hits are checked
+    against the current listing, so files deleted on Drive stop matching.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._folders = {}  # folder id -> {md5: {'id', 'name', 'webViewLink'}}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self._folders = json.load(f)
+
+    def is_indexed(self, folder_id):
+        with self._lock:
+            return folder_id in self._folders
+
+    def index_folder(self, folder_id, files):
+        """Replaces a folder's entries with the hashes in a Drive listing."""
+        entries = {
+            f['md5Checksum']: {'id': f['id'], 'name': f.get('name'), 'webViewLink': f.get('webViewLink')}
+            for f in files if f.get('md5Checksum')
+        }
+        with self._lock:
+            self._folders[folder_id] = entries
+            self._save()
+        return len(entries)
+
+    def merge_listing(self, folder_id, files):
+        """
+        Adds the hashes in a Drive listing that the folder's entries are
+        missing (files uploaded by others since it was indexed), or whose
+        entry points to a file no longer listed. Other entries are kept.
+        Returns the number of hashes added.
+        """
+        live_ids = {f['id'] for f in files}
+        with self._lock:
+            folder = self._folders.setdefault(folder_id, {})
+            added = 0
+            for f in files:
+                md5 = f.get('md5Checksum')
+                entry = folder.get(md5) if md5 else None
+                if md5 and (entry is None or entry['id'] not in live_ids):
+                    folder[md5] = {'id': f['id'], 'name': f.get('name'), 'webViewLink': f.get('webViewLink')}
+                    added += 1
+            if added:
+                self._save()
+        return added
+
+    def lookup(self, folder_id, md5, live_ids=None):
+        """
+        Returns the file entry with this hash in the folder, or None.
+        With live_ids (ids currently in the folder), stale entries are dropped.
+        """
+        with self._lock:
+            entry = self._folders.get(folder_id, {}).get(md5)
+            if entry and live_ids is not None and entry['id'] not in live_ids:
+                self._folders[folder_id] = {k: v for k, v in self._folders[folder_id].items() if v['id'] in live_ids}
+                self._save()
+                return None
+            return entry
+
+    def add(self, folder_id, hashes, file):
+        """Records an uploaded file under one or more content hashes."""
+        entry = {'id': file['id'], 'name': file.get('name'), 'webViewLink': file.get('webViewLink')}
+        with self._lock:
+            folder = self._folders.setdefault(folder_id, {})
+            for md5 in hashes:
+                if md5:
+                    folder[md5] = entry
+            self._save()
+
+    def rebuild(self, list_fn, folder_ids, max_workers=4):
+        """
+        Bulk mode: re-indexes many folders from their listings in parallel.
+
+        Args:
+            list_fn (callable): list_fn(folder_id) -> Drive files with md5Checksum.
+        Returns:
+            dict: folder id -> number of hashes indexed.
+        """
+        folder_ids = list(folder_ids)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            listings = list(executor.map(list_fn, folder_ids))
+        return {fid: self.index_folder(fid, files) for fid, files in zip(folder_ids, listings)}
+
+    def stats(self):
+        with self._lock:
+            return {'folders': len(self._folders), 'hashes': sum(len(f) for f in self._folders.values())}
+
+    def _save(self):
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._folders, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+
+content_index = ContentIndex(local_path("content_index.json"))
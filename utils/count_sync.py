@@ -0,0 +1,124 @@
+import logging
+import threading
+import time
+
+import pandas as pd
+
+from utils.site_index import SITE_KEY
+from utils.api_scheduler import scheduler
+
+logger = logging.getLogger(__name__)
+
+SYNC_INTERVAL_SECONDS = 300
+MAX_BACKOFF_SECONDS = 1800
+# Work_DB 업무형태 values that count as an open issue for the site
+ISSUE_WORK_TYPES = ("이슈", "하자", "민원")
+COUNT_COLUMNS = ('photos', 'issues')
+
+
+def issue_counts(works, issue_types=ISSUE_WORK_TYPES):
+    """Work_DB rows per site whose type mentions one of issue_types; Series indexed by site_mgmt_id."""
+    if works.empty or SITE_KEY not in works.columns or 'type' not in works.columns:
+        return pd.Series(dtype='int64')
+    kind = works['type'].astype(str)
+    is_issue = kind.str.contains("|".join(issue_types), regex=True)
+    return works.loc[is_issue, SITE_KEY].astype(str).value_counts()
+
+
+def apply_counts(master, counts):
+    """
+    Writes new counts into master where they differ from the current value.
+    Sites missing from a count Series keep their value, except issues, which
+    drop to 0 when a site has none.
+
+    Args:
+        counts (dict): column ('photos' / 'issues') -> Series indexed by site_mgmt_id.
+    Returns:
+        (updated master, number of rows changed)
+    """
+    sites = master[SITE_KEY].astype(str)
+    changed = pd.Series(False, index=master.index)
+    updated = master.copy(deep=False)
+    for col, series in counts.items():
+        new = sites.map(series)
+        if col == 'issues':
+            new = new.fillna(0)
+        current = pd.to_numeric(updated[col], errors='coerce') if col in updated.columns else pd.Series(float('nan'), index=master.index)
+        # Typed count columns (Int64) hold pd.NA, and NA != n is NA, not True
+        differs = new.notna() & (current.isna() | (current != new)).fillna(True).astype(bool)
+        if differs.any():
+            column = updated[col].astype(object) if col in updated.columns else pd.Series(0, index=master.index, dtype=object)
+            column[differs] = new[differs].astype(int).to_numpy()
+            if col in updated.columns and isinstance(updated[col].dtype, pd.Int64Dtype):
+                column = column.astype("Int64")
+            updated[col] = column
+            changed |= differs
+    return updated, int(changed.sum())
+
+
+class PeriodicJob(threading.Thread):
+    """
+    Daemon thread that runs fn() every interval seconds, off the UI thread.
+    Failures are logged and retried with exponential backoff; trigger()
+    runs the job early.
+    """
+
+    def __init__(self, name, fn, interval=SYNC_INTERVAL_SECONDS):
+        super().__init__(name=name, daemon=True)
+        self.fn = fn
+        self.interval = interval
+        self.runs = 0
+        self.failures = 0
+        self.last_result = None
+        self.last_error = None
+        self.last_run = None
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+
+    def run(self):
+        delay = self.interval
+        while not self._stopping.is_set():
+            try:
+                with scheduler.background():
+                    self.last_result = self.fn()
+                self.last_error = None
+                delay = self.interval
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e)
+                logger.warning("%s failed: %s", self.name, e)
+                delay = min(max(delay, self.interval) * 2, MAX_BACKOFF_SECONDS)
+            self.runs += 1
+            self.last_run = time.time()
+            self._wake.wait(delay)
+            self._wake.clear()
+
+    def trigger(self):
+        self._wake.set()
+
+    def stop(self):
+        self._stopping.set()
+        self._wake.set()
+
+    def stats(self):
+        return {
+            'runs': self.runs,
+            'failures': self.failures,
+            'last_result': self.last_result,
+            'last_error': self.last_error,
+            'last_run': self.last_run,
+        }
+
+
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+
+def start_job(name, fn, interval=SYNC_INTERVAL_SECONDS):
+    """Starts the named process-wide job once; later calls return the running job."""
+    with _jobs_lock:
+        job = _jobs.get(name)
+        if job is None or not job.is_alive():
+            job = _jobs[name] = PeriodicJob(name, fn, interval)
+            job.start()
+        return job
@@ -0,0 +1,73 @@
+import threading
+import time
+
+# How long a cached entry is trusted before its revision is checked again
+FRESHNESS_CHECK_SECONDS = 10
+
+
+class SharedDataCache:
+    """
+    Process-level cache shared by every Streamlit session.
+
+    Freshness is checked with a cheap revision lookup (the spreadsheet's Drive
+    version/modifiedTime); the full loader only runs when the revision changes
+    or after invalidate(). Loads are serialized so concurrent sessions wait for
+    one reload instead of each starting their own.
+    """
+
+    def __init__(self, check_interval=FRESHNESS_CHECK_SECONDS):
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._value = None
+        self._revision = None
+        self._checked_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, revision_fn, loader):
+        """
+        Returns (value, revision), reloading with loader() only when stale.
+        A loader returning None (failed load) is not cached.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._value is not None and now - self._checked_at < self.check_interval:
+                self.hits += 1
+                return self._value, self._revision
+
+            revision = revision_fn()
+            self._checked_at = now
+            # An unknown revision (lookup failed) keeps serving what we have
+            if self._value is not None and (revision is None or revision == self._revision):
+                self.hits += 1
+                return self._value, self._revision
+
+            self.misses += 1
+            value = loader()
+            if value is not None:
+                self._value, self._revision = value, revision
+            return value, revision
+
+    def invalidate(self):
+        """Drops the cached value so the next get() reloads."""
+        with self._lock:
+            self._value = None
+            self._revision = None
+            self._checked_at = 0.0
+            self.invalidations += 1
+
+    def stats(self):
+        """Hit/miss counters for monitoring."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'hit_rate': self.hits / total if total else 0.0,
+                'revision': self._revision,
+            }
+
+
+shared_data_cache = SharedDataCache()
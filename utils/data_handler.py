@@ -1,6 +1,24 @@
+import io
 import streamlit as st
 import pandas as pd
-from utils.google_api import load_sheet_data, update_sheet_data
+from utils.google_api import load_sheets_batch, save_sheets_diff, write_sheet_diffs, get_sheet_snapshots, get_file_revision, get_drive_service
+from utils.data_cache import shared_data_cache
+from utils.snapshot_store import Snapshot, SessionData
+from utils.business_logic import run_business_logic
+from utils.sheet_diff import frame_to_values, values_to_frame, patch_by_key
+from utils.sqlite_store import GoogleSheetsAdapter, get_local_backend
+from utils.local_paths import local_path
+from utils.contacts_importer import import_contacts_csv
+from utils.xlsx_io import read_workbook, write_workbook, upsert_rows
+from utils.folder_map import site_folder_map
+from utils.drive_handler import resolve_site_folders, count_site_photos
+from utils.drive_listing import folder_listings
+from utils.count_sync import COUNT_COLUMNS, issue_counts, apply_counts, start_job
+from utils.column_schema import COLUMN_TYPES, apply_schema, restore_frame
+from utils.text_search import text_index, TEXT_COLUMNS
+from utils.name_search import name_index, NAME_FIELDS
+from utils.phone import format_phone, format_phone_series, caller_index
+from utils.jurisdiction import fill_jurisdictions
 
 # Keys from Secrets
 SPREADSHEET_ID = st.secrets["connections"]["spreadsheet_id"]
@@ -34,106 +52,355 @@ MASTER_COLUMN_MAPPING = {
 
 REVERSE_MASTER = {v: k for k, v in MASTER_COLUMN_MAPPING.items()}
 # Sub DB Mappings
-CONTACT_MAPPING = {"site_mgmt_id": "관리번호", "role": "직함", "name": "이름", "phone": "연락처", "email": "이메일", "note": "비고"}
+CONTACT_MAPPING = {"site_mgmt_id": "관리번호", "company": "업체명", "role": "직함", "name": "이름", "phone": "연락처", "email": "이메일", "note": "비고"}
 WORK_MAPPING = {"site_mgmt_id": "관리번호", "date": "상담일", "type": "업무형태", "content": "상담내용", "attachment": "첨부파일", "detail": "상세내용"}
 
 REVERSE_CONTACT = {v: k for k, v in CONTACT_MAPPING.items()}
 REVERSE_WORK = {v: k for k, v in WORK_MAPPING.items()}
 
-def load_all_data():
-    """Loads all sheets from Google Sheets."""
-    if 'db_data' in st.session_state:
-        return st.session_state['db_data']
+SHEET_NAMES = {'master': "Master_DB", 'contacts': "연락처_DB", 'works': "Work_DB"}
+SHEET_RENAMES = {"Master_DB": REVERSE_MASTER, "연락처_DB": REVERSE_CONTACT, "Work_DB": REVERSE_WORK}
 
-    data = {'master': pd.DataFrame(), 'contacts': pd.DataFrame(), 'works': pd.DataFrame()}
+# Storage backend: "sheets" (default) talks to Google Sheets directly,
+# "sqlite" reads/writes a local mirror that syncs to Sheets in the background
+STORAGE_BACKEND = st.secrets.get("storage", {}).get("backend", "sheets")
+# Site folders live under this Drive folder, when set
+DRIVE_PARENT_FOLDER_ID = st.secrets.get("drive", {}).get("parent_folder_id")
+# How often the photos/issues counts are recomputed in the background (0 = never)
+COUNT_SYNC_SECONDS = int(st.secrets.get("counts", {}).get("sync_interval", 300))
 
-    # 1. Master DB
-    df_m = load_sheet_data(SPREADSHEET_ID, "Master_DB")
-    if not df_m.empty:
-        df_m = df_m.rename(columns=REVERSE_MASTER)
+def _local_backend():
+    """The process-wide SQLite mirror and its sync worker."""
+    return get_local_backend(
+        local_path("mirror.sqlite3"), lambda: GoogleSheetsAdapter(SPREADSHEET_ID), list(SHEET_NAMES.values())
+    )
+
+def _data_revision():
+    if STORAGE_BACKEND == "sqlite":
+        return _local_backend()[0].revision()
+    return get_file_revision(SPREADSHEET_ID)
+
+def _fetch_frames():
+    """Worksheet name -> renamed DataFrame, plus the raw values each was built from."""
+    names = list(SHEET_NAMES.values())
+    if STORAGE_BACKEND == "sqlite":
+        mirror, _ = _local_backend()
+        sheet_values = {name: mirror.read_values(name) or [] for name in names}
+        frames = {name: values_to_frame(values, SHEET_RENAMES[name]) for name, values in sheet_values.items()}
+        return frames, sheet_values
+
+    # One request for all three sheets, renamed while the frames are built
+    frames = load_sheets_batch(SPREADSHEET_ID, names, renames=SHEET_RENAMES)
+    snapshots = get_sheet_snapshots()
+    return frames, {name: snapshots.get((SPREADSHEET_ID, name)) for name in names}
+
+def _load_snapshot():
+    """Fetches all sheets into a Snapshot (frames plus diff snapshots), or None on failure."""
+    frames, sheet_values = _fetch_frames()
+    if len(frames["Master_DB"].columns) == 0:
+        return None
+    data = {key: frames[name] for key, name in SHEET_NAMES.items()}
+
+    for df in data.values():
         # Ensure site_mgmt_id is string
-        if 'site_mgmt_id' in df_m.columns:
-            df_m['site_mgmt_id'] = df_m['site_mgmt_id'].astype(str)
-        # Defaults
+        if 'site_mgmt_id' in df.columns:
+            df['site_mgmt_id'] = df['site_mgmt_id'].astype(str)
+
+    # Master defaults
+    df_m = data['master']
+    if not df_m.empty:
         for col in ['progress', 'photos', 'issues']:
             if col not in df_m.columns: df_m[col] = 0
-    data['master'] = df_m
-
-    # 2. Contact DB
-    df_c = load_sheet_data(SPREADSHEET_ID, "연락처_DB")
-    if not df_c.empty:
-        df_c = df_c.rename(columns=REVERSE_CONTACT)
-        if 'site_mgmt_id' in df_c.columns:
-            df_c['site_mgmt_id'] = df_c['site_mgmt_id'].astype(str)
-    data['contacts'] = df_c
-
-    # 3. Work DB
-    df_w = load_sheet_data(SPREADSHEET_ID, "Work_DB")
-    if not df_w.empty:
-        df_w = df_w.rename(columns=REVERSE_WORK)
-        if 'site_mgmt_id' in df_w.columns:
-            df_w['site_mgmt_id'] = df_w['site_mgmt_id'].astype(str)
-    data['works'] = df_w
-
-    st.session_state['db_data'] = data
-    return data
-
-def format_phone(phone):
-    """Standardizes phone numbers."""
-    if not isinstance(phone, str): return str(phone) if phone else ""
-    digits = ''.join(filter(str.isdigit, phone))
-    if len(digits) == 11 and digits.startswith("010"):
-        return f"{digits[:3]}-{digits[3:7]}-{digits[7:]}"
-    return phone
+
+    # Compact dtypes (categoricals, Int64 won/counts, datetime64); undone on save
+    formats = {}
+    for key, df in data.items():
+        data[key], formats[key] = apply_schema(df, COLUMN_TYPES.get(key, {}))
+
+    # Only rows added or changed since the last load are re-indexed
+    synced = [text_index.sync(key, data[key], save=False) for key in TEXT_COLUMNS]
+    if any(sum(counts) for counts in synced):
+        text_index.save()
+    for key in NAME_FIELDS:
+        name_index.sync(key, data[key])
+    caller_index.rebuild(data['contacts'])
+
+    return Snapshot(data, sheet_values=sheet_values, column_formats=formats)
+
+def _restored(data, key):
+    """data[key] with its typed columns turned back into sheet cell values."""
+    snapshot = getattr(data, 'snapshot', None)
+    formats = snapshot.column_formats.get(key) if snapshot is not None else None
+    return restore_frame(data[key], formats)
+
+def load_all_data():
+    """
+    Loads all sheets from Google Sheets.
+    One immutable snapshot is cached for the whole process and reloaded only
+    when the spreadsheet's Drive revision changes. Sessions reference it
+    without copying and keep their own edits in a SessionData overlay.
+    """
+    snapshot, _ = shared_data_cache.get(_data_revision, _load_snapshot)
+    if snapshot is None:
+        return st.session_state.get('db_data') or {key: pd.DataFrame() for key in SHEET_NAMES}
+
+    session = st.session_state.get('db_data')
+    if isinstance(session, SessionData) and session.snapshot is snapshot:
+        return session
+
+    if COUNT_SYNC_SECONDS > 0:
+        start_job("count-sync", sync_counts, COUNT_SYNC_SECONDS)
+
+    if isinstance(session, SessionData) and session.is_dirty():
+        # The sheet changed under unsaved edits: keep them on top of the new data
+        session, lost = session.rebase(snapshot)
+        if lost:
+            st.warning(f"다른 사용자가 수정·삭제한 행이 있어 저장하지 않은 변경 {len(lost)}건을 적용하지 못했습니다.")
+    else:
+        session = SessionData(snapshot)
+    get_sheet_snapshots().update(
+        {(SPREADSHEET_ID, name): values for name, values in snapshot.sheet_values.items() if values is not None}
+    )
+    st.session_state['db_data'] = session
+    return session
 
 def apply_business_logic(data):
-    """Applies Auto-Status and Financial Calculations."""
-    df_m = data['master']
-    for idx, row in df_m.iterrows():
-        sid = str(row.get('site_mgmt_id', ''))
-        # Auto-Status
-        if '-' in sid and len(sid.split('-')) == 2:
-            df_m.at[idx, 'status'] = '진행중'
-        elif len(sid) == 6 and sid.isdigit():
-            df_m.at[idx, 'status'] = '견적중'
-            
-        # Financials
-        try:
-            contract = float(str(row.get('contract_price', 0)).replace(',', '') or 0)
-            vat = contract * 0.1
-            total = contract + vat
-            down = float(str(row.get('down_payment', 0)).replace(',', '') or 0)
-            interim = float(str(row.get('interim_payment', 0)).replace(',', '') or 0)
-            balance = total - (down + interim)
-            
-            df_m.at[idx, 'vat'] = vat
-            df_m.at[idx, 'contract_amount'] = total
-            df_m.at[idx, 'balance_payment'] = balance
-        except: pass
-    data['master'] = df_m
-    return data
+    """
+    Applies Auto-Status, Financial Calculations and jurisdictions.
+    Returns the computed master frame; data is left as it is, since the
+    results are derived values written at save time, not user edits.
+    """
+    df_m, failed = run_business_logic(data['master'])
+    if failed.any():
+        ids = df_m.loc[failed, 'site_mgmt_id'] if 'site_mgmt_id' in df_m.columns else df_m.index[failed]
+        st.warning(f"금액 형식을 확인할 수 없는 현장이 있어 계산을 건너뛰었습니다: {', '.join(map(str, ids))}")
+    df_m, _, mismatched = fill_jurisdictions(df_m)
+    if mismatched.any():
+        names = df_m.loc[mismatched, 'site_name'] if 'site_name' in df_m.columns else df_m.index[mismatched]
+        st.warning(f"관할서가 주소와 다른 현장이 있습니다: {', '.join(map(str, names))}")
+    return df_m
 
 def save_all_data(data):
-    """Saves data back to Google Sheets."""
-    data = apply_business_logic(data)
-    st.session_state['db_data'] = data
-    
+    """
+    Saves data back to Google Sheets. Only the cells the session changed
+    since its snapshot are written; afterwards the session starts over,
+    clean, on the reloaded data.
+    """
+    snapshot = getattr(data, 'snapshot', None)
+    formats = snapshot.column_formats.get('master') if snapshot is not None else None
+
     # 1. Master
-    df_m = data['master'].copy()
-    df_m = df_m.rename(columns=MASTER_COLUMN_MAPPING)
-    update_sheet_data(SPREADSHEET_ID, "Master_DB", df_m)
-    
+    df_m = restore_frame(apply_business_logic(data), formats).rename(columns=MASTER_COLUMN_MAPPING)
+
     # 2. Contacts
-    df_c = data['contacts'].copy()
+    df_c = _restored(data, 'contacts')
     if 'phone' in df_c.columns:
-        df_c['phone'] = df_c['phone'].apply(format_phone)
-    df_c = df_c.rename(columns={v: k for k, v in CONTACT_MAPPING.items() if k in df_c.columns})
-    update_sheet_data(SPREADSHEET_ID, "연락처_DB", df_c)
-    
+        df_c = df_c.assign(phone=format_phone_series(df_c['phone']))
+    df_c = df_c.rename(columns=CONTACT_MAPPING)
+
     # 3. Work
-    df_w = data['works'].copy()
-    df_w = df_w.rename(columns={v: k for k, v in WORK_MAPPING.items() if k in df_w.columns})
-    update_sheet_data(SPREADSHEET_ID, "Work_DB", df_w)
+    df_w = _restored(data, 'works').rename(columns=WORK_MAPPING)
+
+    frames = {"Master_DB": df_m, "연락처_DB": df_c, "Work_DB": df_w}
+    # Diffed against what this session loaded, so other users' changes stay
+    bases = snapshot.sheet_values if snapshot is not None else {}
+    if STORAGE_BACKEND == "sqlite":
+        # Only the cells this session changed are written locally, as on
+        # the Sheets path; the sync worker pushes the diff to Sheets
+        mirror, worker = _local_backend()
+        written = [name for name, df in frames.items()
+                   if len(df.columns) > 0 and mirror.apply_diff(name, bases.get(name), frame_to_values(df))]
+        if written:
+            worker.notify()
+    else:
+        # Only changed cells are sent, in one request for all three sheets
+        written = save_sheets_diff(SPREADSHEET_ID, frames, bases)
+    if written:
+        # Other sessions pick up the change on their next load
+        shared_data_cache.invalidate()
+    # This session drops its overlay and continues from the saved data
+    st.session_state.pop('db_data', None)
+    load_all_data()
+
+def _photo_counts(master):
+    """Photos per site (Series by site_mgmt_id) from the cached Drive folder listings."""
+    sites = list(zip(master['site_mgmt_id'].astype(str), master.get('site_name', master['site_mgmt_id']).astype(str)))
+    folders, missing = {}, []
+    for site_id, name in sites:
+        folder_id = site_folder_map.get(name, DRIVE_PARENT_FOLDER_ID, site_id)
+        if folder_id:
+            folders[site_id] = folder_id
+        else:
+            missing.append((site_id, name))
+    if missing:
+        found = resolve_site_folders([n for _, n in missing], DRIVE_PARENT_FOLDER_ID, [s for s, _ in missing])
+        folders.update({site_id: found[name] for site_id, name in missing if name in found})
+    counts = {site_id: count_site_photos(folder_id) for site_id, folder_id in folders.items()}
+
+    # Folders found deleted while counting were forgotten; look those sites up again
+    gone = [(site_id, name) for site_id, name in sites if folder_listings.is_gone(folders.get(site_id))]
+    if gone:
+        found = resolve_site_folders([n for _, n in gone], DRIVE_PARENT_FOLDER_ID, [s for s, _ in gone])
+        counts.update({site_id: count_site_photos(found[name]) if name in found else 0 for site_id, name in gone})
+    return pd.Series(counts, dtype='int64')
+
+def sync_counts():
+    """
+    Recomputes the photos and issues columns of Master_DB for every site and
+    writes only the rows whose counts changed, matched by 관리번호.
+    Runs on the count-sync background thread.
+    Returns the number of rows updated.
+    """
+    snapshot, revision = shared_data_cache.get(_data_revision, _load_snapshot)
+    if snapshot is None:
+        return 0
+    master = snapshot.frames['master']
+    if master.empty or 'site_mgmt_id' not in master.columns:
+        return 0
+
+    counts = {'issues': issue_counts(snapshot.frames['works'])}
+    if get_drive_service():
+        counts['photos'] = _photo_counts(master)
+    updated, changed = apply_counts(master, counts)
+    if not changed:
+        return 0
+
+    updated = restore_frame(updated, snapshot.column_formats.get('master'))
+    columns = [c for c in COUNT_COLUMNS if c in updated.columns]
+    patches = {
+        str(site_id): {MASTER_COLUMN_MAPPING[c]: v for c, v in zip(columns, row)}
+        for site_id, *row in updated[['site_mgmt_id'] + columns].itertuples(index=False, name=None)
+    }
+    if STORAGE_BACKEND == "sqlite":
+        # Counting took a while: the count cells of the rows stored now are
+        # set by 관리번호, in one mirror transaction, so saves made meanwhile are kept
+        mirror, worker = _local_backend()
+        written = mirror.patch_rows("Master_DB", patches)
+        if written:
+            worker.notify()
+    else:
+        base = snapshot.sheet_values.get("Master_DB")
+        if not base or _data_revision() != revision:
+            # The sheet changed while counting; the next run counts again
+            return 0
+        values, written = patch_by_key(base, MASTER_COLUMN_MAPPING['site_mgmt_id'], patches)
+        # Diffed against the loaded values, so only the count cells are sent
+        if written and not write_sheet_diffs(SPREADSHEET_ID, {"Master_DB": (base, values)}):
+            return 0
+    if written:
+        shared_data_cache.invalidate()
+    return written
+
+def get_site_bundle(site_id):
+    """Returns one site's master row, contacts and work logs via the per-site index."""
+    data = load_all_data()
+    if isinstance(data, SessionData):
+        return data.site_bundle(site_id)
+    return {'master': None, 'contacts': pd.DataFrame(), 'works': pd.DataFrame()}
+
+def search_text(query, limit=20):
+    """
+    Full-text search over 상담내용/상세내용 (Work_DB) and 비고 (연락처_DB).
+    Matches come from the saved data (see TextIndex); the text shown is
+    this session's, and rows it deleted are left out.
+
+    Returns:
+        DataFrame of hits, best first: table, site_mgmt_id, site_name, text, score.
+    """
+    data = load_all_data()
+    master = data['master']
+    names = master.set_index('site_mgmt_id')['site_name'] if {'site_mgmt_id', 'site_name'} <= set(master.columns) else pd.Series(dtype=object)
+    names = names[~names.index.duplicated()]
+    rows = []
+    for hit in text_index.search(query, limit):
+        df = data[hit['table']]
+        if hit['row'] not in df.index:
+            continue
+        row = df.loc[hit['row']]
+        text = " / ".join(str(row[c]) for c in TEXT_COLUMNS[hit['table']] if c in row.index and str(row[c]))
+        rows.append({'table': hit['table'], 'site_mgmt_id': hit['site_mgmt_id'],
+                     'site_name': names.get(hit['site_mgmt_id'], ""), 'text': text, 'score': hit['score']})
+    return pd.DataFrame(rows, columns=['table', 'site_mgmt_id', 'site_name', 'text', 'score'])
+
+def search_names(query, limit=20):
+    """
+    Finds sites and contacts by name, infix or initial consonants
+    ("윤활", "ㅎㄱㅇㅎㅇ" -> 한국윤활유). Names are matched as saved
+    (see NameIndex), not with this session's unsaved edits.
+
+    Returns:
+        DataFrame of hits, best first: table, field, value, site_mgmt_id.
+    """
+    load_all_data()
+    hits = name_index.search(query, limit)
+    return pd.DataFrame(hits, columns=['table', 'field', 'value', 'site_mgmt_id'])
+
+def lookup_caller(number):
+    """
+    Matches an incoming call to contacts and sites, whatever the number's format.
+
+    Returns:
+        (contacts DataFrame, list of site_mgmt_ids)
+    """
+    data = load_all_data()
+    match = caller_index.lookup(number)
+    contacts = data['contacts']
+    return contacts.loc[[r for r in match['rows'] if r in contacts.index]], match['sites']
+
+def import_contacts(source):
+    """
+    Imports a Google Contacts CSV export (path or uploaded file) into 연락처_DB.
+    Rows are streamed in chunks with a progress bar and upserted in one save.
+    """
+    data = load_all_data()
+    bar = st.progress(0.0, text="연락처 가져오는 중...")
+    merged, stats = import_contacts_csv(
+        source, data['contacts'],
+        progress=lambda rows, fraction: bar.progress(fraction, text=f"연락처 {rows:,}건 처리 중..."),
+    )
+    data['contacts'] = merged
+    save_all_data(data)
+    bar.empty()
+    st.success(f"연락처 {stats['rows']:,}건 처리: 신규 {stats['added']:,}건, 갱신 {stats['updated']:,}건")
+    return stats
+
+def import_workbook(source):
+    """
+    Imports a data.xlsx-style workbook (read-only streaming).
+    Master_DB rows are upserted by 관리번호; Work_DB rows not already present are appended.
+    """
+    sheets = read_workbook(source, renames=SHEET_RENAMES)
+    data = load_all_data()
+    dropped = []
+    master = sheets.get("Master_DB")
+    if master is not None and 'site_mgmt_id' in master.columns:
+        existing = _restored(data, 'master')
+        master, extra = _schema_columns(master, existing, MASTER_COLUMN_MAPPING)
+        dropped += [f"Master_DB.{c}" for c in extra]
+        master['site_mgmt_id'] = master['site_mgmt_id'].astype(str)
+        data['master'] = upsert_rows(existing, master)
+    works = sheets.get("Work_DB")
+    if works is not None and not works.empty:
+        existing = _restored(data, 'works')
+        works, extra = _schema_columns(works, existing, WORK_MAPPING)
+        dropped += [f"Work_DB.{c}" for c in extra]
+        combined = pd.concat([existing, works], ignore_index=True).fillna("")
+        data['works'] = combined[~combined.astype(str).duplicated()]
+    if dropped:
+        st.warning(f"시트에 없는 열은 가져오지 않았습니다: {', '.join(map(str, dropped))}")
+    save_all_data(data)
+
+def _schema_columns(incoming, existing, mapping):
+    """incoming limited to the sheet's known columns; returns (frame, dropped column names)."""
+    known = set(existing.columns) | set(mapping)
+    dropped = [c for c in incoming.columns if c not in known]
+    return incoming.drop(columns=dropped), dropped
+
+def export_workbook():
+    """Returns the three DataFrames as an .xlsx file (BytesIO), written in write-only mode."""
+    data = load_all_data()
+    headers = {"Master_DB": MASTER_COLUMN_MAPPING, "연락처_DB": CONTACT_MAPPING, "Work_DB": WORK_MAPPING}
+    return write_workbook({name: _restored(data, key) for key, name in SHEET_NAMES.items()}, io.BytesIO(), headers=headers)
 
 def load_site_data(): return load_all_data()['master']
 def save_site_data(df): 
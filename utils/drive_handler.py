@@ -1,61 +1,130 @@
+import io
+import os
+import re
+
 import streamlit as st
 import pandas as pd
-from utils.google_api import get_google_creds
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
-
-def get_drive_service():
-    """Returns the Google Drive service resource."""
-    creds = get_google_creds()
-    if not creds:
-        return None
-    return build('drive', 'v3', credentials=creds)
+import requests
+from utils.google_api import get_drive_service, fetch_drive_url
+from utils.folder_map import site_folder_map
+from utils.drive_listing import FolderGone, escape_query_value, list_all, list_folder, folder_listings
+from utils.drive_upload import upload_files
+from utils.content_index import content_index, content_md5
+from utils.thumbnail_cache import THUMBNAIL_EDGE, is_photo, thumbnail_cache
+from utils.image_prep import (
+    MAX_EDGE, JPEG_QUALITY, KEEP_EXIF, is_supported, prepare_images, summarize,
+)
 
-def get_site_folder_id(site_name, parent_folder_id=None):
+FOLDER_MIME_TYPE = 'application/vnd.google-apps.folder'
+# Names combined into one files().list query when there is no parent folder
+NAMES_PER_QUERY = 40
+
+def list_site_folders(parent_folder_id):
+    """Lists every folder under a parent in one paginated listing; returns {name: folder id}."""
+    service = get_drive_service()
+    if not service:
+        return {}
+
+    query = f"mimeType='{FOLDER_MIME_TYPE}' and '{escape_query_value(parent_folder_id)}' in parents and trashed=false"
+    try:
+        folders = {}
+        for f in list_all(service, query):
+            folders.setdefault(f['name'], f['id'])
+        return folders
+    except Exception as e:
+        st.error(f"Error listing Google Drive folders: {e}")
+        return {}
+
+def resolve_site_folders(site_names, parent_folder_id=None, site_ids=None):
+    """
+    Resolves the folders of many sites at once and stores them in the site folder map.
+    With a parent folder this is a single paginated listing; otherwise the
+    names are combined into OR queries of NAMES_PER_QUERY names each.
+
+    Args:
+        site_names (list): site names to resolve.
+        site_ids (list): optional site_mgmt_id for each name.
+    Returns:
+        dict: site_name -> folder id, for the folders that exist.
+    """
+    site_names = [str(n) for n in site_names]
+    if parent_folder_id:
+        found = list_site_folders(parent_folder_id)
+    else:
+        service = get_drive_service()
+        if not service:
+            return {}
+        found = {}
+        try:
+            for i in range(0, len(site_names), NAMES_PER_QUERY):
+                names = site_names[i:i + NAMES_PER_QUERY]
+                clauses = " or ".join(f"name='{escape_query_value(n)}'" for n in names)
+                for f in list_all(service, f"mimeType='{FOLDER_MIME_TYPE}' and trashed=false and ({clauses})"):
+                    found.setdefault(f['name'], f['id'])
+        except Exception as e:
+            st.error(f"Error searching Google Drive: {e}")
+
+    sites = {}
+    if site_ids is not None:
+        sites = {sid: found[name] for name, sid in zip(site_names, site_ids) if sid and name in found}
+    site_folder_map.update(found, parent_folder_id, sites)
+    return {name: found[name] for name in site_names if name in found}
+
+def get_site_folder_id(site_name, parent_folder_id=None, site_mgmt_id=None):
     """
     Searches for a folder with the site name.
     If parent_folder_id is provided, searches within that folder.
+    Known folders are answered from the site folder map without a Drive call,
+    unless they were found deleted since; those are forgotten and searched again.
     """
+    cached = site_folder_map.get(site_name, parent_folder_id, site_mgmt_id)
+    if cached and not folder_listings.is_gone(cached):
+        return cached
+    if cached:
+        site_folder_map.forget(cached)
+
     service = get_drive_service()
     if not service:
         return None
 
-    query = f"mimeType='application/vnd.google-apps.folder' and name='{site_name}' and trashed=false"
+    query = f"mimeType='{FOLDER_MIME_TYPE}' and name='{escape_query_value(site_name)}' and trashed=false"
     if parent_folder_id:
-        query += f" and '{parent_folder_id}' in parents"
+        query += f" and '{escape_query_value(parent_folder_id)}' in parents"
 
     try:
         results = service.files().list(q=query, fields="files(id, name, webViewLink)").execute()
         files = results.get('files', [])
         if files:
+            site_folder_map.set(files[0]['id'], site_name, parent_folder_id, site_mgmt_id)
             return files[0]['id']
         return None
     except Exception as e:
         st.error(f"Error searching Google Drive: {e}")
         return None
 
-def create_site_folder(site_name, parent_folder_id=None):
-    """Creates a new folder for the site."""
+def create_site_folder(site_name, parent_folder_id=None, site_mgmt_id=None):
+    """Creates a new folder for the site and records it in the site folder map."""
     service = get_drive_service()
     if not service:
         return None
 
     file_metadata = {
         'name': site_name,
-        'mimeType': 'application/vnd.google-apps.folder'
+        'mimeType': FOLDER_MIME_TYPE
     }
     if parent_folder_id:
         file_metadata['parents'] = [parent_folder_id]
 
     try:
         file = service.files().create(body=file_metadata, fields='id').execute()
+        site_folder_map.set(file.get('id'), site_name, parent_folder_id, site_mgmt_id)
         return file.get('id')
     except Exception as e:
         st.error(f"Error creating folder: {e}")
         return None
 
 def list_files_in_folder(folder_id):
-    """Lists all files in a specific folder."""
+    """Lists all files in a specific folder (cached, see drive_listing.FolderListingCache)."""
     service = get_drive_service()
     if not service:
         # Return mock files if no service (for demo)
@@ -65,33 +134,187 @@ def list_files_in_folder(folder_id):
             {"name": "Site_Photo_01.jpg", "mimeType": "image/jpeg", "webViewLink": "#"},
         ]
 
-    query = f"'{folder_id}' in parents and trashed=false"
     try:
-        results = service.files().list(q=query, fields="files(id, name, mimeType, webViewLink, iconLink)").execute()
-        return results.get('files', [])
+        # Full paginated listing on first use, then refreshed from the changes feed
+        return folder_listings.list(service, folder_id)
+    except FolderGone:
+        # Deleted or trashed: the site's folder is looked up again next time
+        site_folder_map.forget(folder_id)
+        return []
     except Exception as e:
         st.error(f"Error listing files: {e}")
         return []
 
+def list_site_photos(folder_id):
+    """The photos in a site folder, from the cached listing."""
+    return [f for f in list_files_in_folder(folder_id) if is_photo(f) and f.get('id')]
+
+def count_site_photos(folder_id):
+    """Number of photos in a site folder (the Master_DB photos column)."""
+    return len(list_site_photos(folder_id))
+
+def fetch_photo_preview(file):
+    """Image bytes to build a thumbnail from: Drive's own thumbnail when there is one, else the file."""
+    link = file.get('thumbnailLink')
+    if link:
+        try:
+            content = fetch_drive_url(re.sub(r"=s\d+$", f"=s{THUMBNAIL_EDGE}", link))
+            if content:
+                return content
+        except requests.HTTPError:
+            pass  # Expired or missing thumbnail: use the file itself
+    return get_drive_service().files().get_media(fileId=file['id']).execute()
+
+def get_site_gallery(folder_id):
+    """
+    Photos in a site folder with a local 'thumbnail' path each.
+    Thumbnails come from the disk cache; missing ones are fetched in parallel.
+    """
+    photos = list_site_photos(folder_id)
+    if not photos or not get_drive_service():
+        return photos
+    paths = thumbnail_cache.get_many(photos, fetch_photo_preview)
+    return [dict(f, thumbnail=paths.get(f['id'])) for f in photos]
+
 def upload_file_to_drive(file_obj, folder_id):
-    """Uploads a Streamlit file object to Google Drive."""
+    """
+    Uploads a Streamlit file object to Google Drive.
+    Returns its webViewLink (the existing file's for a duplicate), or None.
+    """
+    results = upload_files_to_drive([file_obj], folder_id)
+    return results[0]['webViewLink'] if results else None
+
+def _upload_settings():
+    """[uploads] settings: optimize_images, max_edge, quality, keep_exif."""
+    try:
+        return dict(st.secrets.get("uploads", {}))
+    except Exception:
+        return {}
+
+def optimize_images(items, settings):
+    """
+    Downscales and recompresses the images among (name, bytes, mimetype)
+    items before upload; other files pass through unchanged.
+    """
+    items = list(items)
+    todo = [i for i, (name, _, mimetype) in enumerate(items) if is_supported(name, mimetype)]
+    if not todo:
+        return items
+
+    with st.spinner(f"Optimizing {len(todo)} images..."):
+        results = prepare_images(
+            [items[i][:2] for i in todo],
+            max_edge=int(settings.get("max_edge", MAX_EDGE)),
+            quality=int(settings.get("quality", JPEG_QUALITY)),
+            keep_exif=bool(settings.get("keep_exif", KEEP_EXIF)),
+        )
+    for i, r in zip(todo, results):
+        if r['error']:
+            st.warning(f"Image kept as-is ({r['name']}): {r['error']}")
+        else:
+            items[i] = (r['name'], r['data'], r['mimetype'] or items[i][2])
+
+    total = summarize(results)
+    if total['original_bytes']:
+        st.caption(
+            f"Images: {total['original_bytes'] / 2**20:.1f} → {total['bytes'] / 2**20:.1f} MiB "
+            f"({total['saved_bytes'] / total['original_bytes']:.0%} saved, "
+            f"{total['seconds'] / len(results):.2f}s per image)"
+        )
+    return items
+
+def find_duplicates(folder_id, hashes):
+    """
+    Looks content hashes up in the folder's dedup index, after merging in
+    any files from its (cached) listing that the index does not have yet,
+    such as uploads by other users. Returns {md5: existing file}.
+    """
     service = get_drive_service()
-    if not service:
-        return False
-
-    file_metadata = {'name': file_obj.name, 'parents': [folder_id]}
-    # Note: Direct upload like this works for small files. For large files, use resumable upload.
-    # Streamlit UploadedFile is a BytesIO-like object.
-    
-    # We need to save it temporarily to disk or wrap it for MediaFileUpload
-    # For simplicity in this demo, we assume small files or improve later.
-    # Google API expects a file path or a stream.
-    
+    files = folder_listings.list(service, folder_id)
+    content_index.merge_listing(folder_id, files)
+    live_ids = {f['id'] for f in files}
+    found = {}
+    for md5 in set(hashes):
+        entry = content_index.lookup(folder_id, md5, live_ids)
+        if entry:
+            found[md5] = entry
+    return found
+
+def rebuild_content_index(folder_ids, max_workers=4):
+    """Bulk rebuild: re-lists the given folders in parallel and re-indexes their hashes."""
     try:
-        # Basic implementation: requires saving to temp file or using MediaIoBaseUpload
-        # For now, just logging the intent
-        st.info("Upload logic to be implemented with MediaIoBaseUpload for functionality.")
-        return True
+        return content_index.rebuild(lambda fid: list_folder(get_drive_service(), fid), folder_ids, max_workers)
     except Exception as e:
-        st.error(f"Upload error: {e}")
-        return False
+        st.error(f"Error indexing Google Drive folders: {e}")
+        return {}
+
+def upload_files_to_drive(files, folder_id, optimize=None):
+    """
+    Uploads many Streamlit file objects to a Drive folder in parallel
+    resumable sessions, with a progress bar for the whole batch.
+    Files whose content is already in the folder are not uploaded again;
+    the existing file is returned instead (with duplicate=True).
+    Images are downscaled first when optimize (default: the
+    uploads.optimize_images setting) is on and Pillow is installed.
+    Returns the files as {name, id, webViewLink, duplicate} dicts.
+    """
+    if not files:
+        return []
+    if not get_drive_service():
+        st.error("Google Drive is not configured.")
+        return []
+
+    items = [(os.path.basename(f.name), f.getvalue(), getattr(f, 'type', None)) for f in files]
+    hashes = [content_md5(data) for _, data, _ in items]
+    try:
+        existing = find_duplicates(folder_id, hashes)
+    except Exception as e:
+        st.warning(f"Duplicate check skipped: {e}")
+        existing = {}
+
+    uploaded, pending, pending_hashes, repeats = [], [], [], []
+    for item, md5 in zip(items, hashes):
+        if md5 in existing:
+            uploaded.append({'name': item[0], 'id': existing[md5]['id'],
+                             'webViewLink': existing[md5]['webViewLink'], 'duplicate': True})
+        elif md5 in pending_hashes:
+            repeats.append((item[0], md5))
+        else:
+            pending.append(item)
+            pending_hashes.append(md5)
+    if uploaded:
+        st.info(f"{len(uploaded)} file(s) already in this folder; using the existing copies.")
+    if not pending:
+        return uploaded
+
+    settings = _upload_settings()
+    if optimize is None:
+        optimize = bool(settings.get("optimize_images", False))
+    if optimize:
+        pending = optimize_images(pending, settings)
+
+    bar = st.progress(0.0, text="Uploading...")
+
+    def show(snapshot):
+        bar.progress(snapshot['fraction'], text=(
+            f"Uploading {snapshot['finished']}/{len(snapshot['files'])} files "
+            f"({snapshot['sent'] / 2**20:.1f}/{snapshot['total'] / 2**20:.1f} MiB)"
+        ))
+
+    results = upload_files([(name, io.BytesIO(data), mimetype) for name, data, mimetype in pending],
+                           folder_id, progress=show)
+    bar.empty()
+    for r, (_, data, _), original_md5 in zip(results, pending, pending_hashes):
+        if r['error']:
+            st.error(f"Upload error ({r['name']}): {r['error']}")
+            continue
+        content_index.add(folder_id, {original_md5, content_md5(data)}, r)
+        uploaded.append({'name': r['name'], 'id': r['id'], 'webViewLink': r['webViewLink'], 'duplicate': False})
+        existing[original_md5] = r
+    # The same content picked twice in one batch is uploaded once
+    for name, md5 in repeats:
+        if md5 in existing:
+            uploaded.append({'name': name, 'id': existing[md5]['id'],
+                             'webViewLink': existing[md5]['webViewLink'], 'duplicate': True})
+    folder_listings.invalidate(folder_id)
+    return uploaded
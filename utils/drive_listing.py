@@ -0,0 +1,230 @@
+import json
+import os
+import threading
+import time
+
+from utils.api_scheduler import error_status
+from utils.local_paths import local_path
+
+# Only what the site pages show, plus modifiedTime to tell versions apart
+# and md5Checksum for the duplicate-upload check
+LISTING_FIELDS = "id, name, mimeType, webViewLink, iconLink, thumbnailLink, modifiedTime, md5Checksum"
+CHANGE_FIELDS = f"nextPageToken, newStartPageToken, changes(fileId, removed, file({LISTING_FIELDS}, parents, trashed))"
+PAGE_SIZE = 1000
+# How long cached listings are served before the changes feed is checked again
+CHANGES_CHECK_SECONDS = 15
+
+
+def escape_query_value(value):
+    """Escapes a value for use inside a quoted Drive query string."""
+    return str(value).replace('\\', '\\\\').replace("'", "\\'")
+
+
+def list_all(service, query, fields="id, name"):
+    """Runs a files().list query across every result page."""
+    files, page_token = [], None
+    while True:
+        results = service.files().list(
+            q=query, fields=f"nextPageToken, files({fields})", pageSize=PAGE_SIZE, pageToken=page_token
+        ).execute()
+        files += results.get('files', [])
+        page_token = results.get('nextPageToken')
+        if not page_token:
+            return files
+
+
+def list_folder(service, folder_id, fields=LISTING_FIELDS):
+    """Lists every file in a folder."""
+    return list_all(service, f"'{escape_query_value(folder_id)}' in parents and trashed=false", fields)
+
+
+def folder_exists(service, folder_id):
+    """False if the folder was deleted (404) or is in the trash."""
+    try:
+        return not service.files().get(fileId=folder_id, fields="id, trashed").execute().get('trashed')
+    except Exception as e:
+        if error_status(e) == 404:
+            return False
+        raise
+
+
+class FolderGone(Exception):
+    """Raised when a listed folder was deleted or trashed."""
+
+    def __init__(self, folder_id):
+        super().__init__(f"Folder {folder_id} no longer exists")
+        self.folder_id = folder_id
+
+
+class FolderListingCache:
+    """
+    Per-folder Drive listings kept current through the changes feed.
+
+    A folder is listed in full once. After that, one changes().list call
+    (starting from the saved start-page token) brings every cached folder up
+    to date: added, renamed, moved, trashed and deleted files are applied to
+    the stored listings. Listings and the token are persisted, so a restart
+    resumes from the token instead of listing again.
+
+    Listing a folder that was deleted or trashed raises FolderGone. Drive is
+    only called outside the lock; the results are swapped in under it.
+    """
+
+    def __init__(self, path, check_interval=CHANGES_CHECK_SECONDS):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._folders = {}  # folder id -> {file id: file}
+        self._token = None
+        self._gone = set()  # folder ids found deleted or trashed
+        self._listing = {}  # folder id being listed -> changes seen meanwhile
+        self._checked_at = 0.0
+        self.full_listings = 0
+        self.change_polls = 0
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                stored = json.load(f)
+            self._folders = stored.get("folders", {})
+            self._token = stored.get("token")
+
+    def list(self, service, folder_id):
+        """Returns the files in folder_id, sorted by name."""
+        self._refresh(service)
+        with self._lock:
+            if folder_id in self._gone:
+                raise FolderGone(folder_id)
+            if folder_id in self._folders:
+                return self._sorted(folder_id)
+            need_token = self._token is None
+            # Changes polled while the listing is in flight are kept for it
+            self._listing.setdefault(folder_id, [])
+
+        try:
+            # Take the token first so changes made during the listing are replayed
+            token = self._start_token(service) if need_token else None
+            # Listing a deleted folder's id gives no files rather than an error
+            if not folder_exists(service, folder_id):
+                with self._lock:
+                    self._gone.add(folder_id)
+                raise FolderGone(folder_id)
+            files = list_folder(service, folder_id)
+        except Exception:
+            with self._lock:
+                self._listing.pop(folder_id, None)
+            raise
+
+        with self._lock:
+            missed = self._listing.pop(folder_id, [])
+            if token is not None and self._token is None:
+                self._token = token
+                self._checked_at = time.monotonic()
+            if folder_id not in self._folders:
+                listing = {f['id']: f for f in files}
+                self._folders[folder_id] = listing
+                for change in missed:
+                    self._apply(change, {folder_id: listing})
+                self.full_listings += 1
+                self._save()
+            if folder_id in self._gone:
+                raise FolderGone(folder_id)
+            return self._sorted(folder_id)
+
+    def invalidate(self, folder_id=None):
+        """Forgets one folder (or all of them) so the next list() lists in full."""
+        with self._lock:
+            if folder_id is None:
+                self._folders, self._token = {}, None
+            else:
+                self._folders.pop(folder_id, None)
+                self._gone.discard(folder_id)
+            self._checked_at = 0.0
+            self._save()
+
+    def is_gone(self, folder_id):
+        """True once folder_id was found deleted or trashed."""
+        with self._lock:
+            return folder_id in self._gone
+
+    def stats(self):
+        with self._lock:
+            return {
+                'folders': len(self._folders),
+                'files': sum(len(f) for f in self._folders.values()),
+                'full_listings': self.full_listings,
+                'change_polls': self.change_polls,
+            }
+
+    def _sorted(self, folder_id):
+        return sorted(self._folders[folder_id].values(), key=lambda f: f.get('name', ''))
+
+    @staticmethod
+    def _start_token(service):
+        return service.changes().getStartPageToken().execute().get('startPageToken')
+
+    def _refresh(self, service):
+        """Applies pending changes to the cached folders, at most every check_interval."""
+        now = time.monotonic()
+        with self._lock:
+            if self._token is None or not self._folders or now - self._checked_at < self.check_interval:
+                return
+            self._checked_at = now
+            self.change_polls += 1
+            start = self._token
+
+        token, changes = start, []
+        while token:
+            results = service.changes().list(
+                pageToken=token, fields=CHANGE_FIELDS, pageSize=PAGE_SIZE,
+                includeRemoved=True, spaces="drive",
+            ).execute()
+            changes += results.get('changes', [])
+            if 'newStartPageToken' in results:
+                token = results['newStartPageToken']
+                break
+            token = results.get('nextPageToken')
+
+        with self._lock:
+            if self._token != start:
+                # Another refresh or an invalidate() got there first
+                return
+            changed = False
+            for change in changes:
+                changed |= self._apply(change)
+                for missed in self._listing.values():
+                    missed.append(change)
+            if token:
+                self._token = token
+            if changed or token != start:
+                self._save()
+
+    def _apply(self, change, folders=None):
+        """Updates every cached folder (or just those in folders) affected by one change; True if any was."""
+        file_id = change.get('fileId')
+        file = change.get('file') or {}
+        gone = change.get('removed') or file.get('trashed')
+        parents = set() if gone else set(file.get('parents', []))
+        entry = {k: v for k, v in file.items() if k not in ('parents', 'trashed')}
+
+        changed = False
+        if gone and file_id in self._folders:
+            # A cached folder itself was deleted or trashed
+            del self._folders[file_id]
+            self._gone.add(file_id)
+            changed = True
+        for folder_id, files in (self._folders if folders is None else folders).items():
+            if folder_id in parents:
+                files[file_id] = entry
+                changed = True
+            elif file_id in files:
+                del files[file_id]
+                changed = True
+        return changed
+
+    def _save(self):
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"token": self._token, "folders": self._folders}, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+
+folder_listings = FolderListingCache(local_path("drive_listings.json"))
@@ -0,0 +1,181 @@
+import mimetypes
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import httplib2
+from googleapiclient.errors import HttpError
+from googleapiclient.http import MediaIoBaseUpload
+
+from utils.api_scheduler import scheduler
+
+# Resumable chunks must be a multiple of 256 KiB
+CHUNK_SIZE = 20 * 256 * 1024
+MAX_WORKERS = 4
+# Consecutive failures tolerated per chunk before a file is given up on
+MAX_RETRIES = 6
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 30
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+UPLOAD_FIELDS = "id, name, webViewLink, thumbnailLink"
+
+
+def _retryable(error):
+    if isinstance(error, HttpError):
+        return error.resp.status in RETRY_STATUSES
+    return isinstance(error, (OSError, httplib2.HttpLib2Error))
+
+
+def backoff_delay(attempt):
+    """Exponential backoff with full jitter for the given retry number (1-based)."""
+    return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+
+def _stream_size(stream):
+    position = stream.tell()
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(position)
+    return size
+
+
+def upload_stream(service, stream, name, folder_id, mimetype=None, chunk_size=CHUNK_SIZE,
+                  max_retries=MAX_RETRIES, on_progress=None, sleep=time.sleep):
+    """
+    Uploads one seekable stream in a chunked resumable session.
+
+    A failed or interrupted chunk is retried with backoff; the client first
+    asks the server how much it already has, so the upload resumes from there
+    instead of starting over.
+
+    Args:
+        on_progress (callable): optional on_progress(bytes_sent) after every chunk.
+    Returns:
+        dict: the created file's metadata (UPLOAD_FIELDS) plus 'retries'.
+    """
+    mimetype = mimetype or mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    stream.seek(0)
+    media = MediaIoBaseUpload(stream, mimetype=mimetype, chunksize=chunk_size, resumable=True)
+    request = service.files().create(
+        body={'name': name, 'parents': [folder_id]}, media_body=media, fields=UPLOAD_FIELDS
+    )
+
+    response, failures, retries = None, 0, 0
+    while response is None:
+        try:
+            # Chunks take Drive quota like any other call; retries stay here
+            status, response = scheduler.call('drive', request.next_chunk, write=True, retries=0)
+        except Exception as e:
+            if not _retryable(e) or failures >= max_retries:
+                raise
+            failures += 1
+            retries += 1
+            sleep(backoff_delay(failures))
+            continue
+        failures = 0
+        if status and on_progress:
+            on_progress(status.resumable_progress)
+
+    if on_progress:
+        on_progress(media.size())
+    response['retries'] = retries
+    return response
+
+
+class UploadProgress:
+    """Per-file and aggregate byte counts, updated from the worker threads."""
+
+    def __init__(self, names, sizes):
+        self._lock = threading.Lock()
+        self.names = list(names)
+        self.sizes = list(sizes)
+        self.sent = [0] * len(self.sizes)
+        self.states = ['queued'] * len(self.sizes)
+
+    def update(self, index, sent=None, state=None):
+        with self._lock:
+            if sent is not None:
+                self.sent[index] = sent
+            if state is not None:
+                self.states[index] = state
+
+    def snapshot(self):
+        with self._lock:
+            total, done = sum(self.sizes), sum(self.sent)
+            return {
+                'files': [
+                    {'name': n, 'size': s, 'sent': d, 'state': st}
+                    for n, s, d, st in zip(self.names, self.sizes, self.sent, self.states)
+                ],
+                'sent': done,
+                'total': total,
+                'fraction': done / total if total else 1.0,
+                'finished': sum(st in ('done', 'failed') for st in self.states),
+            }
+
+
+def _describe(item):
+    """(name, stream, mimetype) for a Streamlit UploadedFile, file object or tuple."""
+    if isinstance(item, tuple):
+        name, stream = item[0], item[1]
+        return name, stream, item[2] if len(item) > 2 else None
+    return os.path.basename(getattr(item, 'name', 'upload')), item, getattr(item, 'type', None)
+
+
+def upload_files(files, folder_id, service_factory=None, max_workers=MAX_WORKERS,
+                 chunk_size=CHUNK_SIZE, max_retries=MAX_RETRIES, progress=None, poll_seconds=0.2):
+    """
+    Uploads many files into one Drive folder on a bounded thread pool.
+
+    Each worker thread uses its own Drive service (httplib2 is not
+    thread-safe). progress is called from the calling thread, so it may
+    update Streamlit widgets.
+
+    Args:
+        files (list): UploadedFile/file objects, or (name, stream[, mimetype]) tuples.
+        service_factory (callable): returns a Drive service; defaults to get_drive_service.
+        progress (callable): optional progress(UploadProgress.snapshot()).
+    Returns:
+        list: one dict per file, in input order, with name, id, webViewLink,
+        size, seconds, retries and error (None on success).
+    """
+    if service_factory is None:
+        from utils.google_api import get_drive_service
+        service_factory = get_drive_service
+
+    items = [_describe(f) for f in files]
+    tracker = UploadProgress([n for n, _, _ in items], [_stream_size(s) for _, s, _ in items])
+    results = [None] * len(items)
+
+    def run(index):
+        name, stream, mimetype = items[index]
+        result = {'name': name, 'id': None, 'webViewLink': None, 'size': tracker.sizes[index],
+                  'seconds': 0.0, 'retries': 0, 'error': None}
+        started = time.perf_counter()
+        tracker.update(index, state='uploading')
+        try:
+            service = service_factory()
+            if service is None:
+                raise RuntimeError("Google Drive is not configured")
+            created = upload_stream(
+                service, stream, name, folder_id, mimetype, chunk_size, max_retries,
+                on_progress=lambda sent: tracker.update(index, sent=sent),
+            )
+            result.update(id=created.get('id'), webViewLink=created.get('webViewLink'),
+                          retries=created['retries'])
+            tracker.update(index, state='done')
+        except Exception as e:
+            result['error'] = str(e)
+            tracker.update(index, state='failed')
+        result['seconds'] = time.perf_counter() - started
+        results[index] = result
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="drive-upload") as executor:
+        pending = {executor.submit(run, i) for i in range(len(items))}
+        while pending:
+            _, pending = wait(pending, timeout=poll_seconds)
+            if progress:
+                progress(tracker.snapshot())
+    return results
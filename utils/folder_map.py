@@ -0,0 +1,74 @@
+import json
+import os
+import threading
+
+from utils.local_paths import local_path
+
+
+class SiteFolderMap:
+    """
+    Persistent site -> Drive folder id map, stored as JSON.
+
+    Folders are keyed by (parent folder, site_name) and, when known, by
+    site_mgmt_id. It is filled in bulk from one folder listing and updated
+    whenever a folder is created, so it never has to be rebuilt from scratch.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._by_name = {}  # "parent/site_name" -> folder id
+        self._by_site = {}  # site_mgmt_id -> folder id
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                stored = json.load(f)
+            self._by_name = stored.get("by_name", {})
+            self._by_site = stored.get("by_site", {})
+
+    @staticmethod
+    def _name_key(site_name, parent_folder_id):
+        return f"{parent_folder_id or ''}/{site_name}"
+
+    def get(self, site_name=None, parent_folder_id=None, site_mgmt_id=None):
+        """Folder id by site_mgmt_id first, then by name; None if unknown."""
+        with self._lock:
+            if site_mgmt_id and str(site_mgmt_id) in self._by_site:
+                return self._by_site[str(site_mgmt_id)]
+            if site_name:
+                return self._by_name.get(self._name_key(site_name, parent_folder_id))
+            return None
+
+    def set(self, folder_id, site_name=None, parent_folder_id=None, site_mgmt_id=None):
+        self.update({site_name: folder_id} if site_name else {}, parent_folder_id,
+                    {str(site_mgmt_id): folder_id} if site_mgmt_id else None)
+
+    def update(self, folders, parent_folder_id=None, sites=None):
+        """
+        Stores many folders at once and writes the file once.
+
+        Args:
+            folders (dict): site_name -> folder id.
+            sites (dict): optional site_mgmt_id -> folder id.
+        """
+        with self._lock:
+            for name, folder_id in folders.items():
+                self._by_name[self._name_key(name, parent_folder_id)] = folder_id
+            for site_id, folder_id in (sites or {}).items():
+                self._by_site[str(site_id)] = folder_id
+            self._save()
+
+    def forget(self, folder_id):
+        """Drops every entry pointing at a folder that no longer exists."""
+        with self._lock:
+            self._by_name = {k: v for k, v in self._by_name.items() if v != folder_id}
+            self._by_site = {k: v for k, v in self._by_site.items() if v != folder_id}
+            self._save()
+
+    def _save(self):
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"by_name": self._by_name, "by_site": self._by_site}, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+
+site_folder_map = SiteFolderMap(local_path("site_folders.json"))
@@ -2,8 +2,13 @@ import streamlit as st
 import pandas as pd
 import gspread
 from google.oauth2.service_account import Credentials
+from google.auth.transport.requests import AuthorizedSession
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseUpload
+from googleapiclient.http import HttpRequest
+from utils.sheet_diff import frame_to_values, values_to_frame, diff_values
+from utils.client_pool import pool
+from utils.drive_upload import upload_stream
+from utils.api_scheduler import scheduler
 
 # Scopes
 SCOPES = [
@@ -11,57 +16,157 @@ SCOPES = [
     'https://www.googleapis.com/auth/drive'
 ]
 
-def get_creds():
-    """
-    Returns Credentials object from st.secrets or local file.
-    """
+def _load_creds():
     if "gcp_service_account" in st.secrets:
         return Credentials.from_service_account_info(
             st.secrets["gcp_service_account"], scopes=SCOPES
         )
     return None
 
+def get_creds():
+    """
+    Returns the shared Credentials object from st.secrets, refreshed if expired.
+    """
+    try:
+        return pool.credentials(_load_creds)
+    except Exception as e:
+        st.error(f"Google authentication error: {e}")
+        pool.invalidate()
+        return None
+
+class ScheduledHttpRequest(HttpRequest):
+    """Drive request whose execute() goes through the API scheduler."""
+
+    def execute(self, http=None, num_retries=0):
+        write = self.method != 'GET'
+        return scheduler.call(
+            'drive', lambda: super(ScheduledHttpRequest, self).execute(http=http),
+            write=write, key=None if write else (self.method, self.uri),
+        )
+
+class ScheduledHTTPClient(gspread.http_client.HTTPClient):
+    """gspread transport that sends every request through the API scheduler."""
+
+    def request(self, method, endpoint, params=None, **kwargs):
+        write = method.upper() != 'GET'
+        return scheduler.call(
+            'sheets.write' if write else 'sheets.read',
+            lambda: super(ScheduledHTTPClient, self).request(method, endpoint, params=params, **kwargs),
+            write=write, key=None if write else (endpoint, repr(sorted((params or {}).items()))),
+        )
+
 def get_drive_service():
-    """Returns Google Drive Service Resource."""
+    """Returns the pooled Google Drive Service Resource for this thread."""
     creds = get_creds()
     if creds:
-        return build('drive', 'v3', credentials=creds)
+        return pool.get_per_thread('drive', lambda: build(
+            'drive', 'v3', credentials=creds, cache_discovery=False, requestBuilder=ScheduledHttpRequest
+        ))
     return None
 
 def get_sheets_client():
-    """Returns gspread Client."""
+    """Returns the pooled gspread Client."""
     creds = get_creds()
     if creds:
-        return gspread.authorize(creds)
+        return pool.get('sheets', lambda: gspread.authorize(creds, http_client=ScheduledHTTPClient))
     return None
 
+def get_authorized_session():
+    """Returns the pooled requests session authorized with the shared credentials."""
+    creds = get_creds()
+    if creds:
+        return pool.get('session', lambda: AuthorizedSession(creds))
+    return None
+
+def fetch_drive_url(url, timeout=30):
+    """
+    GETs a Drive URL such as a thumbnailLink on the pooled session, through
+    the API scheduler like every other Drive request. Raises on HTTP errors.
+
+    Returns:
+        bytes: the response body, or None without credentials.
+    """
+    session = get_authorized_session()
+    if not session: return None
+
+    def get():
+        response = session.get(url, timeout=timeout)
+        response.raise_for_status()
+        return response.content
+    return scheduler.call('drive', get, key=('GET', url))
+
+def open_spreadsheet(spreadsheet_key):
+    """Returns a pooled Spreadsheet handle, opened once per process."""
+    client = get_sheets_client()
+    if not client: return None
+    return pool.get(('spreadsheet', spreadsheet_key), lambda: client.open_by_key(spreadsheet_key))
+
 # --- Sheets Operations ---
 def load_sheet_data(spreadsheet_key, worksheet_name):
     """
     Loads data from a specific worksheet into a DataFrame.
     Assumes header is in the first row (gspread default).
     """
-    client = get_sheets_client()
-    if not client: return pd.DataFrame()
-    
     try:
-        sh = client.open_by_key(spreadsheet_key) # Open by ID is safer than name
+        sh = open_spreadsheet(spreadsheet_key) # Open by ID is safer than name
+        if not sh: return pd.DataFrame()
         ws = sh.worksheet(worksheet_name)
         data = ws.get_all_records()
-        return pd.DataFrame(data)
+        df = pd.DataFrame(data)
+        remember_sheet_snapshot(spreadsheet_key, worksheet_name, df)
+        return df
     except Exception as e:
         st.error(f"Error loading {worksheet_name}: {e}")
         return pd.DataFrame()
 
+def fetch_sheet_values(spreadsheet_key, worksheet_names):
+    """
+    Returns the raw values (header first) of several worksheets, fetched with
+    a single values_batch_get request. Returns None without credentials and
+    raises on API errors.
+    """
+    sh = open_spreadsheet(spreadsheet_key)
+    if not sh: return None
+    ranges = [gspread.utils.absolute_range_name(name) for name in worksheet_names]
+    response = sh.values_batch_get(ranges)
+    return {
+        name: value_range.get('values', [])
+        for name, value_range in zip(worksheet_names, response.get('valueRanges', []))
+    }
+
+def load_sheets_batch(spreadsheet_key, worksheet_names, renames=None):
+    """
+    Loads several worksheets with a single values_batch_get request.
+    DataFrames are built straight from the returned rows, with headers
+    renamed on the way in.
+
+    Args:
+        worksheet_names (list): worksheets to fetch.
+        renames (dict): optional worksheet name -> {sheet header: column} mapping.
+    Returns:
+        dict: worksheet name -> DataFrame (empty if the sheet has no header).
+    """
+    renames = renames or {}
+    frames = {name: pd.DataFrame() for name in worksheet_names}
+    try:
+        sheet_values = fetch_sheet_values(spreadsheet_key, worksheet_names)
+    except Exception as e:
+        st.error(f"Error loading {', '.join(worksheet_names)}: {e}")
+        return frames
+    if sheet_values is None: return frames
+
+    for name, values in sheet_values.items():
+        _remember_values(spreadsheet_key, name, values)
+        frames[name] = values_to_frame(values, renames.get(name))
+    return frames
+
 def update_sheet_data(spreadsheet_key, worksheet_name, df):
     """
     Overwrites a worksheet with DataFrame content.
     """
-    client = get_sheets_client()
-    if not client: return
-    
     try:
-        sh = client.open_by_key(spreadsheet_key)
+        sh = open_spreadsheet(spreadsheet_key)
+        if not sh: return
         ws = sh.worksheet(worksheet_name)
         ws.clear()
         # gspread expects list of lists, including header
@@ -69,28 +174,130 @@ def update_sheet_data(spreadsheet_key, worksheet_name, df):
     except Exception as e:
         st.error(f"Error saving {worksheet_name}: {e}")
 
+def get_sheet_snapshots():
+    """This session's last-seen worksheet values, keyed by (spreadsheet, worksheet)."""
+    return st.session_state.setdefault('sheet_snapshots', {})
+
+def _remember_values(spreadsheet_key, worksheet_name, values):
+    get_sheet_snapshots()[(spreadsheet_key, worksheet_name)] = values
+
+def remember_sheet_snapshot(spreadsheet_key, worksheet_name, df):
+    """Stores the worksheet contents as last seen, for diff-based saves."""
+    _remember_values(spreadsheet_key, worksheet_name, frame_to_values(df))
+
+def _cell_data(value):
+    """Sheets CellData for a RAW value; empty cells are cleared."""
+    if value == "" or value is None:
+        return {}
+    if isinstance(value, bool):
+        return {'userEnteredValue': {'boolValue': value}}
+    if isinstance(value, (int, float)):
+        return {'userEnteredValue': {'numberValue': value}}
+    return {'userEnteredValue': {'stringValue': str(value)}}
+
+def _diff_requests(ws, blocks):
+    """batch_update requests that grow the grid if needed and write the blocks."""
+    requests = []
+    rows_needed = max(r + len(values) for r, c, values in blocks)
+    cols_needed = max(c + max(len(v) for v in values) for r, c, values in blocks)
+    if rows_needed > ws.row_count:
+        requests.append({'appendDimension': {
+            'sheetId': ws.id, 'dimension': 'ROWS', 'length': rows_needed - ws.row_count}})
+    if cols_needed > ws.col_count:
+        requests.append({'appendDimension': {
+            'sheetId': ws.id, 'dimension': 'COLUMNS', 'length': cols_needed - ws.col_count}})
+    for row, col, values in blocks:
+        requests.append({'updateCells': {
+            'start': {'sheetId': ws.id, 'rowIndex': row, 'columnIndex': col},
+            'rows': [{'values': [_cell_data(v) for v in r]} for r in values],
+            'fields': 'userEnteredValue',
+        }})
+    return requests
+
+def write_sheet_diffs(spreadsheet_key, changes):
+    """
+    Sends the differences between old and new worksheet values as a single
+    batch_update. Raises on API errors.
+
+    Args:
+        changes (dict): worksheet name -> (old values, or None to read them, new values).
+    Returns:
+        list: names of the worksheets that had changes, or None without credentials.
+    """
+    sh = open_spreadsheet(spreadsheet_key)
+    if not sh: return None
+    worksheets = {ws.title: ws for ws in sh.worksheets()}
+    requests, written = [], []
+    for name, (old, new) in changes.items():
+        ws = worksheets[name]
+        if old is None:
+            old = ws.get_all_values()
+        blocks = diff_values(old, new)
+        if not blocks:
+            continue
+        requests += _diff_requests(ws, blocks)
+        written.append(name)
+
+    if requests:
+        sh.batch_update({'requests': requests})
+    return written
+
+def save_sheets_diff(spreadsheet_key, frames, bases=None):
+    """
+    Writes only what changed since the last load/save of each worksheet.
+    All worksheets go out in a single batch_update; unchanged ones are skipped.
+
+    Args:
+        frames (dict): worksheet name -> DataFrame with sheet headers.
+        bases (dict): worksheet name -> the values the frames were edited
+            from; defaults to the last values loaded in this process.
+    Returns:
+        list: names of the worksheets that were written.
+    """
+    snapshots = get_sheet_snapshots()
+    bases = bases or {}
+    changes = {
+        name: (bases.get(name) or snapshots.get((spreadsheet_key, name)), frame_to_values(df))
+        for name, df in frames.items()
+        if len(df.columns) > 0  # Never loaded; do not blank the sheet
+    }
+    try:
+        written = write_sheet_diffs(spreadsheet_key, changes) or []
+    except Exception as e:
+        st.error(f"Error saving {', '.join(frames)}: {e}")
+        return []
+
+    for name in written:
+        snapshots[(spreadsheet_key, name)] = changes[name][1]
+    return written
+
 # --- Drive Operations ---
+def get_file_revision(file_id):
+    """
+    Returns a cheap freshness token for a Drive file (e.g. the spreadsheet),
+    built from its version and modifiedTime, or None if it cannot be read.
+    """
+    service = get_drive_service()
+    if not service: return None
+
+    try:
+        meta = service.files().get(fileId=file_id, fields='version, modifiedTime').execute()
+        return f"{meta.get('version')}@{meta.get('modifiedTime')}"
+    except Exception as e:
+        st.error(f"Error checking revision: {e}")
+        return None
+
 def upload_file_to_drive(file_obj, folder_id, filename):
     """
-    Uploads a file-like object to Google Drive.
+    Uploads a file-like object to Google Drive in a chunked resumable session,
+    retrying failed chunks with backoff (see drive_upload.upload_stream).
     Returns the file ID and Web View Link.
     """
     service = get_drive_service()
     if not service: return None, None
     
     try:
-        file_metadata = {
-            'name': filename,
-            'parents': [folder_id]
-        }
-        
-        media = MediaIoBaseUpload(file_obj, mimetype=file_obj.type, resumable=True)
-        
-        file = service.files().create(
-            body=file_metadata,
-            media_body=media,
-            fields='id, webViewLink, thumbnailLink'
-        ).execute()
+        file = upload_stream(service, file_obj, filename, folder_id, getattr(file_obj, 'type', None))
         return file.get('id'), file.get('webViewLink')
         
     except Exception as e:
@@ -0,0 +1,119 @@
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow is optional; without it images are uploaded as-is
+    Image = None
+
+try:
+    from pillow_heif import register_heif_opener
+    register_heif_opener()
+    HEIF_SUPPORTED = True
+except ImportError:
+    HEIF_SUPPORTED = False
+
+MAX_EDGE = 2560
+JPEG_QUALITY = 82
+KEEP_EXIF = False
+EXIF_ORIENTATION = 0x0112
+
+IMAGE_TYPES = {
+    '.jpg': 'image/jpeg', '.jpeg': 'image/jpeg', '.png': 'image/png',
+    '.heic': 'image/heic', '.heif': 'image/heif',
+}
+
+
+def is_supported(name, mimetype=None):
+    """True if the file is an image this stage can decode here."""
+    if Image is None:
+        return False
+    ext = os.path.splitext(name)[1].lower()
+    kind = IMAGE_TYPES.get(ext) or mimetype or ''
+    if kind in ('image/heic', 'image/heif'):
+        return HEIF_SUPPORTED
+    return kind in ('image/jpeg', 'image/png')
+
+
+def prepare_image(name, data, max_edge=MAX_EDGE, quality=JPEG_QUALITY, keep_exif=KEEP_EXIF):
+    """
+    Downscales one image so its longer edge is at most max_edge and re-encodes it.
+
+    JPEG and HEIC become JPEG at the given quality, PNG stays PNG (optimized).
+    The EXIF orientation is applied to the pixels; other EXIF data is kept
+    only with keep_exif. With keep_exif the original bytes are kept when
+    re-encoding would not make the file smaller; without it the re-encode is
+    always used, since the original still carries its EXIF (GPS included).
+
+    Returns:
+        dict: name, data, mimetype, original_bytes, bytes, seconds, size, error.
+    """
+    started = time.perf_counter()
+    result = {'name': name, 'data': data, 'mimetype': None, 'original_bytes': len(data),
+              'bytes': len(data), 'seconds': 0.0, 'size': None, 'error': None}
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            exif = img.getexif() if keep_exif else None
+            icc = img.info.get('icc_profile')
+            is_png = img.format == 'PNG'
+            image = ImageOps.exif_transpose(img)
+            if max(image.size) > max_edge:
+                image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+
+            options = {'icc_profile': icc} if icc else {}
+            if exif is not None:
+                exif[EXIF_ORIENTATION] = 1
+                options['exif'] = exif.tobytes()
+            out = io.BytesIO()
+            if is_png:
+                image.save(out, 'PNG', optimize=True, **options)
+                mimetype, ext = 'image/png', '.png'
+            else:
+                if image.mode not in ('RGB', 'L'):
+                    image = image.convert('RGB')
+                image.save(out, 'JPEG', quality=quality, optimize=True, progressive=True, **options)
+                mimetype, ext = 'image/jpeg', '.jpg'
+            result['size'] = image.size
+
+        converted = os.path.splitext(name)[1].lower() in ('.heic', '.heif')
+        if converted or not keep_exif or out.tell() < len(data):
+            result.update(name=os.path.splitext(name)[0] + ext if converted else name,
+                          data=out.getvalue(), mimetype=mimetype, bytes=out.tell())
+    except Exception as e:
+        result['error'] = str(e)
+    result['seconds'] = time.perf_counter() - started
+    return result
+
+
+def _prepare(args):
+    return prepare_image(*args)
+
+
+def prepare_images(items, max_edge=MAX_EDGE, quality=JPEG_QUALITY, keep_exif=KEEP_EXIF, max_workers=None):
+    """
+    Runs prepare_image over many (name, bytes) pairs on a process pool, so a
+    large batch uses every core. A single image is processed in-process.
+
+    Returns:
+        list: prepare_image results, in input order.
+    """
+    jobs = [(name, data, max_edge, quality, keep_exif) for name, data in items]
+    if len(jobs) <= 1:
+        return [_prepare(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(_prepare, jobs))
+
+
+def summarize(results):
+    """Totals for a prepare_images run: images, original/final bytes, bytes saved, seconds."""
+    original = sum(r['original_bytes'] for r in results)
+    final = sum(r['bytes'] for r in results)
+    return {
+        'images': len(results),
+        'original_bytes': original,
+        'bytes': final,
+        'saved_bytes': original - final,
+        'seconds': sum(r['seconds'] for r in results),
+    }
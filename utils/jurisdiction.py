@@ -0,0 +1,158 @@
+import numpy as np
+import pandas as pd
+
+# Canonical province -> names it is written as in addresses
+PROVINCE_ALIASES = {
+    "서울": ["서울특별시", "서울시"],
+    "부산": ["부산광역시", "부산시"],
+    "대구": ["대구광역시", "대구시"],
+    "인천": ["인천광역시", "인천시"],
+    "광주": ["광주광역시"],
+    "대전": ["대전광역시", "대전시"],
+    "울산": ["울산광역시", "울산시"],
+    "세종": ["세종특별자치시", "세종시"],
+    "경기": ["경기도"],
+    "강원": ["강원도", "강원특별자치도"],
+    "충북": ["충청북도"],
+    "충남": ["충청남도"],
+    "전북": ["전라북도", "전북특별자치도"],
+    "전남": ["전라남도"],
+    "경북": ["경상북도"],
+    "경남": ["경상남도"],
+    "제주": ["제주도", "제주특별자치도"],
+}
+
+# 시/군/구 of each province
+DISTRICTS = {
+    "서울": "종로구 중구 용산구 성동구 광진구 동대문구 중랑구 성북구 강북구 도봉구 노원구 은평구 서대문구 마포구 "
+            "양천구 강서구 구로구 금천구 영등포구 동작구 관악구 서초구 강남구 송파구 강동구",
+    "부산": "중구 서구 동구 영도구 부산진구 동래구 남구 북구 해운대구 사하구 금정구 강서구 연제구 수영구 사상구 기장군",
+    "대구": "중구 동구 서구 남구 북구 수성구 달서구 달성군 군위군",
+    "인천": "중구 동구 미추홀구 연수구 남동구 부평구 계양구 서구 강화군 옹진군",
+    "광주": "동구 서구 남구 북구 광산구",
+    "대전": "동구 중구 서구 유성구 대덕구",
+    "울산": "중구 남구 동구 북구 울주군",
+    "세종": "",
+    "경기": "수원시 성남시 의정부시 안양시 부천시 광명시 평택시 동두천시 안산시 고양시 과천시 구리시 남양주시 오산시 "
+            "시흥시 군포시 의왕시 하남시 용인시 파주시 이천시 안성시 김포시 화성시 광주시 양주시 포천시 여주시 "
+            "연천군 가평군 양평군",
+    "강원": "춘천시 원주시 강릉시 동해시 태백시 속초시 삼척시 홍천군 횡성군 영월군 평창군 정선군 철원군 화천군 "
+            "양구군 인제군 고성군 양양군",
+    "충북": "청주시 충주시 제천시 보은군 옥천군 영동군 증평군 진천군 괴산군 음성군 단양군",
+    "충남": "천안시 공주시 보령시 아산시 서산시 논산시 계룡시 당진시 금산군 부여군 서천군 청양군 홍성군 예산군 태안군",
+    "전북": "전주시 군산시 익산시 정읍시 남원시 김제시 완주군 진안군 무주군 장수군 임실군 순창군 고창군 부안군",
+    "전남": "목포시 여수시 순천시 나주시 광양시 담양군 곡성군 구례군 고흥군 보성군 화순군 장흥군 강진군 해남군 "
+            "영암군 무안군 함평군 영광군 장성군 완도군 진도군 신안군",
+    "경북": "포항시 경주시 김천시 안동시 구미시 영주시 영천시 상주시 문경시 경산시 의성군 청송군 영양군 영덕군 "
+            "청도군 고령군 성주군 칠곡군 예천군 봉화군 울진군 울릉군",
+    "경남": "창원시 진주시 통영시 사천시 김해시 밀양시 거제시 양산시 의령군 함안군 창녕군 고성군 남해군 하동군 "
+            "산청군 함양군 거창군 합천군",
+    "제주": "제주시 서귀포시",
+}
+
+# Stations whose name is not the district name without its 시/군/구 suffix,
+# as (province, district) -> station
+STATION_OVERRIDES = {
+    ("세종", ""): "세종",
+}
+# 중구 -> 중부, 동구 -> 동부, ...
+_DIRECTIONAL = {"중", "동", "서", "남", "북"}
+
+
+def default_station(province, district):
+    """Station label of a district: its name without 시/군/구, as 관할서 is written ("화성시" -> "화성")."""
+    stem = district[:-1] if district[-1:] in "시군구" else district
+    if district[-1:] == "구" and stem in _DIRECTIONAL:
+        return stem + "부"
+    return stem if len(stem) > 1 else district
+
+
+class RegionTrie:
+    """
+    Prefix trie of Korean administrative regions: 시/도 -> 시/군/구 -> station.
+
+    Provinces are matched under every spelling in PROVINCE_ALIASES (경기,
+    경기도; 충남, 충청남도) and districts with or without their 시/군/구
+    suffix. Addresses that start at the district ("화성시 매송면 ...") are
+    matched when every district of that name has the same station.
+    """
+
+    def __init__(self, aliases=PROVINCE_ALIASES, districts=DISTRICTS, overrides=STATION_OVERRIDES):
+        self.root = {}           # spelling -> province node
+        self._districts = {}     # district spelling -> {stations} for addresses without a province
+        for province, spellings in aliases.items():
+            node = {'name': province, 'children': {}, 'station': overrides.get((province, ""))}
+            for spelling in [province] + list(spellings):
+                self.root[spelling] = node
+            for district in districts.get(province, "").split():
+                leaf = {'name': district, 'station': overrides.get((province, district)) or default_station(province, district)}
+                for spelling in {district, district[:-1] if len(district) > 2 else district}:
+                    node['children'][spelling] = leaf
+                    self._districts.setdefault(spelling, set()).add(leaf['station'])
+
+    def resolve(self, tokens):
+        """
+        Station for the leading words of an address, or "" if unknown.
+
+        Args:
+            tokens (list): the first words of the address.
+        """
+        tokens = [t for t in tokens if isinstance(t, str) and t]
+        if not tokens:
+            return ""
+        province = self.root.get(tokens[0])
+        if province is not None:
+            if len(tokens) > 1 and tokens[1] in province['children']:
+                return province['children'][tokens[1]]['station']
+            return province['station'] or ""
+        stations = self._districts.get(tokens[0], ())
+        return next(iter(stations)) if len(stations) == 1 else ""
+
+
+region_trie = RegionTrie()
+
+
+def resolve_jurisdictions(addresses, trie=None):
+    """
+    Column-wise address -> station. The first two words of every address are
+    cut out in one regex pass, each distinct pair goes through the trie once
+    and the result is mapped back onto the column. Unknown addresses give "".
+    """
+    trie = trie or region_trie
+    heads = addresses.astype("string").fillna("").str.replace(r"^\s*(\S*)(?:\s+(\S+))?.*$", r"\1 \2", regex=True)
+    codes, uniques = pd.factorize(heads)
+    stations = np.array([trie.resolve(head.split()) for head in uniques], dtype=object)
+    return pd.Series(stations[codes], index=addresses.index, dtype=object)
+
+
+def fill_jurisdictions(df_m, address_columns=("site_address", "company_address")):
+    """
+    Fills empty jurisdiction cells from the site address, falling back to
+    the company address. Cells already filled in are kept, but flagged when
+    the address points to a different station.
+
+    Returns:
+        (df_m, filled, mismatched): the updated frame, a mask of the cells
+        that were filled and a mask of rows whose jurisdiction disagrees
+        with their address.
+    """
+    resolved = pd.Series("", index=df_m.index, dtype=object)
+    for col in address_columns:
+        if col in df_m.columns:
+            missing = resolved == ""
+            if missing.any():
+                resolved[missing] = resolve_jurisdictions(df_m.loc[missing, col])
+    if 'jurisdiction' in df_m.columns:
+        current = df_m['jurisdiction'].astype("string").fillna("").str.strip().astype(object)
+    else:
+        current = pd.Series("", index=df_m.index, dtype=object)
+    filled = (current == "") & (resolved != "")
+    mismatched = (current != "") & (resolved != "") & (current != resolved)
+    if filled.any():
+        df_m = df_m.copy(deep=False)
+        original = df_m['jurisdiction'] if 'jurisdiction' in df_m.columns else current
+        column = original.astype(object)
+        column[filled] = resolved[filled]
+        # A categorical column (see column_schema) stays categorical
+        df_m['jurisdiction'] = column.astype("category") if isinstance(original.dtype, pd.CategoricalDtype) else column
+    return df_m, filled, mismatched
@@ -0,0 +1,11 @@
+import os
+
+# Local state (SQLite mirror, caches, queues) lives here, outside git
+LOCAL_DATA_DIR = os.environ.get("FIELDMASTER_DATA_DIR", ".fieldmaster")
+
+
+def local_path(*parts):
+    """Returns a path under LOCAL_DATA_DIR, creating its parent directory."""
+    path = os.path.join(LOCAL_DATA_DIR, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
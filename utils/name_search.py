@@ -0,0 +1,224 @@
+import re
+import threading
+import unicodedata
+
+from utils.site_index import SITE_KEY
+from utils.text_search import row_fingerprints
+
+# Name columns searchable per table
+NAME_FIELDS = {
+    'master': ['site_name', 'company_name', 'facility_name'],
+    'contacts': ['name'],
+}
+DEFAULT_LIMIT = 20
+
+HANGUL_FIRST, HANGUL_LAST = 0xAC00, 0xD7A3
+CHOSEONG = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+_CHOSEONG_SET = set(CHOSEONG)
+# Syllable -> its initial consonant ("한" -> "ㅎ"); NFKC turns typed jamo
+# into conjoining jamo (U+1100..), which are mapped back as well
+_TO_CHOSEONG = {code: CHOSEONG[(code - HANGUL_FIRST) // 588] for code in range(HANGUL_FIRST, HANGUL_LAST + 1)}
+_CONJOINING = {0x1100 + i: c for i, c in enumerate(CHOSEONG)}
+_SPACES = re.compile(r"\s+")
+_PREFIX = "\0"
+
+
+def normalize(text):
+    """NFKC, lower case, no whitespace; typed jamo stay compatibility jamo."""
+    text = unicodedata.normalize("NFKC", str(text)).lower().translate(_CONJOINING)
+    return _SPACES.sub("", text)
+
+
+def choseong(text):
+    """
+    Initial consonants of the Hangul syllables in normalized text, other
+    characters unchanged: "한국윤활유" -> "ㅎㄱㅇㅎㅇ". Same length as the input.
+    """
+    return text.translate(_TO_CHOSEONG)
+
+
+def _grams(text):
+    """
+    Distinct characters and bigrams of text, as indexed, plus its first one
+    and two characters marked with a leading NUL for prefix lookups.
+    """
+    return set(text) | _query_grams(text) | {_PREFIX + text[:1], _PREFIX + text[:2]}
+
+
+def _query_grams(text):
+    """Bigrams of a query, or the query itself if it is one character."""
+    if len(text) < 2:
+        return {text} if text else set()
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+def _matches_at(value, pattern, start):
+    """Pattern characters that are full syllables must match the value exactly."""
+    return all(p in _CHOSEONG_SET or value[start + i] == p for i, p in enumerate(pattern))
+
+
+class NameIndex:
+    """
+    In-memory prefix/infix index over site, company, facility and contact names.
+
+    Each name is kept normalized and as its choseong string, and both are
+    indexed by characters and bigrams. A query is answered by intersecting the
+    posting sets of its bigrams and checking the few remaining candidates,
+    so "윤활" and "ㅎㄱㅇㅎㅇ" both find "한국윤활유", as do mixed queries
+    such as "한ㄱ". Prefix matches rank before infix matches, shorter names
+    (exact matches) first.
+    sync() re-indexes only rows whose names changed.
+
+    One index serves every session and is synced from each loaded snapshot,
+    so it holds saved names only: a name edited in a session is found under
+    its new spelling once it is saved (saving reloads, which syncs it).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}   # entry id -> (table, row label, field, value, site_mgmt_id, normalized, choseong)
+        self._ids = {}       # (table, row label, field) -> entry id
+        self._text = {}      # bigram -> set of entry ids
+        self._initials = {}  # choseong bigram -> set of entry ids
+        self._by_length = {}     # (postings name, gram) -> entry ids sorted by name length, built on demand
+        self._fingerprints = {}  # table -> {row label: fingerprint}
+        self._next_id = 0
+
+    def add(self, table, label, field, value, site_id=""):
+        """Indexes (or re-indexes) one name."""
+        value = "" if value is None else str(value)
+        norm = normalize(value)
+        with self._lock:
+            self._remove((table, label, field))
+            if not norm:
+                return
+            entry_id = self._next_id
+            self._next_id += 1
+            cho = choseong(norm)
+            self._entries[entry_id] = (table, label, field, value, str(site_id), norm, cho)
+            self._ids[(table, label, field)] = entry_id
+            for gram in _grams(norm):
+                self._text.setdefault(gram, set()).add(entry_id)
+                self._by_length.pop(('text', gram), None)
+            for gram in _grams(cho):
+                self._initials.setdefault(gram, set()).add(entry_id)
+                self._by_length.pop(('initials', gram), None)
+
+    def remove(self, table, label, field):
+        with self._lock:
+            self._remove((table, label, field))
+
+    def _remove(self, key):
+        entry_id = self._ids.pop(key, None)
+        if entry_id is None:
+            return
+        entry = self._entries.pop(entry_id)
+        for name, postings, text in (('text', self._text, entry[5]), ('initials', self._initials, entry[6])):
+            for gram in _grams(text):
+                self._by_length.pop((name, gram), None)
+                ids = postings.get(gram)
+                if ids is not None:
+                    ids.discard(entry_id)
+                    if not ids:
+                        del postings[gram]
+
+    def sync(self, table, df, fields=None):
+        """
+        Brings one table's names in line with df: new and edited rows are
+        indexed, rows that are gone are dropped.
+
+        Returns:
+            (rows indexed, rows removed)
+        """
+        fields = [f for f in (fields or NAME_FIELDS.get(table, [])) if f in df.columns]
+        if not fields:
+            return 0, 0
+        fingerprints = row_fingerprints(df, fields).tolist()
+        labels = df.index.tolist()
+        with self._lock:
+            current = self._fingerprints.setdefault(table, {})
+            changed = [i for i, label in enumerate(labels) if current.get(label) != fingerprints[i]]
+            gone = set(current) - set(labels)
+
+        if changed:
+            rows = df.iloc[changed]
+            sites = rows[SITE_KEY].astype(str).tolist() if SITE_KEY in rows.columns else [""] * len(rows)
+            values = {f: rows[f].astype(object).where(rows[f].notna(), "").tolist() for f in fields}
+            for n, i in enumerate(changed):
+                for f in fields:
+                    self.add(table, labels[i], f, values[f][n], sites[n])
+        for label in gone:
+            for f in fields:
+                self.remove(table, label, f)
+        with self._lock:
+            for i in changed:
+                current[labels[i]] = fingerprints[i]
+            for label in gone:
+                current.pop(label, None)
+        return len(changed), len(gone)
+
+    def search(self, query, limit=DEFAULT_LIMIT, tables=None, fields=None):
+        """
+        Names containing the query, as text or as initial consonants.
+
+        Returns:
+            list of dicts: 'table', 'row', 'field', 'value', 'site_mgmt_id', best first.
+        """
+        pattern = normalize(query)
+        if not pattern:
+            return []
+        by_initials = any(c in _CHOSEONG_SET for c in pattern)
+        needle = choseong(pattern) if by_initials else pattern
+        name = 'initials' if by_initials else 'text'
+        postings = self._initials if by_initials else self._text
+        column = 6 if by_initials else 5
+
+        def matches(entry):
+            if (tables and entry[0] not in tables) or (fields and entry[2] not in fields):
+                return -1
+            haystack = entry[column]
+            start = haystack.find(needle)
+            while start != -1 and by_initials and not _matches_at(entry[5], pattern, start):
+                start = haystack.find(needle, start + 1)
+            return start
+
+        # Candidates are walked shortest name first, so each pass can stop
+        # after `limit` hits: first names starting with the query, then the rest
+        prefixed, infixed = [], []
+        with self._lock:
+            head = _PREFIX + needle[:2]
+            if head in postings:
+                for entry_id in self._sorted_by_length(name, postings, head):
+                    entry = self._entries[entry_id]
+                    if matches(entry) == 0:
+                        prefixed.append(entry)
+                        if len(prefixed) >= limit:
+                            break
+            grams = sorted(_query_grams(needle), key=lambda g: len(postings.get(g, ())))
+            if len(prefixed) < limit and grams[0] in postings:
+                others = [postings.get(g, set()) for g in grams[1:]]
+                for entry_id in self._sorted_by_length(name, postings, grams[0]):
+                    if others and not all(entry_id in ids for ids in others):
+                        continue
+                    entry = self._entries[entry_id]
+                    if matches(entry) > 0:
+                        infixed.append(entry)
+                        if len(prefixed) + len(infixed) >= limit:
+                            break
+        hits = (prefixed + infixed)[:limit]
+        return [{'table': e[0], 'row': e[1], 'field': e[2], 'value': e[3], SITE_KEY: e[4]} for e in hits]
+
+    def _sorted_by_length(self, name, postings, gram):
+        key = (name, gram)
+        ordered = self._by_length.get(key)
+        if ordered is None:
+            column = 6 if name == 'initials' else 5
+            ordered = self._by_length[key] = sorted(postings[gram], key=lambda i: (len(self._entries[i][column]), i))
+        return ordered
+
+    def stats(self):
+        with self._lock:
+            return {'names': len(self._entries), 'bigrams': len(self._text), 'choseong_bigrams': len(self._initials)}
+
+
+name_index = NameIndex()
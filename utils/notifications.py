@@ -1,26 +1,99 @@
-def send_notification(recipient, message, channel="sms"):
+import datetime
+import threading
+
+import streamlit as st
+
+from utils.notify_dispatcher import NotificationDispatcher, Provider
+from utils.notify_outbox import NotificationOutbox, OutboxRelay, message_key, STAGE_WINDOW_SECONDS, DIGEST_HOUR
+from utils.local_paths import local_path
+
+_dispatcher = None
+_outbox = None
+_lock = threading.Lock()
+
+def _outbox_settings():
+    """[notification_outbox] secrets: stage_window_seconds, digest_assignments, digest_hour."""
+    try:
+        return dict(st.secrets.get("notification_outbox", {}))
+    except Exception:
+        return {}
+
+def _load_providers():
+    """
+    Channel -> Provider from the [notifications.<channel>] secrets
+    (url, headers, rate_per_second, batch_size, sender). Channels without a
+    url only print their messages.
+    """
+    try:
+        config = {channel: dict(cfg) for channel, cfg in st.secrets.get("notifications", {}).items()}
+    except Exception:
+        config = {}
+    for channel in ("sms", "kakao"):
+        config.setdefault(channel, {})
+    return {channel: Provider(**cfg) for channel, cfg in config.items()}
+
+def get_dispatcher():
+    """The process-wide notification dispatcher, started on first use."""
+    global _dispatcher
+    with _lock:
+        if _dispatcher is None:
+            _dispatcher = NotificationDispatcher(_load_providers())
+        return _dispatcher
+
+def get_outbox():
+    """
+    The process-wide durable outbox, with its relay thread started.
+    Messages left over from a previous run are sent once the relay starts.
+    """
+    global _outbox
+    dispatcher = get_dispatcher()
+    with _lock:
+        if _outbox is None:
+            _outbox = NotificationOutbox(local_path("outbox.sqlite3"))
+            _outbox.relay = OutboxRelay(_outbox, dispatcher)
+            _outbox.relay.start()
+        return _outbox
+
+def send_notification(recipient, message, channel="sms", key=None):
     """
     Sends a notification to the user or client.
+    The message is stored in the outbox and delivered by a background relay
+    (batched per channel, rate limited per provider, retried until the
+    provider accepts it); this returns without waiting for delivery.
     
     Args:
         recipient (str): Phone number or ID.
         message (str): The message content.
         channel (str): 'sms' or 'kakao'.
+        key (str): optional idempotency key; a message with a key already queued is dropped.
     """
-    print(f"[{channel.upper()}] Sending to {recipient}: {message}")
-    
-    # Placeholder for actual API integration (e.g. Solapi, Twilio, Kakao Biz Message)
-    # import requests
-    # requests.post(...)
-    
+    outbox = get_outbox()
+    if outbox.enqueue(channel, recipient, message, key=key):
+        outbox.relay.notify()
     return True
 
-def notify_staff_assignment(site_name, staff_name):
-    """Sends a notification when staff is assigned."""
+def notify_staff_assignment(site_name, staff_name, digest=None):
+    """
+    Sends a notification when staff is assigned.
+    In digest mode (default: notification_outbox.digest_assignments) the
+    assignments are collected into one message per recipient per day.
+    """
+    settings = _outbox_settings()
+    if digest is None:
+        digest = bool(settings.get("digest_assignments", False))
+    if digest:
+        get_outbox().enqueue_digest(staff_name, site_name, staff_name,
+                                    hour=int(settings.get("digest_hour", DIGEST_HOUR)))
+        return
     msg = f"[Field Master Pro] {staff_name}님, '{site_name}' 현장의 담당자로 배정되었습니다."
-    send_notification(staff_name, msg, "sms")
+    # The same assignment is announced at most once a day, however often it is saved
+    key = message_key('assignment', staff_name, site_name, datetime.date.today().isoformat())
+    send_notification(staff_name, msg, "sms", key=key)
 
 def notify_contract_owner(site_name, stage):
-    """Sends status update to the client."""
-    msg = f"[알림] '{site_name}' 현장의 단계가 '{stage}'(으)로 변경되었습니다."
-    send_notification("Client", msg, "kakao")
+    """
+    Sends status update to the client.
+    Changes to the same site within the stage window are sent as one message.
+    """
+    window = int(_outbox_settings().get("stage_window_seconds", STAGE_WINDOW_SECONDS))
+    get_outbox().enqueue_stage_change(site_name, stage, "Client", "kakao", window=window)
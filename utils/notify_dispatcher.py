@@ -0,0 +1,207 @@
+import asyncio
+import logging
+import random
+import threading
+from concurrent.futures import Future
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 100
+# How long a channel waits for more messages before sending a partial batch
+BATCH_WINDOW_SECONDS = 0.2
+MAX_IN_FLIGHT = 4
+MAX_RETRIES = 4
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+
+
+class Provider:
+    """
+    One HTTP messaging endpoint (Solapi, Twilio, Kakao Biz Message, ...).
+    A batch goes out as a single JSON POST:
+    {"messages": [{"to", "text"[, "from"][, "id"]}]}, where id is the
+    message's idempotency key so the provider can drop redelivered messages.
+    Without a url, messages are only printed (development mode).
+    """
+
+    def __init__(self, url=None, headers=None, rate_per_second=10.0, batch_size=BATCH_SIZE, sender=None):
+        self.url = url
+        self.headers = dict(headers or {})
+        self.rate_per_second = float(rate_per_second)
+        self.batch_size = int(batch_size)
+        self.sender = sender
+
+    def payload(self, batch):
+        messages = []
+        for recipient, text, key in batch:
+            message = {"to": recipient, "text": text}
+            if self.sender:
+                message["from"] = self.sender
+            if key:
+                message["id"] = key
+            messages.append(message)
+        return {"messages": messages}
+
+
+class NotificationDispatcher:
+    """
+    Sends notifications from a private asyncio loop on a daemon thread.
+
+    submit() only hands the message to the loop and returns at once. Each
+    channel collects messages for up to batch_window seconds (or batch_size
+    messages) and posts them as one request, paced by the provider's rate
+    limit. One httpx.AsyncClient is shared by all channels, so connections
+    stay open between batches. Failed batches are retried with backoff.
+    """
+
+    def __init__(self, providers, batch_window=BATCH_WINDOW_SECONDS, max_retries=MAX_RETRIES,
+                 max_in_flight=MAX_IN_FLIGHT, timeout=10.0):
+        self.providers = dict(providers)
+        self.batch_window = batch_window
+        self.max_retries = max_retries
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self.stats_counts = {'queued': 0, 'sent': 0, 'failed': 0, 'batches': 0, 'retries': 0}
+        self._lock = threading.Lock()
+        self._loop = None
+        self._ready = threading.Event()
+
+    def start(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._run_loop, name="notify-dispatcher", daemon=True).start()
+        self._ready.wait()
+        return self
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_until_complete(self._setup())
+        self._ready.set()
+        self._loop.run_forever()
+
+    async def _setup(self):
+        self._client = httpx.AsyncClient(
+            timeout=self.timeout,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=120),
+        )
+        self._queues, self._next_slot = {}, {}
+        self._in_flight, self._collectors = {}, []
+        for channel, provider in self.providers.items():
+            self._queues[channel] = asyncio.Queue()
+            self._next_slot[channel] = 0.0
+            self._in_flight[channel] = asyncio.Semaphore(self.max_in_flight)
+            self._collectors.append(asyncio.ensure_future(self._collect(channel, provider)))
+
+    def submit(self, recipient, message, channel="sms", key=None):
+        """
+        Queues one message and returns immediately.
+        Returns a Future that resolves once the provider accepted it.
+        """
+        if channel not in self.providers:
+            raise ValueError(f"Unknown notification channel: {channel}")
+        self.start()
+        future = Future()
+        with self._lock:
+            self.stats_counts['queued'] += 1
+        self._loop.call_soon_threadsafe(self._queues[channel].put_nowait, (recipient, message, key, future))
+        return future
+
+    def flush(self, timeout=None):
+        """Blocks until everything queued so far has been sent or has failed."""
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._drain(), self._loop).result(timeout)
+
+    async def _drain(self):
+        await asyncio.gather(*(q.join() for q in self._queues.values()))
+
+    def close(self, timeout=None):
+        """Sends what is queued, then closes the connections and stops the loop."""
+        if self._loop is None:
+            return
+        self.flush(timeout)
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result(timeout)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+    async def _shutdown(self):
+        for task in self._collectors:
+            task.cancel()
+        await asyncio.gather(*self._collectors, return_exceptions=True)
+        await self._client.aclose()
+
+    def stats(self):
+        with self._lock:
+            return dict(self.stats_counts)
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self.stats_counts[key] += n
+
+    async def _collect(self, channel, provider):
+        """Groups queued messages into batches and hands each to a sender task."""
+        queue = self._queues[channel]
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + self.batch_window
+            while len(batch) < provider.batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            await self._in_flight[channel].acquire()
+            asyncio.ensure_future(self._send(channel, provider, batch))
+
+    async def _wait_for_slot(self, channel, provider):
+        """Per-provider rate limit: requests are spaced 1/rate seconds apart."""
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        slot = max(now, self._next_slot[channel])
+        self._next_slot[channel] = slot + 1.0 / provider.rate_per_second
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    async def _post(self, channel, provider, batch):
+        if not provider.url:
+            for recipient, text, _ in batch:
+                print(f"[{channel.upper()}] Sending to {recipient}: {text}")
+            return
+        attempt = 0
+        while True:
+            await self._wait_for_slot(channel, provider)
+            try:
+                response = await self._client.post(provider.url, json=provider.payload(batch), headers=provider.headers)
+                if response.status_code < 300:
+                    return
+                error = httpx.HTTPStatusError(f"{response.status_code} from {channel}", request=response.request, response=response)
+                retryable = response.status_code in RETRY_STATUSES
+            except httpx.TransportError as e:
+                error, retryable = e, True
+            if not retryable or attempt >= self.max_retries:
+                raise error
+            attempt += 1
+            self._count('retries')
+            await asyncio.sleep(random.uniform(0, min(30.0, 0.5 * 2 ** attempt)))
+
+    async def _send(self, channel, provider, batch):
+        queue = self._queues[channel]
+        try:
+            await self._post(channel, provider, [item[:3] for item in batch])
+            self._count('sent', len(batch))
+            self._count('batches')
+            for *_, future in batch:
+                future.set_result(True)
+        except Exception as e:
+            logger.warning("Sending %d %s notifications failed: %s", len(batch), channel, e)
+            self._count('failed', len(batch))
+            for *_, future in batch:
+                future.set_exception(e)
+        finally:
+            self._in_flight[channel].release()
+            for _ in batch:
+                queue.task_done()
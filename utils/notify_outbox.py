@@ -0,0 +1,244 @@
+import datetime
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Stage changes of one site within this window become one message
+STAGE_WINDOW_SECONDS = 300
+DIGEST_HOUR = 18
+POLL_INTERVAL_SECONDS = 2
+# A claimed message not confirmed within this time is sent again
+LEASE_SECONDS = 120
+MAX_ATTEMPTS = 8
+MAX_BACKOFF_SECONDS = 3600
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    idem_key TEXT NOT NULL UNIQUE,
+    kind TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    recipient TEXT NOT NULL,
+    group_key TEXT,
+    payload TEXT NOT NULL,
+    due_at REAL NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_until REAL,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    sent_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox (status, due_at);
+CREATE INDEX IF NOT EXISTS idx_outbox_group ON outbox (kind, group_key, status);
+"""
+
+
+def message_key(*parts):
+    """Stable idempotency key from the parts that identify a message."""
+    return hashlib.sha1("\x1f".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+
+
+def next_digest_time(now, hour=DIGEST_HOUR):
+    """Epoch seconds of the next local digest hour after now."""
+    current = datetime.datetime.fromtimestamp(now)
+    at = current.replace(hour=hour, minute=0, second=0, microsecond=0)
+    if at <= current:
+        at += datetime.timedelta(days=1)
+    return at.timestamp()
+
+
+def render(kind, payload):
+    """Message text for an outbox row."""
+    if kind == 'stage':
+        stages = payload['stages']
+        text = f"[알림] '{payload['site_name']}' 현장의 단계가 '{stages[-1]}'(으)로 변경되었습니다."
+        if len(stages) > 1:
+            text += f" ({' → '.join(stages)})"
+        return text
+    if kind == 'digest':
+        sites = payload['sites']
+        return (f"[Field Master Pro] {payload['staff_name']}님, {len(sites)}개 현장의 담당자로 배정되었습니다: "
+                + ", ".join(f"'{s}'" for s in sites))
+    return payload['text']
+
+
+class NotificationOutbox:
+    """
+    Durable SQLite queue of outgoing notifications.
+
+    Every message is stored before anything is sent, under a unique
+    idempotency key, so enqueuing the same message twice is a no-op and a
+    restart loses nothing. Delivery is at-least-once: rows are leased while
+    in flight and become due again if the lease runs out without an ack.
+    Stage changes for one site are merged while their window is open, and
+    digest rows collect a recipient's assignments until the digest hour.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def enqueue(self, channel, recipient, text, key=None, due_at=None):
+        """
+        Queues a plain message; returns False if its key was already queued.
+        Without a key every call is a new message.
+        """
+        now = time.time()
+        key = key or uuid.uuid4().hex
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO outbox (idem_key, kind, channel, recipient, payload, due_at, created_at) "
+                "VALUES (?, 'message', ?, ?, ?, ?, ?)",
+                (key, channel, recipient, json.dumps({'text': text}, ensure_ascii=False), due_at or now, now),
+            )
+        return cursor.rowcount == 1
+
+    def _merge(self, kind, group_key, channel, recipient, due_at, update, initial):
+        """Adds to the open (pending, not yet due) row of a group, or starts a new one."""
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT id, payload FROM outbox WHERE kind = ? AND group_key = ? AND status = 'pending' "
+                "AND attempts = 0 AND due_at > ? ORDER BY id DESC LIMIT 1",
+                (kind, group_key, now),
+            ).fetchone()
+            if row:
+                payload = update(json.loads(row[1]))
+                self._conn.execute("UPDATE outbox SET payload = ? WHERE id = ?",
+                                   (json.dumps(payload, ensure_ascii=False), row[0]))
+                return False
+            self._conn.execute(
+                "INSERT INTO outbox (idem_key, kind, channel, recipient, group_key, payload, due_at, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (message_key(kind, group_key, now), kind, channel, recipient, group_key,
+                 json.dumps(initial, ensure_ascii=False), due_at, now),
+            )
+            return True
+
+    def enqueue_stage_change(self, site_name, stage, recipient, channel="kakao", window=STAGE_WINDOW_SECONDS):
+        """Queues a stage change, merged with other changes of the site within window seconds."""
+        def update(payload):
+            if payload['stages'][-1] != stage:
+                payload['stages'].append(stage)
+            return payload
+        return self._merge('stage', f"{recipient}|{site_name}", channel, recipient, time.time() + window,
+                           update, {'site_name': site_name, 'stages': [stage]})
+
+    def enqueue_digest(self, staff_name, site_name, recipient, channel="sms", hour=DIGEST_HOUR):
+        """Adds an assignment to the recipient's digest for the next digest hour."""
+        def update(payload):
+            if site_name not in payload['sites']:
+                payload['sites'].append(site_name)
+            return payload
+        return self._merge('digest', recipient, channel, recipient, next_digest_time(time.time(), hour),
+                           update, {'staff_name': staff_name, 'sites': [site_name]})
+
+    def claim(self, limit=100, lease=LEASE_SECONDS):
+        """Leases due messages for sending; returns (id, idem_key, channel, recipient, text) tuples."""
+        now = time.time()
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                "SELECT id, idem_key, kind, channel, recipient, payload FROM outbox "
+                "WHERE (status = 'pending' AND due_at <= ?) OR (status = 'sending' AND lease_until <= ?) "
+                "ORDER BY due_at LIMIT ?",
+                (now, now, limit),
+            ).fetchall()
+            self._conn.executemany(
+                "UPDATE outbox SET status = 'sending', lease_until = ?, attempts = attempts + 1 WHERE id = ?",
+                [(now + lease, r[0]) for r in rows],
+            )
+        return [(r[0], r[1], r[3], r[4], render(r[2], json.loads(r[5]))) for r in rows]
+
+    def ack(self, ids):
+        with self._lock, self._conn:
+            self._conn.executemany("UPDATE outbox SET status = 'sent', sent_at = ?, lease_until = NULL WHERE id = ?",
+                                   [(time.time(), i) for i in ids])
+
+    def fail(self, message_id, error, max_attempts=MAX_ATTEMPTS):
+        """Reschedules a failed message with backoff; gives up after max_attempts."""
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT attempts FROM outbox WHERE id = ?", (message_id,)).fetchone()
+            attempts = row[0] if row else max_attempts
+            status = 'dead' if attempts >= max_attempts else 'pending'
+            delay = min(MAX_BACKOFF_SECONDS, 5 * 2 ** attempts)
+            self._conn.execute(
+                "UPDATE outbox SET status = ?, due_at = ?, lease_until = NULL, last_error = ? WHERE id = ?",
+                (status, time.time() + delay, str(error)[:500], message_id),
+            )
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall())
+        return {status: counts.get(status, 0) for status in ('pending', 'sending', 'sent', 'dead')}
+
+    def purge(self, older_than_days=30):
+        """Drops sent messages older than the given age."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM outbox WHERE status = 'sent' AND sent_at < ?",
+                               (time.time() - older_than_days * 86400,))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class OutboxRelay(threading.Thread):
+    """
+    Moves due outbox messages to the dispatcher and records the outcome.
+    A message is acked only after the provider accepted it.
+    """
+
+    def __init__(self, outbox, dispatcher, poll_interval=POLL_INTERVAL_SECONDS, send_timeout=60):
+        super().__init__(name="notify-outbox", daemon=True)
+        self.outbox = outbox
+        self.dispatcher = dispatcher
+        self.poll_interval = poll_interval
+        self.send_timeout = send_timeout
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+
+    def run(self):
+        while not self._stopping.is_set():
+            try:
+                while self.relay_once():
+                    pass
+            except Exception as e:
+                logger.warning("Notification relay failed: %s", e)
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def notify(self):
+        self._wake.set()
+
+    def stop(self):
+        self._stopping.set()
+        self._wake.set()
+
+    def relay_once(self):
+        """Sends one claimed batch; returns the number of messages handled."""
+        claimed = self.outbox.claim()
+        futures = []
+        for message_id, key, channel, recipient, text in claimed:
+            try:
+                futures.append((message_id, self.dispatcher.submit(recipient, text, channel, key=key)))
+            except Exception as e:
+                self.outbox.fail(message_id, e)
+        sent = []
+        for message_id, future in futures:
+            try:
+                future.result(self.send_timeout)
+                sent.append(message_id)
+            except Exception as e:
+                self.outbox.fail(message_id, e)
+        self.outbox.ack(sent)
+        return len(claimed)
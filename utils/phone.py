@@ -0,0 +1,155 @@
+import re
+import threading
+
+import pandas as pd
+
+from utils.site_index import SITE_KEY
+
+# Canonical keys are national numbers with the leading 0 (or 15XX-style
+# representative numbers): 01012345678, 0212345678, 0311234567, 07012345678
+VALID_KEY = (
+    r"^(?:02\d{7,8}"            # Seoul
+    r"|01[016789]\d{7,8}"       # mobile
+    r"|0[3-6][1-5]\d{7,8}"      # other area codes
+    r"|070\d{8}"                # internet phone
+    r"|050\d{8,9}"              # personal numbers
+    r"|1[5-8]\d{6})$"           # 1588-xxxx
+)
+# Dash positions of a valid key: area code / exchange / line, or 1588-xxxx
+_GROUPED = r"^(02|050\d|0\d{2})(\d{3,4})(\d{4})$"
+_GROUPED_SHORT = r"^(1\d{3})(\d{4})$"
+_VALID = re.compile(VALID_KEY)
+# Phone-like runs inside free text (notes)
+PHONE_IN_TEXT = r"((?:\+?82[-.\s]?)?\(?0?\d{1,3}\)?[-.\s]?\d{3,4}[-.\s]?\d{4})"
+
+
+def _text(values):
+    """Cells as strings; whole floats (numbers typed into Sheets) lose their '.0'."""
+    if pd.api.types.is_float_dtype(values.dtype):
+        # Only whole numbers in int64 range go through Int64; 12.5 or 1e20 stay as written
+        whole = values.where((values % 1 == 0) & (values.abs() < 1e15))
+        text = values.astype("string")
+        return text.mask(whole.notna(), whole.astype("Int64").astype("string")).fillna("")
+    return values.astype("string").fillna("").str.replace(r"^(\d+)\.0$", r"\1", regex=True)
+
+
+def _national_digits(text):
+    """Digits in national form: +82 / 0082 become a leading 0."""
+    digits = text.str.replace(r"\D", "", regex=True)
+    # "+82 10-..." drops the 0, "+82 (0)10-..." keeps it; no domestic number starts with 8
+    digits = digits.str.replace(r"^(?:00)?820?", "0", regex=True)
+    # Sheets turns 010... typed as a number into 10...
+    return digits.str.replace(r"^(10\d{8})$", r"0\1", regex=True)
+
+
+def phone_keys(values):
+    """
+    Canonical digit key per cell, column-wise: landlines, mobiles, 070,
+    050X, 15XX and +82 numbers in any formatting map to one key. Cells that
+    are not a Korean phone number give "".
+    """
+    digits = _national_digits(_text(values))
+    valid = digits.str.match(VALID_KEY).fillna(False).astype(bool)
+    return digits.where(valid, "").astype(object)
+
+
+def phone_key(number):
+    """phone_keys for one value, without the per-call cost of building a Series."""
+    if number is None or (isinstance(number, float) and number != number):
+        return ""
+    if isinstance(number, float) and number.is_integer():
+        number = int(number)
+    digits = re.sub(r"\D", "", str(number))
+    if digits.startswith("0082"):
+        digits = digits[2:]
+    if digits.startswith("82"):
+        digits = digits[2:] if digits[2:3] == "0" else "0" + digits[2:]
+    if len(digits) == 10 and digits.startswith("10"):
+        digits = "0" + digits
+    return digits if _VALID.match(digits) else ""
+
+
+def format_phone_series(values):
+    """
+    Column-wise phone formatting: every Korean number is written with dashes
+    (010-1234-5678, 02-123-4567, 031-123-4567, 070-1234-5678, +82 numbers
+    as their national form); anything else is kept as entered. Missing
+    values become "".
+    """
+    text = _text(values)
+    digits = _national_digits(text)
+    valid = digits.str.match(VALID_KEY).fillna(False).astype(bool)
+    formatted = (digits.str.replace(_GROUPED, r"\1-\2-\3", regex=True)
+                 .str.replace(_GROUPED_SHORT, r"\1-\2", regex=True))
+    return formatted.where(valid, text).astype(object)
+
+
+def format_phone(phone):
+    """Single-value format_phone_series."""
+    if not isinstance(phone, str):
+        phone = str(phone) if phone else ""
+    return format_phone_series(pd.Series([phone], dtype=object)).iloc[0]
+
+
+class CallerIndex:
+    """
+    Phone key -> contact row labels and the sites they belong to.
+
+    Built column-wise from the contacts frame: the phone column plus any
+    numbers found in the note (where the importer keeps a contact's other
+    phones), so an incoming call is matched with one dict lookup.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rows = {}   # phone key -> [row labels]
+        self._sites = {}  # phone key -> [site_mgmt_id]
+
+    def rebuild(self, contacts, phone_column='phone', note_column='note'):
+        """Replaces the index with the numbers in contacts; returns the number of keys."""
+        parts = []
+        if phone_column in contacts.columns:
+            parts.append(phone_keys(contacts[phone_column]))
+        if note_column in contacts.columns:
+            notes = _text(contacts[note_column])
+            notes = notes[notes.str.contains(r"\d{3}", regex=True)]
+            found = notes.str.extractall(PHONE_IN_TEXT)[0]
+            if len(found):
+                parts.append(pd.Series(phone_keys(found).to_numpy(), index=found.index.get_level_values(0)))
+        if parts:
+            keys = pd.concat(parts)
+            keys = keys[keys != ""]
+            pairs = pd.DataFrame({'key': keys.to_numpy(), 'row': keys.index})
+        else:
+            pairs = pd.DataFrame({'key': [], 'row': []})
+        pairs = pairs.drop_duplicates()
+        if SITE_KEY in contacts.columns:
+            pairs['site'] = contacts[SITE_KEY].astype(str).reindex(pairs['row']).to_numpy()
+        else:
+            pairs['site'] = ""
+
+        rows, sites = {}, {}
+        for key, row, site in zip(pairs['key'].tolist(), pairs['row'].tolist(), pairs['site'].tolist()):
+            rows.setdefault(key, []).append(row)
+            if site and site == site and site not in sites.setdefault(key, []):
+                sites[key].append(site)
+        with self._lock:
+            self._rows, self._sites = rows, sites
+        return len(rows)
+
+    def lookup(self, number):
+        """
+        Matches a caller's number in any format.
+
+        Returns:
+            dict: 'key' (canonical digits), 'rows' (contact row labels), 'sites' (site_mgmt_ids).
+        """
+        key = phone_key(number)
+        with self._lock:
+            return {'key': key, 'rows': list(self._rows.get(key, ())), 'sites': list(self._sites.get(key, ()))}
+
+    def __len__(self):
+        return len(self._rows)
+
+
+caller_index = CallerIndex()
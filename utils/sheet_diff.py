@@ -0,0 +1,162 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+
+def cell_value(value):
+    """Converts a DataFrame cell into a JSON-safe value for the Sheets API."""
+    if value is None:
+        return ""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return ""
+    if value is pd.NA or value is pd.NaT:
+        return ""
+    if isinstance(value, (str, bool, int, float)):
+        return value
+    return str(value)
+
+
+def cell_text(value):
+    """Text form of a cell, used to compare values read back from Sheets."""
+    value = cell_value(value)
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def frame_to_values(df):
+    """DataFrame -> list of lists, header first, as stored in the worksheet."""
+    header = [str(c) for c in df.columns]
+    rows = [[cell_value(v) for v in row] for row in df.itertuples(index=False, name=None)]
+    return [header] + rows
+
+
+def apply_blocks(values, blocks):
+    """
+    Writes diff_values blocks into worksheet values, the way the batch
+    update of write_sheet_diffs lands on the live sheet: only the cells in
+    the blocks change. Returns a patched copy.
+    """
+    patched = [list(r) for r in values]
+    for row, col, block in blocks:
+        for offset, cells in enumerate(block):
+            while len(patched) <= row + offset:
+                patched.append([])
+            target = patched[row + offset]
+            target.extend([""] * (col + len(cells) - len(target)))
+            target[col:col + len(cells)] = cells
+    return patched
+
+
+def patch_by_key(values, key_header, patches):
+    """
+    Sets cells by row key instead of position, so rows that moved since the
+    patch was computed still get their own cells.
+
+    Args:
+        values (list): worksheet values, header first.
+        key_header (str): header of the key column, e.g. 관리번호.
+        patches (dict): key -> {header: value}. Headers not in values are skipped.
+    Returns:
+        (values, changed): a patched copy and the number of rows changed.
+    """
+    header = values[0] if values else []
+    if key_header not in header:
+        return values, 0
+    key_col = header.index(key_header)
+    columns = {h: i for i, h in enumerate(header)}
+    patched = [list(r) for r in values]
+    changed = 0
+    for row in patched[1:]:
+        cells = patches.get(str(row[key_col]) if key_col < len(row) else None)
+        differs = False
+        for name, value in (cells or {}).items():
+            col = columns.get(name)
+            if col is None:
+                continue
+            row.extend([""] * (col + 1 - len(row)))
+            if cell_text(row[col]) != cell_text(value):
+                row[col] = cell_value(value)
+                differs = True
+        changed += differs
+    return patched, changed
+
+
+def values_to_frame(values, mapping=None):
+    """
+    Worksheet values (header first) -> DataFrame of object columns.
+    Headers are renamed through mapping while the frame is built.
+    """
+    if not values:
+        return pd.DataFrame()
+    mapping = mapping or {}
+    header, rows = values[0], values[1:]
+    width = len(header)
+    # The API trims trailing empty cells, so rows can be shorter than the header
+    rows = [r[:width] if len(r) >= width else list(r) + [""] * (width - len(r)) for r in rows]
+    return pd.DataFrame(rows, columns=[mapping.get(h, h) for h in header], dtype=object)
+
+
+# Plain decimal literals, thousands separators allowed, no leading zeros:
+# '010' or '0123' (phones, IDs) must compare as text
+_PLAIN_NUMBER = re.compile(r"^-?(?:0|[1-9]\d{0,2}(?:,\d{3})+|[1-9]\d*)(?:\.\d+)?$")
+
+
+def _same_number(a, b):
+    """'1,100,000' and '1100000' are the same cell once formatting is ignored; '010' and '10' are not."""
+    if not (_PLAIN_NUMBER.match(a) and _PLAIN_NUMBER.match(b)):
+        return False
+    return float(a.replace(",", "")) == float(b.replace(",", ""))
+
+
+def _text_grid(values, n_rows, n_cols):
+    grid = np.full((n_rows, n_cols), "", dtype=object)
+    for i, row in enumerate(values[:n_rows]):
+        texts = [cell_text(v) for v in row[:n_cols]]
+        grid[i, :len(texts)] = texts
+    return grid
+
+
+def diff_values(old, new):
+    """
+    Compares the last-loaded worksheet values with the values to be saved.
+
+    Returns:
+        list of (row, col, values) blocks, 0-based, covering changed cell runs
+        of existing rows, appended rows and blanked-out deleted rows.
+    """
+    old_width = max((len(r) for r in old), default=0)
+    new_width = max((len(r) for r in new), default=0)
+    width = max(old_width, new_width)
+    common = min(len(old), len(new))
+    blocks = []
+
+    # 1. Rows present in both: one block per row spanning its changed cells
+    if common and width:
+        old_grid = _text_grid(old, common, width)
+        new_grid = _text_grid(new, common, width)
+        changed = old_grid != new_grid
+        for i, j in zip(*np.nonzero(changed)):
+            if _same_number(old_grid[i, j], new_grid[i, j]):
+                changed[i, j] = False
+        for i in np.flatnonzero(changed.any(axis=1)):
+            cols = np.flatnonzero(changed[i])
+            first, last = int(cols[0]), int(cols[-1])
+            row = [cell_value(v) for v in new[i]] + [""] * width
+            blocks.append((int(i), first, [row[first:last + 1]]))
+
+    # 2. Appended rows: one block
+    if len(new) > common:
+        rows = [[cell_value(v) for v in r] + [""] * (width - len(r)) for r in new[common:]]
+        blocks.append((common, 0, rows))
+
+    # 3. Deleted rows: blank them out
+    if len(old) > common and old_width:
+        blocks.append((common, 0, [[""] * old_width for _ in old[common:]]))
+
+    return blocks
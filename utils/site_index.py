@@ -0,0 +1,62 @@
+SITE_KEY = 'site_mgmt_id'
+
+
+class SiteIndex:
+    """
+    site_mgmt_id -> row labels of one table.
+
+    Built once from groupby indices, then kept current with add / remove /
+    move as rows change in memory, so looking up one site is O(1) + O(k)
+    instead of a scan over the whole frame.
+    """
+
+    def __init__(self, groups=None, site_of=None):
+        self._groups = groups or {}    # site_id -> [row labels]
+        self._site_of = site_of or {}  # row label -> site_id
+
+    @classmethod
+    def build(cls, df, key=SITE_KEY):
+        if key not in df.columns or df.empty:
+            return cls()
+        groups = {
+            str(site): df.index[positions].tolist()
+            for site, positions in df.groupby(key, sort=False).indices.items()
+        }
+        site_of = {label: site for site, labels in groups.items() for label in labels}
+        return cls(groups, site_of)
+
+    def rows(self, site_id):
+        """Row labels of one site (empty list if unknown)."""
+        return list(self._groups.get(str(site_id), ()))
+
+    def add(self, label, site_id):
+        if label in self._site_of:
+            self.remove(label)
+        site_id = str(site_id)
+        self._groups.setdefault(site_id, []).append(label)
+        self._site_of[label] = site_id
+
+    def remove(self, label):
+        site_id = self._site_of.pop(label, None)
+        if site_id is None:
+            return
+        labels = self._groups[site_id]
+        labels.remove(label)
+        if not labels:
+            del self._groups[site_id]
+
+    def move(self, label, site_id):
+        """Re-files a row whose site_mgmt_id was edited."""
+        self.add(label, site_id)
+
+    def copy(self):
+        return SiteIndex({k: list(v) for k, v in self._groups.items()}, dict(self._site_of))
+
+    def sites(self):
+        return list(self._groups)
+
+    def __contains__(self, site_id):
+        return str(site_id) in self._groups
+
+    def __len__(self):
+        return len(self._groups)
@@ -0,0 +1,291 @@
+import itertools
+from collections.abc import MutableMapping
+
+import pandas as pd
+
+from utils.column_schema import restore_frame
+from utils.sheet_diff import cell_text
+from utils.site_index import SiteIndex, SITE_KEY
+
+# Sessions get shallow copies of the shared frames. pandas 3 always copies on
+# write; on pandas 2 it has to be switched on so a session can never write
+# into a snapshot another session is reading.
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option('mode.copy_on_write', True)
+
+_versions = itertools.count(1)
+
+
+class Snapshot:
+    """
+    Immutable, versioned set of the loaded DataFrames, shared by all sessions.
+
+    Args:
+        frames (dict): 'master' / 'contacts' / 'works' -> DataFrame.
+        sheet_values (dict): worksheet name -> raw values, for diff-based saves.
+        column_formats (dict): key -> apply_schema formats, to restore typed columns on save.
+
+    Per-site indexes of every table are built here, once per load.
+    """
+
+    __slots__ = ('version', 'frames', 'sheet_values', 'column_formats', 'site_indexes')
+
+    def __init__(self, frames, sheet_values=None, column_formats=None):
+        self.version = next(_versions)
+        self.frames = dict(frames)
+        self.sheet_values = dict(sheet_values or {})
+        self.column_formats = dict(column_formats or {})
+        self.site_indexes = {key: SiteIndex.build(df) for key, df in self.frames.items()}
+
+    def memory_usage(self):
+        """Deep memory use of all frames, in bytes."""
+        return int(sum(df.memory_usage(deep=True).sum() for df in self.frames.values()))
+
+
+class SessionData(MutableMapping):
+    """
+    One session's view of a Snapshot.
+
+    Reads reference the shared frames (copy-on-write, nothing is duplicated).
+    Edits are kept in a small overlay - changed cells, appended and deleted
+    rows, or a whole replaced table - and are applied only when a table is
+    materialized, i.e. when it is read back after an edit or saved.
+
+    Behaves like the plain {'master', 'contacts', 'works'} dict it replaces;
+    assigning data[key] = df records a whole-table replacement.
+    """
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self._replaced = {}   # key -> DataFrame
+        self._cells = {}      # key -> {(row, col): value}
+        self._appended = {}   # key -> {row label: {col: value}}
+        self._deleted = {}    # key -> set of row labels
+        self._views = {}      # key -> materialized DataFrame
+        self._indexes = {}    # key -> SiteIndex, once this session changes rows
+        self._next_label = {}
+
+    # --- Mapping interface ---
+    def __getitem__(self, key):
+        if key not in self._views:
+            self._views[key] = self.materialize(key)
+        return self._views[key]
+
+    def __setitem__(self, key, df):
+        self._discard(key)
+        self._replaced[key] = df
+
+    def __delitem__(self, key):
+        raise TypeError("Tables cannot be removed from a session")
+
+    def __iter__(self):
+        return iter(self.snapshot.frames)
+
+    def __len__(self):
+        return len(self.snapshot.frames)
+
+    # --- Overlay edits ---
+    def update_cell(self, key, row, col, value):
+        """Sets one cell, addressed by row label and column name."""
+        if row in self._appended.get(key, {}):
+            self._appended[key][row][col] = value
+        else:
+            self._cells.setdefault(key, {})[(row, col)] = value
+        if col == SITE_KEY:
+            self._own_index(key).move(row, value)
+        self._views.pop(key, None)
+
+    def append_row(self, key, values):
+        """Appends a row (dict of column -> value); returns its row label."""
+        label = self._new_label(key)
+        self._appended.setdefault(key, {})[label] = dict(values)
+        if SITE_KEY in values:
+            self._own_index(key).add(label, values[SITE_KEY])
+        self._views.pop(key, None)
+        return label
+
+    def delete_row(self, key, row):
+        """Removes a row by label."""
+        if self._appended.get(key, {}).pop(row, None) is None:
+            self._deleted.setdefault(key, set()).add(row)
+        self._own_index(key).remove(row)
+        self._views.pop(key, None)
+
+    def is_dirty(self, key=None):
+        """True if the session has unsaved edits (for one table or any)."""
+        keys = [key] if key is not None else list(self)
+        return any(
+            k in self._replaced or self._cells.get(k) or self._appended.get(k) or self._deleted.get(k)
+            for k in keys
+        )
+
+    def edits(self, key):
+        """
+        What this session changed in one table, compared cell by cell with
+        its snapshot as sheet text. Replaced tables are compared the same way,
+        and cells set back to their snapshot value are not edits.
+
+        Returns:
+            (cells, deleted, appended): {(row, col): value}, a set of row
+            labels and {row label: {col: value}}.
+        """
+        formats = self.snapshot.column_formats.get(key)
+        df = self[key]
+        old = restore_frame(self.snapshot.frames[key], formats)
+        new = restore_frame(df, formats)
+        common = new.index.intersection(old.index)
+        cells = {}
+        for col in new.columns:
+            after = new.loc[common, col]
+            before = old.loc[common, col] if col in old.columns else pd.Series("", index=common, dtype=object)
+            differs = after.map(cell_text).to_numpy() != before.map(cell_text).to_numpy()
+            for row, value in df.loc[common[differs], col].items():
+                cells[(row, col)] = value
+        deleted = set(old.index.difference(new.index))
+        appended = {row: df.loc[row].to_dict() for row in new.index.difference(old.index)}
+        return cells, deleted, appended
+
+    def rebase(self, snapshot):
+        """
+        Carries this session's unsaved edits over to a newer snapshot.
+
+        Only the cells that differ from the old snapshot (see edits) are
+        carried, so values other users changed meanwhile are never written
+        back, even for tables this session replaced. Edited and deleted rows
+        are found again by their content in the old snapshot (labels shift
+        when another user adds or deletes rows), then by a unique
+        site_mgmt_id, then by the same label holding the same site.
+        Appended rows are appended again.
+
+        Returns:
+            (SessionData, lost): the rebased session and a list of
+            (key, row label) edits whose row no longer exists.
+        """
+        session = SessionData(snapshot)
+        lost = []
+        for key in self:
+            if not self.is_dirty(key):
+                continue
+            cells, deleted, appended = self.edits(key)
+            rows = set(r for r, _ in cells) | deleted
+            moved = _match_rows(self.snapshot.frames[key], snapshot.frames[key], rows) if rows else {}
+            for (row, col), value in cells.items():
+                if row in moved:
+                    session.update_cell(key, moved[row], col, value)
+                else:
+                    lost.append((key, row))
+            for row in deleted:
+                if row in moved:
+                    session.delete_row(key, moved[row])
+            for values in appended.values():
+                session.append_row(key, values)
+        return session, sorted(set(lost), key=str)
+
+    def overlay_size(self):
+        """Number of pending cell edits, appended and deleted rows."""
+        return sum(len(v) for part in (self._cells, self._appended, self._deleted) for v in part.values())
+
+    def materialize(self, key):
+        """Builds the table as this session sees it: snapshot (or replacement) plus overlay."""
+        df = self._replaced.get(key)
+        if df is None:
+            df = self.snapshot.frames[key]
+        df = df.copy(deep=False)
+
+        deleted = self._deleted.get(key)
+        if deleted:
+            df = df.drop(index=[r for r in deleted if r in df.index])
+
+        cells = self._cells.get(key)
+        if cells:
+            by_col = {}
+            for (row, col), value in cells.items():
+                if row in df.index:
+                    by_col.setdefault(col, {})[row] = value
+            for col, edits in by_col.items():
+                # Only the edited columns are copied
+                series = df[col].astype(object) if col in df.columns else pd.Series("", index=df.index, dtype=object)
+                series.loc[list(edits)] = list(edits.values())
+                df[col] = series
+
+        appended = self._appended.get(key)
+        if appended:
+            df = pd.concat([df, pd.DataFrame.from_dict(appended, orient='index')])
+        return df
+
+    # --- Per-site lookups ---
+    def site_index(self, key):
+        """The SiteIndex of a table as this session sees it."""
+        if key in self._indexes:
+            return self._indexes[key]
+        if key in self._replaced:
+            self._indexes[key] = SiteIndex.build(self._replaced[key])
+            return self._indexes[key]
+        return self.snapshot.site_indexes[key]
+
+    def site_bundle(self, site_id):
+        """
+        One site's master row, contacts and work logs, looked up through the
+        per-site indexes instead of filtering the full frames.
+
+        Returns:
+            dict: 'master' (Series or None), 'contacts' and 'works' (DataFrames).
+        """
+        bundle = {}
+        for key in self:
+            df = self[key]
+            bundle[key] = df.loc[self.site_index(key).rows(site_id)]
+        master = bundle.get('master')
+        bundle['master'] = master.iloc[0] if master is not None and len(master) else None
+        return bundle
+
+    # --- Internals ---
+    def _own_index(self, key):
+        # Copy the shared index the first time this session changes rows
+        if key not in self._indexes:
+            self._indexes[key] = self.site_index(key).copy()
+        return self._indexes[key]
+
+    def _new_label(self, key):
+        if key not in self._next_label:
+            base = self._replaced.get(key, self.snapshot.frames[key])
+            self._next_label[key] = int(base.index.max()) + 1 if len(base.index) else 0
+        label = self._next_label[key]
+        self._next_label[key] += 1
+        return label
+
+    def _discard(self, key):
+        for part in (self._replaced, self._cells, self._appended, self._deleted, self._views,
+                     self._indexes, self._next_label):
+            part.pop(key, None)
+
+
+def _match_rows(old, new, rows):
+    """Old row label -> label of the same row in new, for the given labels that can still be found."""
+    columns = [c for c in old.columns if c in new.columns]
+    old_hashes = pd.util.hash_pandas_object(old[columns].astype(str), index=False)
+    new_hashes = pd.util.hash_pandas_object(new[columns].astype(str), index=False)
+    by_hash = {}
+    for label, value in new_hashes.items():
+        by_hash.setdefault(value, []).append(label)
+    by_site = {}
+    if SITE_KEY in columns:
+        old_sites, new_sites = old[SITE_KEY].astype(str), new[SITE_KEY].astype(str)
+        unique = set(old_sites[~old_sites.duplicated(keep=False)]) & set(new_sites[~new_sites.duplicated(keep=False)])
+        by_site = {site: label for label, site in new_sites.items() if site in unique}
+    moved = {}
+    for row in rows:
+        if row not in old.index:
+            continue
+        value = old_hashes[row]
+        site = str(old.at[row, SITE_KEY]) if SITE_KEY in columns else None
+        if row in new.index and new_hashes[row] == value:
+            moved[row] = row
+        elif len(by_hash.get(value, ())) == 1:
+            moved[row] = by_hash[value][0]
+        elif site in by_site:
+            # The only row of its site, with other cells edited by someone else
+            moved[row] = by_site[site]
+        elif site is not None and row in new.index and str(new.at[row, SITE_KEY]) == site:
+            moved[row] = row
+    return moved
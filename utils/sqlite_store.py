@@ -0,0 +1,363 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+from utils.sheet_diff import apply_blocks, cell_value, diff_values, patch_by_key
+from utils.api_scheduler import scheduler
+
+logger = logging.getLogger(__name__)
+
+SITE_ID_HEADER = "관리번호"
+PUSH_INTERVAL_SECONDS = 5
+PULL_INTERVAL_SECONDS = 60
+MAX_BACKOFF_SECONDS = 300
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sheet_rows (
+    sheet TEXT NOT NULL,
+    row INTEGER NOT NULL,
+    site_mgmt_id TEXT,
+    cells TEXT NOT NULL,
+    PRIMARY KEY (sheet, row)
+);
+CREATE INDEX IF NOT EXISTS idx_sheet_rows_site ON sheet_rows (sheet, site_mgmt_id);
+CREATE TABLE IF NOT EXISTS sheet_headers (sheet TEXT PRIMARY KEY, header TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS remote_values (sheet TEXT PRIMARY KEY, sheet_values TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS sync_queue (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    sheet TEXT NOT NULL,
+    queued_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+
+def _dumps(row):
+    return json.dumps([cell_value(v) for v in row], ensure_ascii=False)
+
+
+class LocalMirror:
+    """
+    Local SQLite copy of the worksheets (Master_DB, 연락처_DB, Work_DB).
+
+    The UI reads and writes here. Every local write queues the worksheet in
+    sync_queue, which SyncWorker drains into Google Sheets; the queue lives
+    in the same file, so pending pushes survive restarts. Rows are stored as
+    JSON cell arrays and indexed by 관리번호.
+    """
+
+    def __init__(self, path, site_id_header=SITE_ID_HEADER):
+        self.path = path
+        self.site_id_header = site_id_header
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    # --- Reads ---
+    def read_values(self, sheet):
+        """Worksheet values (header first) as stored locally, or None if never synced."""
+        with self._lock:
+            return self._read(sheet)
+
+    def _read(self, sheet):
+        header = self._conn.execute("SELECT header FROM sheet_headers WHERE sheet = ?", (sheet,)).fetchone()
+        if header is None:
+            return None
+        rows = self._conn.execute("SELECT cells FROM sheet_rows WHERE sheet = ? ORDER BY row", (sheet,)).fetchall()
+        return [json.loads(header[0])] + [json.loads(r[0]) for r in rows]
+
+    def rows_for_site(self, sheet, site_id):
+        """Rows of one site, looked up through the site_mgmt_id index."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT cells FROM sheet_rows WHERE sheet = ? AND site_mgmt_id = ? ORDER BY row", (sheet, str(site_id))
+            ).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def revision(self):
+        """Counter bumped on every local change; cheap freshness check for caches."""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'revision'").fetchone()
+        return int(row[0]) if row else 0
+
+    # --- Writes ---
+    def write_values(self, sheet, values, enqueue=True):
+        """
+        Stores worksheet values, touching only rows that changed.
+        With enqueue=True the sheet is queued for the next push to Sheets.
+
+        Returns:
+            bool: True if anything changed.
+        """
+        with self._lock, self._conn:
+            return self._store(sheet, values, enqueue)
+
+    def apply_diff(self, sheet, base, values, enqueue=True):
+        """
+        Applies only the cells that differ between base (the values an edit
+        started from) and values onto what is stored now, in one transaction,
+        the way write_sheet_diffs patches the live worksheet. Changes written
+        by others since base was read are kept. Without a base the whole
+        sheet is written.
+
+        Returns:
+            bool: True if anything changed.
+        """
+        if base is None:
+            return self.write_values(sheet, values, enqueue)
+        blocks = diff_values(base, values)
+        if not blocks:
+            return False
+        with self._lock, self._conn:
+            return self._store(sheet, apply_blocks(self._read(sheet) or [], blocks), enqueue)
+
+    def patch_rows(self, sheet, patches, enqueue=True):
+        """
+        Sets cells of the stored rows by 관리번호 (see sheet_diff.patch_by_key),
+        reading and writing in one transaction.
+
+        Returns:
+            int: the number of rows changed.
+        """
+        with self._lock, self._conn:
+            values, changed = patch_by_key(self._read(sheet) or [], self.site_id_header, patches)
+            if changed:
+                self._store(sheet, values, enqueue)
+        return changed
+
+    def write_remote_values(self, sheet, values):
+        """
+        Stores values pulled from Sheets, unless local changes to the sheet
+        are still queued. The queue check and the write share one transaction,
+        so a local save cannot land in between and be overwritten.
+
+        Returns:
+            bool or None: True if anything changed, None if skipped for pending changes.
+        """
+        with self._lock, self._conn:
+            if self._conn.execute("SELECT 1 FROM sync_queue WHERE sheet = ? LIMIT 1", (sheet,)).fetchone():
+                return None
+            changed = self._store(sheet, values, enqueue=False)
+            self._set_remote(sheet, values)
+        return changed
+
+    def _store(self, sheet, values, enqueue):
+        # Runs inside the caller's lock and transaction
+        header, rows = (values[0], values[1:]) if values else ([], [])
+        key_col = header.index(self.site_id_header) if self.site_id_header in header else None
+        new_header = _dumps(header)
+        new_rows = [_dumps(r) for r in rows]
+
+        old_header = self._conn.execute("SELECT header FROM sheet_headers WHERE sheet = ?", (sheet,)).fetchone()
+        old_rows = dict(self._conn.execute("SELECT row, cells FROM sheet_rows WHERE sheet = ?", (sheet,)).fetchall())
+        changed = old_header is None or old_header[0] != new_header
+
+        upserts = [
+            (sheet, i, str(rows[i][key_col]) if key_col is not None and key_col < len(rows[i]) else None, cells)
+            for i, cells in enumerate(new_rows)
+            if old_rows.get(i) != cells
+        ]
+        removed = [(sheet, i) for i in old_rows if i >= len(new_rows)]
+        if not (changed or upserts or removed):
+            return False
+
+        self._conn.execute("INSERT OR REPLACE INTO sheet_headers VALUES (?, ?)", (sheet, new_header))
+        self._conn.executemany("INSERT OR REPLACE INTO sheet_rows VALUES (?, ?, ?, ?)", upserts)
+        self._conn.executemany("DELETE FROM sheet_rows WHERE sheet = ? AND row = ?", removed)
+        if enqueue:
+            self._conn.execute("INSERT INTO sync_queue (sheet, queued_at) VALUES (?, ?)", (sheet, time.time()))
+        self._conn.execute(
+            "INSERT INTO meta VALUES ('revision', '1') "
+            "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+        )
+        return True
+
+    # --- Sync bookkeeping ---
+    def pending(self):
+        """Queued sheets -> highest queue id, i.e. what still has to be pushed."""
+        with self._lock:
+            return dict(self._conn.execute("SELECT sheet, MAX(id) FROM sync_queue GROUP BY sheet").fetchall())
+
+    def ack(self, sheet, up_to_id):
+        """Removes queue entries that have been pushed."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM sync_queue WHERE sheet = ? AND id <= ?", (sheet, up_to_id))
+
+    def remote_values(self, sheet):
+        """Values last known to be in Google Sheets, the base for push diffs."""
+        with self._lock:
+            row = self._conn.execute("SELECT sheet_values FROM remote_values WHERE sheet = ?", (sheet,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set_remote_values(self, sheet, values):
+        with self._lock, self._conn:
+            self._set_remote(sheet, values)
+
+    def _set_remote(self, sheet, values):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO remote_values VALUES (?, ?)",
+            (sheet, json.dumps([[cell_value(v) for v in r] for r in values], ensure_ascii=False)),
+        )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class GoogleSheetsAdapter:
+    """Sync target backed by the real spreadsheet (see google_api)."""
+
+    def __init__(self, spreadsheet_key):
+        self.spreadsheet_key = spreadsheet_key
+
+    def fetch(self, sheets):
+        from utils.google_api import fetch_sheet_values
+        values = fetch_sheet_values(self.spreadsheet_key, sheets)
+        if values is None:
+            raise RuntimeError("Google credentials are not configured")
+        return values
+
+    def push(self, changes):
+        from utils.google_api import write_sheet_diffs
+        written = write_sheet_diffs(self.spreadsheet_key, changes)
+        if written is None:
+            raise RuntimeError("Google credentials are not configured")
+        return written
+
+
+class MemorySheetsAdapter:
+    """In-memory stand-in for Google Sheets, for offline use and tests."""
+
+    def __init__(self, sheets=None):
+        self.sheets = {name: [list(r) for r in values] for name, values in (sheets or {}).items()}
+        self.fetches = 0
+        self.pushes = 0
+
+    def fetch(self, sheets):
+        self.fetches += 1
+        return {name: [list(r) for r in self.sheets.get(name, [])] for name in sheets}
+
+    def push(self, changes):
+        """Applies the cells that differ between old and new onto the current sheet, like write_sheet_diffs."""
+        self.pushes += 1
+        written = []
+        for name, (old, new) in changes.items():
+            current = self.sheets.get(name, [])
+            blocks = diff_values(current if old is None else old, new)
+            if blocks:
+                self.sheets[name] = apply_blocks(current, blocks)
+                written.append(name)
+        return written
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_local_backend(path, adapter_factory, sheets):
+    """
+    Returns the process-wide (mirror, worker) pair for path, starting the
+    worker on first use. An empty mirror is filled with one synchronous pull.
+    """
+    with _backends_lock:
+        if path not in _backends:
+            mirror = LocalMirror(path)
+            worker = SyncWorker(mirror, adapter_factory(), sheets)
+            if all(mirror.read_values(sheet) is None for sheet in sheets):
+                try:
+                    worker.pull()
+                except Exception as e:
+                    logger.warning("Initial pull into %s failed: %s", path, e)
+            worker.start()
+            _backends[path] = (mirror, worker)
+        return _backends[path]
+
+
+class SyncWorker(threading.Thread):
+    """
+    Write-behind worker: pushes queued local changes to Sheets in one batch
+    and periodically pulls remote changes into the mirror. Sheets with local
+    changes still queued are not overwritten by a pull.
+    """
+
+    def __init__(self, mirror, adapter, sheets,
+                 push_interval=PUSH_INTERVAL_SECONDS, pull_interval=PULL_INTERVAL_SECONDS):
+        super().__init__(name="sheets-sync", daemon=True)
+        self.mirror = mirror
+        self.adapter = adapter
+        self.sheets = list(sheets)
+        self.push_interval = push_interval
+        self.pull_interval = pull_interval
+        self.last_error = None
+        self.pushes = 0
+        self.pulls = 0
+        self.failures = 0
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._last_pull = 0.0
+
+    def run(self):
+        backoff = self.push_interval
+        while not self._stopping.is_set():
+            try:
+                self.push()
+                if time.monotonic() - self._last_pull >= self.pull_interval:
+                    # Polling reads yield to user requests in the scheduler
+                    with scheduler.background():
+                        self.pull()
+                backoff = self.push_interval
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e)
+                logger.warning("Sheets sync failed: %s", e)
+                backoff = min(backoff * 2, MAX_BACKOFF_SECONDS)
+            self._wake.wait(backoff)
+            self._wake.clear()
+
+    def notify(self):
+        """Wakes the worker so queued changes go out without waiting for the interval."""
+        self._wake.set()
+
+    def stop(self):
+        self._stopping.set()
+        self._wake.set()
+
+    def push(self):
+        """Pushes every queued sheet in one batch; returns the sheets written."""
+        pending = self.mirror.pending()
+        if not pending:
+            return []
+        changes = {
+            sheet: (self.mirror.remote_values(sheet), self.mirror.read_values(sheet) or [])
+            for sheet in pending
+        }
+        written = self.adapter.push(changes)
+        for sheet, up_to_id in pending.items():
+            self.mirror.set_remote_values(sheet, changes[sheet][1])
+            self.mirror.ack(sheet, up_to_id)
+        self.pushes += 1
+        return written
+
+    def pull(self):
+        """Pulls remote values into the mirror; returns the sheets that changed."""
+        remote = self.adapter.fetch(self.sheets)
+        changed = []
+        for sheet, values in remote.items():
+            # Skipped while local changes are queued; they are pushed first
+            if self.mirror.write_remote_values(sheet, values):
+                changed.append(sheet)
+        self._last_pull = time.monotonic()
+        self.pulls += 1
+        return changed
+
+    def stats(self):
+        return {
+            'queued': len(self.mirror.pending()),
+            'pushes': self.pushes,
+            'pulls': self.pulls,
+            'failures': self.failures,
+            'last_error': self.last_error,
+        }
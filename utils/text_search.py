@@ -0,0 +1,215 @@
+import heapq
+import json
+import math
+import os
+import re
+import threading
+import unicodedata
+from collections import Counter
+
+import pandas as pd
+
+from utils.local_paths import local_path
+from utils.site_index import SITE_KEY
+
+# Free-text columns indexed per table
+TEXT_COLUMNS = {
+    'works': ['content', 'detail'],
+    'contacts': ['note'],
+}
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN = re.compile(r"\w+")
+
+
+def normalize(text):
+    """NFKC, lower case: full-width letters and digits match their ASCII forms."""
+    return unicodedata.normalize("NFKC", str(text)).lower()
+
+
+def bigrams(text):
+    """
+    Character bigrams of each word, as a Counter.
+    Bigrams work for Korean without a morphological analyzer: "정안공장"
+    is found by "정안", "공장" or "정안 공장". One-letter words are kept whole;
+    in a query they match every term containing the letter (see TextIndex).
+    """
+    terms = Counter()
+    for token in _TOKEN.findall(normalize(text)):
+        if len(token) == 1:
+            terms[token] += 1
+        else:
+            terms.update(token[i:i + 2] for i in range(len(token) - 1))
+    return terms
+
+
+def row_fingerprints(df, columns):
+    """uint64 hash per row of the site id and text columns; changes when a row's text does."""
+    cols = [c for c in [SITE_KEY] + list(columns) if c in df.columns]
+    return pd.util.hash_pandas_object(df[cols].astype(str), index=False)
+
+
+class TextIndex:
+    """
+    Inverted index of character bigrams over the free-text columns, stored as JSON.
+
+    One document per row (its text columns joined), keyed "table:row label"
+    and tagged with the row's site_mgmt_id. sync() compares a per-row hash
+    with what is indexed and only re-tokenizes rows that were added or
+    changed, so a reload after a save touches just the edited rows. Hits are
+    ranked with BM25 and must contain every bigram of the query; a
+    one-letter query word matches any term containing it, so "탱" finds "탱크".
+
+    The index is shared by every session and synced from each loaded
+    snapshot, so it holds saved data only: a session's unsaved edits are not
+    searchable until they are saved (saving reloads, which syncs them).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._postings = {}  # bigram -> {doc id: term frequency}
+        self._docs = {}      # doc id -> [table, row label, site_mgmt_id, fingerprint, length, bigrams]
+        self._chars = {}     # letter -> terms containing it, for one-letter query words
+        self._total_length = 0
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                saved = json.load(f)
+            self._postings, self._docs = saved['postings'], saved['docs']
+            self._total_length = sum(doc[4] for doc in self._docs.values())
+            for term in self._postings:
+                self._add_chars(term)
+
+    def add(self, table, label, site_id, text, fingerprint=None):
+        """Indexes (or re-indexes) one row."""
+        doc_id = f"{table}:{label}"
+        terms = bigrams(text)
+        with self._lock:
+            self._remove(doc_id)
+            for term, tf in terms.items():
+                if term not in self._postings:
+                    self._postings[term] = {}
+                    self._add_chars(term)
+                self._postings[term][doc_id] = tf
+            length = sum(terms.values())
+            self._docs[doc_id] = [table, label, str(site_id), fingerprint, length, list(terms)]
+            self._total_length += length
+
+    def remove(self, table, label):
+        with self._lock:
+            self._remove(f"{table}:{label}")
+
+    def _remove(self, doc_id):
+        doc = self._docs.pop(doc_id, None)
+        if doc is None:
+            return
+        self._total_length -= doc[4]
+        for term in doc[5]:
+            posting = self._postings.get(term)
+            if posting is not None:
+                posting.pop(doc_id, None)
+                if not posting:
+                    del self._postings[term]
+                    for char in set(term):
+                        terms = self._chars.get(char)
+                        if terms is not None:
+                            terms.discard(term)
+                            if not terms:
+                                del self._chars[char]
+
+    def _add_chars(self, term):
+        for char in set(term):
+            self._chars.setdefault(char, set()).add(term)
+
+    def _posting(self, term):
+        """Doc id -> term frequency; a one-letter term sums every term containing it."""
+        if len(term) != 1:
+            return self._postings.get(term, {})
+        merged = {}
+        for other in self._chars.get(term, ()):
+            for doc_id, tf in self._postings[other].items():
+                merged[doc_id] = merged.get(doc_id, 0) + tf
+        return merged
+
+    def sync(self, table, df, columns=None, save=True):
+        """
+        Brings one table's documents in line with df: new and changed rows are
+        indexed, rows that are gone are dropped.
+
+        Returns:
+            (rows indexed, rows removed)
+        """
+        columns = [c for c in (columns or TEXT_COLUMNS.get(table, [])) if c in df.columns]
+        if not columns:
+            return 0, 0
+        fingerprints = [str(v) for v in row_fingerprints(df, columns)]
+        labels = df.index.tolist()
+        with self._lock:
+            current = {doc[1]: doc[3] for doc in self._docs.values() if doc[0] == table}
+        changed = [i for i, label in enumerate(labels) if current.get(label) != fingerprints[i]]
+        gone = set(current) - set(labels)
+
+        if changed:
+            rows = df.iloc[changed]
+            text = rows[columns[0]].fillna("").astype(str)
+            for col in columns[1:]:
+                text = text + " " + rows[col].fillna("").astype(str)
+            sites = rows[SITE_KEY].astype(str) if SITE_KEY in rows.columns else pd.Series("", index=rows.index)
+            for i, site_id, value in zip(changed, sites, text):
+                self.add(table, labels[i], site_id, value, fingerprints[i])
+        for label in gone:
+            self.remove(table, label)
+        if save and (changed or gone):
+            self.save()
+        return len(changed), len(gone)
+
+    def search(self, query, limit=20, tables=None):
+        """
+        Ranked hits for a free-text query.
+
+        Returns:
+            list of dicts: 'table', 'row', 'site_mgmt_id', 'score', best first.
+        """
+        terms = list(bigrams(query))
+        if not terms:
+            return []
+        with self._lock:
+            postings = [self._posting(term) for term in terms]
+            if not all(postings):
+                return []
+            postings.sort(key=len)
+            candidates = set(postings[0])
+            for posting in postings[1:]:
+                candidates.intersection_update(posting)
+            n_docs = len(self._docs)
+            avg_length = self._total_length / n_docs if n_docs else 0
+            weights = [(p, math.log(1 + (n_docs - len(p) + 0.5) / (len(p) + 0.5))) for p in postings]
+            scored = []
+            for doc_id in candidates:
+                doc = self._docs[doc_id]
+                if tables and doc[0] not in tables:
+                    continue
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * doc[4] / (avg_length or 1))
+                score = sum(idf * p[doc_id] * (BM25_K1 + 1) / (p[doc_id] + norm) for p, idf in weights)
+                scored.append((score, doc_id))
+            top = heapq.nlargest(limit, scored)
+            return [{'table': self._docs[d][0], 'row': self._docs[d][1], SITE_KEY: self._docs[d][2],
+                     'score': round(score, 4)} for score, d in top]
+
+    def stats(self):
+        with self._lock:
+            return {'documents': len(self._docs), 'terms': len(self._postings),
+                    'postings': sum(len(p) for p in self._postings.values())}
+
+    def save(self):
+        with self._lock:
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                # dumps() runs the C encoder; dump() would encode in Python
+                f.write(json.dumps({'postings': self._postings, 'docs': self._docs}, ensure_ascii=False))
+            os.replace(tmp, self.path)
+
+
+text_index = TextIndex(local_path("text_index.json"))
@@ -0,0 +1,158 @@
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.local_paths import LOCAL_DATA_DIR
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # without Pillow, fetched thumbnails are stored as they come
+    Image = None
+
+THUMBNAIL_EDGE = 320
+THUMBNAIL_QUALITY = 80
+MAX_CACHE_BYTES = 200 * 2**20
+MAX_WORKERS = 8
+
+
+def is_photo(file):
+    """True for Drive files the gallery shows (and the photos count counts)."""
+    return str(file.get('mimeType', '')).startswith('image/')
+
+
+def make_thumbnail(data, edge=THUMBNAIL_EDGE, quality=THUMBNAIL_QUALITY):
+    """Image bytes -> JPEG thumbnail bytes whose longer edge is at most edge."""
+    if Image is None:
+        return data
+    with Image.open(io.BytesIO(data)) as img:
+        img.draft('RGB', (edge, edge))  # JPEG: decode at reduced scale
+        image = ImageOps.exif_transpose(img)
+        image.thumbnail((edge, edge))
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        out = io.BytesIO()
+        image.save(out, 'JPEG', quality=quality)
+        return out.getvalue()
+
+
+class ThumbnailCache:
+    """
+    Disk cache of photo thumbnails keyed by Drive file id and modifiedTime.
+
+    An edited file gets a new modifiedTime and therefore a new entry; the old
+    one ages out. The directory is kept under max_bytes by evicting the least
+    recently used thumbnails; recency survives restarts through file mtimes.
+    """
+
+    def __init__(self, directory, max_bytes=MAX_CACHE_BYTES, edge=THUMBNAIL_EDGE):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.edge = edge
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # file name -> size, least recently used first
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+        stored = []
+        for entry in os.scandir(directory):
+            if entry.is_file() and entry.name.endswith('.jpg'):
+                st = entry.stat()
+                stored.append((st.st_mtime, entry.name, st.st_size))
+        for _, name, size in sorted(stored):
+            self._entries[name] = size
+        self._size = sum(self._entries.values())
+
+    @staticmethod
+    def key(file):
+        version = hashlib.sha1(str(file.get('modifiedTime', '')).encode()).hexdigest()[:12]
+        return f"{file['id']}_{version}.jpg"
+
+    def path(self, file):
+        return os.path.join(self.directory, self.key(file))
+
+    def lookup(self, file):
+        """Path of the cached thumbnail, marking it recently used; None on a miss."""
+        name = self.key(file)
+        with self._lock:
+            if name not in self._entries:
+                return None
+            self._entries.move_to_end(name)
+        path = os.path.join(self.directory, name)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self._size -= self._entries.pop(name, 0)
+            return None
+        return path
+
+    def store(self, file, data):
+        """Writes a thumbnail and evicts old ones past max_bytes; returns its path."""
+        name = self.key(file)
+        path = os.path.join(self.directory, name)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+        with self._lock:
+            self._size += len(data) - self._entries.pop(name, 0)
+            self._entries[name] = len(data)
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                old, size = self._entries.popitem(last=False)
+                self._size -= size
+                self.evictions += 1
+                try:
+                    os.remove(os.path.join(self.directory, old))
+                except FileNotFoundError:
+                    pass
+        return path
+
+    def get_many(self, files, fetch, max_workers=MAX_WORKERS):
+        """
+        Thumbnail paths for many Drive files. Misses are fetched and
+        downscaled in parallel; a file that fails maps to None.
+
+        Args:
+            fetch (callable): fetch(file) -> image bytes (thumbnail or original).
+        Returns:
+            dict: file id -> thumbnail path or None.
+        """
+        paths, missing = {}, []
+        for file in files:
+            path = self.lookup(file)
+            if path:
+                paths[file['id']] = path
+            else:
+                missing.append(file)
+        with self._lock:
+            self.hits += len(paths)
+            self.misses += len(missing)
+
+        def build(file):
+            try:
+                return self.store(file, make_thumbnail(fetch(file), self.edge))
+            except Exception:
+                return None
+
+        if missing:
+            with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="thumbnail") as executor:
+                for file, path in zip(missing, executor.map(build, missing)):
+                    paths[file['id']] = path
+        return paths
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+thumbnail_cache = ThumbnailCache(os.path.join(LOCAL_DATA_DIR, "thumbnails"))
@@ -0,0 +1,128 @@
+import datetime
+
+import pandas as pd
+from openpyxl import Workbook, load_workbook
+
+from utils.sheet_diff import cell_value
+
+# Headers used in data.xlsx that differ from the sheet headers in the mappings
+HEADER_ALIASES = {"첨부 자료 / 사진": "첨부파일"}
+
+
+def _xlsx_value(value):
+    value = cell_value(value)
+    return None if value == "" else value
+
+
+def _plain(value):
+    """Spreadsheet cell -> value as the Sheets loader would give it."""
+    if value is None:
+        return ""
+    if isinstance(value, datetime.datetime):
+        return value.date().isoformat() if value.time() == datetime.time() else value.isoformat(sep=" ")
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def read_sheet(ws, mapping=None):
+    """
+    Streams one read-only worksheet into a DataFrame of object columns.
+    Rows arrive as plain value tuples; no Cell objects are created. Columns
+    without a header and rows with no values are dropped.
+    """
+    mapping = mapping or {}
+    rows = ws.iter_rows(values_only=True)
+    header = next(rows, None)
+    if header is None:
+        return pd.DataFrame()
+
+    keep = [i for i, h in enumerate(header) if h not in (None, "")]
+    columns = []
+    for i in keep:
+        name = HEADER_ALIASES.get(str(header[i]).strip(), str(header[i]).strip())
+        columns.append(mapping.get(name, name))
+
+    records = []
+    for row in rows:
+        values = [_plain(row[i]) if i < len(row) else "" for i in keep]
+        if any(v != "" for v in values):
+            records.append(values)
+    return pd.DataFrame(records, columns=columns, dtype=object)
+
+
+def read_workbook(source, renames=None):
+    """
+    Loads a workbook such as data.xlsx in read-only streaming mode.
+    Formula cells yield their cached results.
+
+    Args:
+        source: path or binary file object.
+        renames (dict): sheet title -> {sheet header: column} mapping.
+    Returns:
+        dict: sheet title -> DataFrame, for every sheet in the workbook.
+    """
+    renames = renames or {}
+    wb = load_workbook(source, read_only=True, data_only=True)
+    try:
+        return {ws.title: read_sheet(ws, renames.get(ws.title)) for ws in wb.worksheets}
+    finally:
+        wb.close()
+
+
+def write_workbook(frames, target, headers=None):
+    """
+    Writes DataFrames to a new workbook in write-only streaming mode.
+
+    Args:
+        frames (dict): sheet title -> DataFrame.
+        target: path or binary file object (e.g. BytesIO for a download).
+        headers (dict): sheet title -> {column: sheet header} mapping.
+    """
+    headers = headers or {}
+    wb = Workbook(write_only=True)
+    for title, df in frames.items():
+        ws = wb.create_sheet(title)
+        mapping = headers.get(title, {})
+        ws.append([mapping.get(c, c) for c in df.columns])
+        for row in df.itertuples(index=False, name=None):
+            ws.append([_xlsx_value(v) for v in row])
+    wb.save(target)
+    if hasattr(target, "seek"):
+        target.seek(0)
+    return target
+
+
+def upsert_rows(existing, incoming, key="site_mgmt_id"):
+    """
+    Merges incoming rows into existing by key: matching rows get their
+    non-empty fields overwritten, the rest are appended. Existing order is kept.
+    """
+    incoming = incoming.drop_duplicates(key, keep="last")
+    existing = existing.copy(deep=False)
+    if key not in existing.columns:
+        existing[key] = ""
+
+    position = pd.Series(existing.index, index=existing[key].astype(str).values)
+    position = position[~position.index.duplicated()]
+    keys = incoming[key].astype(str)
+    hit = keys.isin(position.index).to_numpy()
+
+    matched = incoming[hit]
+    targets = position[keys[hit]].to_numpy()
+    for col in incoming.columns:
+        values = matched[col].to_numpy()
+        keep = values != ""
+        if not keep.any():
+            continue
+        column = existing[col].astype(object) if col in existing.columns else pd.Series("", index=existing.index, dtype=object)
+        column.loc[targets[keep]] = values[keep]
+        existing[col] = column
+
+    new_rows = incoming[~hit]
+    if len(new_rows):
+        start = int(existing.index.max()) + 1 if len(existing) else 0
+        existing = pd.concat([existing, new_rows.set_axis(range(start, start + len(new_rows)))])
+    return existing.fillna("")